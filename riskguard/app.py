@@ -3,6 +3,7 @@ import logging, threading, webbrowser, os
 from dash import Dash
 from .config import APP_VERSION, THEME
 from .bootstrap import bootstrap
+from .data.refresher import start_refresher
 from .ui.layout import build_layout
 from .ui.callbacks.positions import register_positions_callbacks
 from .ui.callbacks.charts import register_charts_callbacks
@@ -28,6 +29,7 @@ def create_app():
 
 def main():
     bootstrap()
+    start_refresher()
     app = create_app()
     threading.Timer(1.0, lambda: webbrowser.open("http://127.0.0.1:8050")).start()
     app.run(host="127.0.0.1", port=int(os.getenv("PORT","8050")), debug=True, use_reloader=False)
@@ -1,6 +1,6 @@
 # riskguard/bootstrap.py
 import logging
-from .db.base import init_db, ensure_schema, repair_adjclose_column, SessionLocal
+from .db.base import init_db, ensure_schema, migrate_compact_storage, repair_adjclose_column, SessionLocal
 from .db.repo import ensure_history, upsert_symbol
 from .db.models import Position
 from .config import DEFAULT_TICKERS, BENCHMARK
@@ -10,6 +10,7 @@ log = logging.getLogger("riskguard.bootstrap")
 def bootstrap():
     init_db()
     ensure_schema()
+    migrate_compact_storage()
     repair_adjclose_column()
     with SessionLocal() as s:
         ensure_history(s, DEFAULT_TICKERS + [BENCHMARK])
@@ -1,12 +1,32 @@
 # riskguard/config.py
+import os
 from datetime import datetime, timedelta
 import dash_bootstrap_components as dbc
 
 APP_VERSION = "5.2"
 DATABASE_URL = "sqlite:///riskguard_core.db"
+# Price table layout: "rows" (legacy `prices`) or "compact" (integer days, clustered
+# WITHOUT ROWID `prices_daily`; existing rows are migrated at bootstrap)
+PRICE_STORAGE = os.getenv("RISKGUARD_PRICE_STORAGE", "rows")
+# Where daily bars live: "sqlite" (the tables above) or "archive" (memory-mapped
+# per-symbol column files under ARCHIVE_DIR; symbols, sync state and positions stay in SQLite)
+PRICE_BACKEND = os.getenv("RISKGUARD_PRICE_BACKEND", "sqlite")
+ARCHIVE_DIR = os.getenv("RISKGUARD_ARCHIVE_DIR", "price_archive")
 THEME = dbc.themes.FLATLY
 UPDATE_MS = 15_000
 
+# Background market-data refresher (single ingestion owner; callbacks only read)
+REFRESH_PERIOD_S      = 60
+REFRESH_MAX_BACKOFF_S = 900
+REFRESH_WATCH_TTL_S   = 3600   # stop refreshing chart-only tickers nobody looked at for this long
+
+# Market data source: "yfinance", "local" (CSV/Parquet per symbol in MARKET_DATA_DIR)
+# or "gbm" (deterministic seeded simulator, for offline runs and benchmarks)
+MARKET_DATA_PROVIDER = os.getenv("RISKGUARD_PROVIDER", "yfinance")
+MARKET_DATA_DIR = os.getenv("RISKGUARD_DATA_DIR", "market_data")
+SIM_SEED  = int(os.getenv("RISKGUARD_SIM_SEED", "42"))
+SIM_START = "2000-01-03"
+
 DEFAULT_TICKERS = ["AAPL", "MSFT", "SPY"]
 BENCHMARK = "SPY"
 DEFAULT_BT_START = (datetime.today() - timedelta(days=365)).date()
@@ -19,4 +39,71 @@ FALLBACK_SYMBOLS = [
 
 # Outlier filter (daily close) & update guard
 OUTLIER_JUMP_DAILY = 0.18   # used for line series patching
+OUTLIER_Z_MAX      = 8.0    # ... and robust z-score (rolling median/MAD) above this
+OUTLIER_WINDOW     = 21     # centered rolling window for the median/MAD, in bars
 UPDATE_SKIP_JUMP   = 0.15   # skip if |new/old - 1| > 15%
+UPDATE_BATCH_SIZE  = 50     # symbols per multi-symbol download in the daily updater
+SYNC_BATCH_SIZE    = 50     # symbols per provider call / write transaction in the history sync
+INGEST_CHUNK_ROWS  = 500_000   # rows per chunk (and transaction) in `python -m riskguard.ingest`
+
+# Risk report grid: confidence levels and horizons (days) computed together
+RISK_ALPHAS   = (0.90, 0.95, 0.975, 0.99)
+RISK_HORIZONS = (1, 10)
+# Rolling analytics (rolling VaR, beta vs BENCHMARK, correlation): window in bars,
+# and the byte budget of their per-data-version cache
+ROLLING_WINDOW          = 63
+ROLLING_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Window lengths (bars) of the worst-window table in the stress panel, and windows shown per length
+WORST_WINDOWS     = (5, 20, 60, 252)
+WORST_WINDOWS_TOP = 3
+# Stress scenarios: parallel / beta-scaled shocks, user-defined {scenario: {ticker: return}},
+# and historical episodes (name, first day, last day) replayed from stored prices
+STRESS_SHOCKS        = (-0.05, -0.10, -0.20)
+STRESS_TICKER_SHOCKS = {}
+STRESS_EPISODES      = (
+    ("GFC 2008", "2008-09-02", "2009-03-09"),
+    ("COVID crash 2020-03", "2020-02-20", "2020-03-23"),
+    ("Rate shock 2022", "2022-01-03", "2022-10-12"),
+)
+STRESS_TABLE_ROWS    = 10
+# Monte Carlo VaR: simulated paths, paths per chunk (bounds memory), seed, and
+# worker processes for the chunks (0/1 = in-process; results do not depend on it)
+MC_PATHS   = 100_000
+MC_CHUNK   = 20_000
+MC_SEED    = SIM_SEED
+MC_WORKERS = int(os.getenv("RISKGUARD_MC_WORKERS", "0"))
+# Backtests: default rebalancing schedule (none/daily/monthly/quarterly/threshold),
+# drift band of the threshold schedule, costs in bps of traded value, strategies per
+# task and worker processes for sweeps (0/1 = in-process), result cache budget
+BACKTEST_SCHEDULE  = "daily"
+BACKTEST_BAND      = 0.05
+BACKTEST_COST_BPS  = 0.0
+BACKTEST_CHUNK     = 128
+BACKTEST_WORKERS   = int(os.getenv("RISKGUARD_BT_WORKERS", "0"))
+BACKTEST_CACHE_MAX_BYTES = 256 * 1024**2
+# Online risk statistics: EWMA decay for the asset covariance, and how far the book's
+# weights may drift from those the state was built with before it is rebuilt
+EWMA_LAMBDA         = 0.94
+ONLINE_REWEIGHT_TOL = 0.02
+
+# SQLite connection tuning (applied on every new connection; WAL lets the refresher
+# write while callbacks read)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,      # KiB (64 MB page cache)
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,      # ms
+}
+
+# In-process cache of cleaned daily series (LRU, bounded by bytes)
+SERIES_CACHE_MAX_BYTES = 256 * 1024**2
+PANEL_CACHE_MAX_BYTES  = 512 * 1024**2   # aligned PricePanels shared by callbacks
+COV_CACHE_MAX_BYTES    = 256 * 1024**2   # panel mean/covariance (risk decomposition)
+CORR_CACHE_MAX_BYTES   = 128 * 1024**2   # correlation matrices (pairwise / shrunk / EWMA)
+MC_CACHE_MAX_BYTES     = 16 * 1024**2    # Monte Carlo VaR/ES reports per book and data version
+# Correlation heatmap: default estimator, and most assets drawn before showing the top
+# positions by weight (each extra row adds O(N) cells to the browser payload)
+CORR_METHOD      = "pairwise"
+CORR_HEATMAP_MAX = 60
@@ -0,0 +1,26 @@
+# riskguard/data/guards.py
+import logging
+import numpy as np
+import pandas as pd
+
+from ..config import UPDATE_SKIP_JUMP
+
+log = logging.getLogger("riskguard.data.guards")
+
+def jump_guard(bars: dict, last: pd.Series) -> tuple:
+    """Split bars into (accepted, skipped tickers) by |new/old - 1| > UPDATE_SKIP_JUMP.
+
+    `bars` maps ticker -> frame whose last Close is the candidate bar, `last`
+    maps ticker -> stored close; tickers without a usable stored close pass.
+    Shared by the daily updater and the history ingest seam check.
+    """
+    if not bars:
+        return {}, []
+    new = pd.Series({t: float(df["Close"].iloc[-1]) for t, df in bars.items()})
+    old = last.reindex(new.index)
+    jump = (new / old - 1.0).abs()
+    bad = (np.isfinite(old) & (old > 0) & (jump > UPDATE_SKIP_JUMP)).to_numpy()
+    for t in new.index[bad]:
+        log.warning("Skipping suspicious bar %s: %.4f -> %.4f (%.1f%%)",
+                    t, old[t], new[t], 100*jump[t])
+    return {t: bars[t] for t in new.index[~bad]}, list(new.index[bad])
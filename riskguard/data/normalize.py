@@ -2,9 +2,37 @@
 import numpy as np
 import pandas as pd
 
+CANONICAL_COLUMNS = ["Open","High","Low","Close","AdjClose","Volume"]
+
+def _is_daily_index(idx) -> bool:
+    """Tz-naive, strictly increasing timestamps at midnight (one row per day)."""
+    return (isinstance(idx, pd.DatetimeIndex) and idx.tz is None and idx.is_monotonic_increasing
+            and idx.is_unique and not idx.hasnans and not (idx.asi8 % 86_400_000_000_000).any())
+
+def is_canonical(df: pd.DataFrame) -> bool:
+    """True if `df` is already what normalize_price_frame returns (so it would come back unchanged).
+
+    The check is structural and vectorized (column layout, float dtypes, a sorted
+    unique tz-naive index, no missing Close/Volume) and never copies, so frames
+    handed from one stage to the next (provider -> updater -> upsert, ingest
+    chunk -> upsert) are validated instead of rebuilt.
+    """
+    if not isinstance(df, pd.DataFrame) or df.empty or list(df.columns) != CANONICAL_COLUMNS:
+        return False
+    idx = df.index
+    if not isinstance(idx, pd.DatetimeIndex) or idx.tz is not None or idx.hasnans:
+        return False
+    if not (idx.is_monotonic_increasing and idx.is_unique):
+        return False
+    if any(dt != np.float64 for dt in df.dtypes):
+        return False
+    return not (np.isnan(df["Close"].to_numpy()).any() or np.isnan(df["Volume"].to_numpy()).any())
+
 def normalize_price_frame(df: pd.DataFrame) -> pd.DataFrame:
     if df is None or df.empty:
         return pd.DataFrame()
+    if is_canonical(df):
+        return df
 
     # Flatten MultiIndex
     if isinstance(df.columns, pd.MultiIndex):
@@ -20,22 +48,30 @@ def normalize_price_frame(df: pd.DataFrame) -> pd.DataFrame:
     df.columns = [rename_map.get(c.strip().lower(), c.strip()) for c in df.columns]
 
     out = pd.DataFrame(index=pd.to_datetime(df.index, errors="coerce"))
-    for col in ["Open","High","Low","Close","Volume"]:
+    for col in ["Open","High","Low","Close"]:
         out[col] = pd.to_numeric(df.get(col, df.get("Close")), errors="coerce")
+    out["Volume"] = pd.to_numeric(df.get("Volume", np.nan), errors="coerce")   # unknown volume -> 0 below
     out["AdjClose"] = pd.to_numeric(df.get("AdjClose", out["Close"]), errors="coerce")
 
     out.index = out.index.tz_localize(None)
     out = out[~out.index.duplicated(keep="last")].sort_index()
     out = out.dropna(subset=["Close"])
     out["Volume"] = out["Volume"].fillna(0.0)
-    return out[["Open","High","Low","Close","AdjClose","Volume"]]
+    return out[CANONICAL_COLUMNS]
 
 def ohlcv_by_day(df: pd.DataFrame) -> pd.DataFrame:
     if df is None or df.empty:
         return df
+    agg = {"Open":"first","High":"max","Low":"min","Close":"last","AdjClose":"last","Volume":"sum"}
+    agg = {k:v for k,v in agg.items() if k in df.columns}
+    if _is_daily_index(df.index):
+        # Already one bar per day: every group is a single row, so the aggregation is the identity
+        # (except that a sum over a lone NaN volume is 0).
+        out = df[list(agg)]
+        if "Volume" in agg and out["Volume"].isna().any():
+            out = out.assign(Volume=out["Volume"].fillna(0))
+        return out.dropna(subset=["Close"])
     g = df.copy()
     g.index = pd.to_datetime(g.index).tz_localize(None).normalize()
-    agg = {"Open":"first","High":"max","Low":"min","Close":"last","AdjClose":"last","Volume":"sum"}
-    agg = {k:v for k,v in agg.items() if k in g.columns}
     out = g.groupby(g.index).agg(agg)
     return out.sort_index().dropna(subset=["Close"])
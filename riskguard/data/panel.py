@@ -0,0 +1,99 @@
+# riskguard/data/panel.py
+import hashlib
+import numpy as np
+import pandas as pd
+from ..config import PANEL_CACHE_MAX_BYTES
+from ..db.version import ticker_versions
+from ..utils.cache import LRUCache
+from .series import daily_price_series_map
+
+_panel_cache = LRUCache(PANEL_CACHE_MAX_BYTES, sizeof=lambda p: p.nbytes)
+
+def _readonly(a: np.ndarray) -> np.ndarray:
+    a.setflags(write=False)
+    return a
+
+class PricePanel:
+    """Aligned dates x tickers grid of cleaned daily prices and returns.
+
+    `prices` holds NaN where a ticker has no bar; `mask` marks valid prices.
+    `returns[t, j]` is the change since ticker j's previous valid bar (same as
+    per-series pct_change), NaN where the ticker has no bar. Arrays are
+    C-contiguous float64 and read-only: panels are shared between callbacks.
+    `version` holds the persisted data versions the panel was built from (see
+    get_price_panel), so caches of values derived from it can be keyed on it.
+    """
+
+    def __init__(self, dates: pd.DatetimeIndex, tickers, prices: np.ndarray, version=None):
+        self.dates = dates
+        self.version = version
+        self.tickers = tuple(tickers)
+        self._col = {t: j for j, t in enumerate(self.tickers)}
+        prices = np.ascontiguousarray(prices, dtype=float)
+        mask = ~np.isnan(prices)
+        filled = pd.DataFrame(prices).ffill().to_numpy()
+        prev = np.full_like(filled, np.nan)
+        prev[1:] = filled[:-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rets = np.where(mask, prices / prev - 1.0, np.nan)
+        self.prices = _readonly(prices)
+        self.mask = _readonly(mask)
+        self.returns = _readonly(np.ascontiguousarray(rets))
+        self.last = _readonly(filled[-1].copy() if len(filled) else np.full(len(self.tickers), np.nan))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.prices.nbytes + self.returns.nbytes + self.mask.nbytes)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def col(self, ticker: str) -> int:
+        return self._col[ticker]
+
+    def has_history(self, ticker: str) -> bool:
+        return ticker in self._col and bool(self.mask[:, self._col[ticker]].any())
+
+    def series(self, ticker: str) -> pd.Series:
+        j = self._col[ticker]
+        m = self.mask[:, j]
+        return pd.Series(self.prices[m, j], index=self.dates[m], name=ticker)
+
+    def prices_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.prices, index=self.dates, columns=list(self.tickers), copy=False)
+
+    def returns_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.returns, index=self.dates, columns=list(self.tickers), copy=False)
+
+    def last_prices(self) -> pd.Series:
+        return pd.Series(self.last, index=list(self.tickers))
+
+def panel_version(panel):
+    """Cache version for values derived from `panel`: the data versions it was built from, or
+    for a panel built by hand (no DB behind it) a digest of its dates and prices."""
+    if panel.version is None:
+        h = hashlib.sha1(np.asarray(panel.dates.asi8).tobytes())
+        h.update(panel.prices.tobytes())
+        panel.version = ("digest", h.hexdigest())
+    return panel.version
+
+def build_price_panel(series_map: dict) -> PricePanel:
+    tickers = list(series_map)
+    present = {t: s for t, s in series_map.items() if s is not None and len(s)}
+    if not present:
+        return PricePanel(pd.DatetimeIndex([]), tickers, np.empty((0, len(tickers))))
+    wide = pd.concat(present, axis=1).sort_index().reindex(columns=tickers)
+    return PricePanel(pd.DatetimeIndex(wide.index), tickers, wide.to_numpy(dtype=float))
+
+def get_price_panel(session, tickers) -> PricePanel:
+    """Shared panel for `tickers`, rebuilt only when one of their data versions changes."""
+    tickers = list(dict.fromkeys(tickers))
+    key = tuple(tickers)
+    versions = ticker_versions(tickers)
+    ver = tuple(versions[t.upper().strip()][0] for t in tickers)
+    panel = _panel_cache.get(key, version=ver)
+    if panel is None:
+        panel = build_price_panel(daily_price_series_map(session, tickers))
+        panel.version = ver
+        _panel_cache.put(key, panel, version=ver)
+    return panel
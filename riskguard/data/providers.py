@@ -0,0 +1,179 @@
+# riskguard/data/providers.py
+import logging
+import os
+import re
+import zlib
+import numpy as np
+import pandas as pd
+
+try:
+    import yfinance as yf
+    HAVE_YF = True
+except Exception:
+    HAVE_YF = False
+
+from ..config import MARKET_DATA_PROVIDER, MARKET_DATA_DIR, SIM_SEED, SIM_START
+from .normalize import normalize_price_frame
+
+log = logging.getLogger("riskguard.data.providers")
+
+def _period_start(period: str, end: pd.Timestamp) -> pd.Timestamp:
+    """Start of a yfinance-style period ("12d", "6mo", "5y"; anything else = all)."""
+    m = re.fullmatch(r"(\d+)(d|wk|mo|y)", period or "")
+    if not m:
+        return pd.Timestamp.min
+    n, unit = int(m.group(1)), m.group(2)
+    if unit == "d":
+        return end - pd.tseries.offsets.BDay(n)
+    if unit == "wk":
+        return end - pd.DateOffset(weeks=n)
+    if unit == "mo":
+        return end - pd.DateOffset(months=n)
+    return end - pd.DateOffset(years=n)
+
+def _slice(df: pd.DataFrame, period: str, start) -> pd.DataFrame:
+    if df is None or df.empty:
+        return pd.DataFrame()
+    lo = pd.Timestamp(start).normalize() if start is not None else _period_start(period, df.index.max())
+    return df.loc[df.index >= lo]
+
+class MarketDataProvider:
+    """Source of daily bars. Frames come back normalized (see normalize_price_frame)."""
+    name = "base"
+    available = True
+
+    def history(self, ticker: str, period="5y", interval="1d", start=None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def history_many(self, tickers, period="5y", interval="1d", start=None) -> dict:
+        out = {}
+        for t in tickers:
+            df = self.history(t, period=period, interval=interval, start=start)
+            if df is not None and not df.empty:
+                out[t] = df
+        return out
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+    available = HAVE_YF
+
+    @staticmethod
+    def _span(period, start):
+        return {"start": pd.Timestamp(start).strftime("%Y-%m-%d")} if start is not None else {"period": period}
+
+    def history(self, ticker: str, period="5y", interval="1d", start=None) -> pd.DataFrame:
+        if not HAVE_YF:
+            return pd.DataFrame()
+        try:
+            raw = yf.download(ticker, interval=interval, **self._span(period, start),
+                              auto_adjust=False, progress=False, threads=False)
+            if isinstance(raw, pd.DataFrame) and not raw.empty:
+                return normalize_price_frame(raw)
+        except Exception as e:
+            log.info("yfinance fetch failed %s: %s", ticker, e)
+        return pd.DataFrame()
+
+    def history_many(self, tickers, period="5y", interval="1d", start=None) -> dict:
+        tickers = list(tickers)
+        if not HAVE_YF or not tickers:
+            return {}
+        try:
+            raw = yf.download(tickers, interval=interval, **self._span(period, start), group_by="ticker",
+                              auto_adjust=False, progress=False, threads=True)
+        except Exception as e:
+            log.info("yfinance batch fetch failed %s: %s", tickers, e)
+            return {}
+        out = {}
+        for t, df in _split_download(raw, tickers).items():
+            df = normalize_price_frame(df)
+            if not df.empty:
+                out[t] = df
+        return out
+
+def _split_download(raw: pd.DataFrame, tickers) -> dict:
+    """Per-ticker frames from a grouped multi-symbol yf.download result."""
+    if not isinstance(raw, pd.DataFrame) or raw.empty:
+        return {}
+    if not isinstance(raw.columns, pd.MultiIndex):
+        return {tickers[0]: raw} if len(tickers) == 1 else {}
+    level = 0 if set(tickers) & set(raw.columns.get_level_values(0)) else 1
+    names = set(raw.columns.get_level_values(level))
+    return {t: raw.xs(t, axis=1, level=level) for t in tickers if t in names}
+
+class LocalFileProvider(MarketDataProvider):
+    """Reads <root>/<TICKER>.parquet or <root>/<TICKER>.csv (date index in the first column)."""
+    name = "local"
+
+    def __init__(self, root: str = MARKET_DATA_DIR):
+        self.root = root
+
+    def _read(self, ticker: str) -> pd.DataFrame:
+        base = os.path.join(self.root, ticker.upper().strip())
+        try:
+            if os.path.exists(base + ".parquet"):
+                return pd.read_parquet(base + ".parquet")
+            if os.path.exists(base + ".csv"):
+                return pd.read_csv(base + ".csv", index_col=0, parse_dates=True)
+        except Exception as e:   # e.g. parquet without pyarrow
+            log.info("local fetch failed %s: %s", ticker, e)
+        return pd.DataFrame()
+
+    def history(self, ticker: str, period="5y", interval="1d", start=None) -> pd.DataFrame:
+        return _slice(normalize_price_frame(self._read(ticker)), period, start)
+
+class SimulatedProvider(MarketDataProvider):
+    """Deterministic seeded GBM: each ticker's path depends only on (seed, ticker).
+
+    Paths start at SIM_START and are extended day by day, so later calls (or a
+    later `end`) reproduce the same bars for the same dates.
+    """
+    name = "gbm"
+
+    def __init__(self, seed: int = SIM_SEED, start=SIM_START, end=None, drift=0.08, vol=0.25):
+        self.seed, self.drift, self.vol = int(seed), drift, vol
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end) if end is not None else None
+
+    def _rng(self, ticker: str, stream: int) -> np.random.Generator:
+        # One stream per quantity, so extending the date range keeps earlier draws intact.
+        return np.random.default_rng([self.seed, zlib.crc32(ticker.upper().strip().encode()), stream])
+
+    def _dates(self) -> pd.DatetimeIndex:
+        end = self.end if self.end is not None else pd.Timestamp.today().normalize()
+        return pd.bdate_range(self.start, end)
+
+    def _path(self, ticker: str, idx: pd.DatetimeIndex) -> pd.DataFrame:
+        n = len(idx)
+        vol_scale, level = self._rng(ticker, 0).random(2)
+        vol = self.vol * (0.5 + vol_scale)       # per-ticker vol in [0.5, 1.5) x base
+        dt = 1/252
+        z = self._rng(ticker, 1).standard_normal(n)
+        rets = (self.drift - 0.5*vol**2)*dt + vol*np.sqrt(dt)*z
+        close = (20 + 180*level) * np.exp(np.cumsum(rets))
+        open_ = np.r_[close[0], close[:-1]]
+        return pd.DataFrame({
+            "Open": open_, "High": np.maximum(open_, close)*(1 + self._rng(ticker, 2).random(n)*0.01),
+            "Low": np.minimum(open_, close)*(1 - self._rng(ticker, 3).random(n)*0.01), "Close": close,
+            "AdjClose": close, "Volume": self._rng(ticker, 4).integers(100_000, 1_000_000, size=n).astype(float),
+        }, index=idx)
+
+    def history(self, ticker: str, period="5y", interval="1d", start=None) -> pd.DataFrame:
+        return _slice(self._path(ticker, self._dates()), period, start)
+
+    def history_many(self, tickers, period="5y", interval="1d", start=None) -> dict:
+        idx = self._dates()
+        return {t: _slice(self._path(t, idx), period, start) for t in tickers}
+
+_PROVIDERS = {"yfinance": YFinanceProvider, "local": LocalFileProvider, "gbm": SimulatedProvider}
+_active = None
+
+def get_provider() -> MarketDataProvider:
+    """Provider selected by MARKET_DATA_PROVIDER (yfinance | local | gbm)."""
+    global _active
+    if _active is None:
+        _active = _PROVIDERS[MARKET_DATA_PROVIDER]()
+    return _active
+
+def set_provider(provider: MarketDataProvider):
+    global _active
+    _active = provider
@@ -0,0 +1,124 @@
+# riskguard/data/refresher.py
+import logging
+import threading
+import time
+from ..config import BENCHMARK, DEFAULT_TICKERS, REFRESH_PERIOD_S, REFRESH_MAX_BACKOFF_S, REFRESH_WATCH_TTL_S
+from ..db.base import SessionLocal
+from ..db.repo import positions_df, sync_history
+from ..db.version import data_version, ticker_versions
+from .series import daily_price_series_map
+from .updates import update_latest_prices
+
+log = logging.getLogger("riskguard.data.refresher")
+
+class MarketDataRefresher:
+    """Single background owner of market-data ingestion.
+
+    Every `period_s` it syncs history and the latest daily bar for the book,
+    the benchmark, the defaults and any ticker a callback asked for via
+    `watch()`, then refreshes their persisted cleaned series. Failed cycles
+    back off exponentially up to `max_backoff_s`. Callbacks only read the DB
+    and use `version` to tell when data changed; they never wait for a sync
+    (see `request`).
+    """
+
+    def __init__(self, period_s: float = REFRESH_PERIOD_S, max_backoff_s: float = REFRESH_MAX_BACKOFF_S,
+                 watch_ttl_s: float = REFRESH_WATCH_TTL_S):
+        self.period_s, self.max_backoff_s, self.watch_ttl_s = period_s, max_backoff_s, watch_ttl_s
+        self._watched = {}            # ticker -> last time a callback asked for it
+        self._synced = set()          # tickers synced at least once by this process
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.failures = 0
+        self.last_refresh = None
+        self.last_error = None
+        self.last_summary = {}
+
+    @property
+    def version(self) -> int:
+        return data_version()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="riskguard-refresher", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set(); self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def watch(self, tickers):
+        """Register tickers for refresh; unseen ones trigger an immediate cycle."""
+        now = time.monotonic()
+        tickers = [t.upper().strip() for t in tickers if t]
+        with self._lock:
+            new = [t for t in tickers if t not in self._watched and t not in self._synced]
+            self._watched.update({t: now for t in tickers})
+        if new:
+            self._wake.set()
+
+    def request(self, tickers) -> bool:
+        """watch() without blocking; True once every ticker has stored history (or was synced once).
+
+        Callbacks render a loading state while this is False and retry on the next
+        `tick`, so no Flask worker waits on a sync. Starts the worker if it is not
+        running (e.g. app embedded without main()).
+        """
+        tickers = {t.upper().strip() for t in tickers if t}
+        self.watch(tickers)
+        self.start()
+        with self._lock:
+            pending = tickers - self._synced
+        # Bars written by another process (ingest CLI, another app worker) count too.
+        return all(v > 0 for v, _ in ticker_versions(pending).values())
+
+    def _targets(self, session) -> list:
+        now = time.monotonic()
+        with self._lock:
+            self._watched = {t: ts for t, ts in self._watched.items() if now - ts < self.watch_ttl_s}
+            watched = list(self._watched)
+        book = list(positions_df(session)["Ticker"])
+        return list(dict.fromkeys(t.upper() for t in book + [BENCHMARK] + DEFAULT_TICKERS + watched))
+
+    def refresh_once(self) -> dict:
+        with SessionLocal() as s:
+            tickers = self._targets(s)
+            t0 = time.perf_counter()
+            sync_history(s, tickers)
+            t1 = time.perf_counter()
+            summary = update_latest_prices(s, tickers)
+            t2 = time.perf_counter()
+            daily_price_series_map(s, tickers)   # keeps the persisted clean series current
+            summary["clean_s"] = time.perf_counter() - t2
+        summary.update({"tickers": len(tickers), "sync_s": t1 - t0, "version": data_version()})
+        with self._lock:
+            self._synced.update(tickers)
+        return summary
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Clear before reading the watch set: a request() arriving during the
+            # cycle leaves the event set, so the wait below returns at once.
+            self._wake.clear()
+            try:
+                self.last_summary = self.refresh_once()
+                self.last_refresh, self.last_error, self.failures = time.time(), None, 0
+                wait = self.period_s
+            except Exception as e:
+                self.failures += 1
+                self.last_error = repr(e)
+                wait = min(self.max_backoff_s, self.period_s * 2 ** self.failures)
+                log.warning("market data refresh failed (%d in a row), retrying in %.0fs: %s",
+                            self.failures, wait, e)
+            self._wake.wait(wait)
+
+refresher = MarketDataRefresher()
+
+def start_refresher() -> MarketDataRefresher:
+    return refresher.start()
@@ -1,21 +1,39 @@
 # riskguard/data/series.py
 import numpy as np
 import pandas as pd
-from ..config import OUTLIER_JUMP_DAILY
-from ..db.repo import get_price_df
+from ..config import OUTLIER_JUMP_DAILY, OUTLIER_Z_MAX, OUTLIER_WINDOW, SERIES_CACHE_MAX_BYTES
+from ..db.repo import get_price_frames, get_clean_series, put_clean_series
+from ..db.version import ticker_versions
+from ..utils.cache import LRUCache
 from .normalize import ohlcv_by_day
 
+_series_cache = LRUCache(SERIES_CACHE_MAX_BYTES)
+
+# Tag of the cleaning rules; persisted series made under other rules are recomputed.
+CLEAN_PARAMS = f"v1;jump={OUTLIER_JUMP_DAILY};z={OUTLIER_Z_MAX};window={OUTLIER_WINDOW}"
+
+def _raw_factor(df: pd.DataFrame) -> pd.Series:
+    """AdjClose/Close per bar, NaN where undefined (before any filling)."""
+    c = pd.to_numeric(df["Close"], errors="coerce")
+    ac = pd.to_numeric(df.get("AdjClose", pd.Series(index=df.index, dtype=float)), errors="coerce")
+    return (ac / c).replace([np.inf, -np.inf], np.nan)
+
 def _consistent_adj_close_series(df: pd.DataFrame) -> pd.Series:
     if df is None or df.empty:
         return pd.Series(dtype=float)
     g = df.copy()
     g.index = pd.to_datetime(g.index).tz_localize(None)
     c = pd.to_numeric(g["Close"], errors="coerce")
-    ac = pd.to_numeric(g.get("AdjClose", pd.Series(index=g.index, dtype=float)), errors="coerce")
-    factor = (ac / c).replace([np.inf, -np.inf], np.nan).ffill().bfill().fillna(1.0)
+    factor = _raw_factor(g).ffill().bfill().fillna(1.0)
     adj = c * factor
     return adj.dropna()
 
+def _last_factor(df: pd.DataFrame) -> float:
+    """Filled adjustment factor of the last bar (what the next appended bar is checked against)."""
+    if df is None or df.empty:
+        return 1.0
+    return float(_raw_factor(df).ffill().bfill().fillna(1.0).iloc[-1])
+
 def daily_close_series_from_raw(df: pd.DataFrame) -> pd.Series:
     if df is None or df.empty:
         return pd.Series(dtype=float)
@@ -26,33 +44,302 @@ def daily_close_series_from_raw(df: pd.DataFrame) -> pd.Series:
     s.index = s.index.normalize()
     return s.groupby(s.index).last().sort_index().astype(float)
 
-def patch_outliers_series(s: pd.Series, max_jump: float = OUTLIER_JUMP_DAILY) -> pd.Series:
+_MIN_PERIODS = 8          # observations a rolling median/MAD window needs
+_BLOCK_ELEMS = 1 << 22    # gathered window elements per block (~32 MB) in _window_medians
+
+def _window_medians(v: np.ndarray, rows: np.ndarray, cols: np.ndarray, window: int,
+                    min_periods: int = _MIN_PERIODS) -> np.ndarray:
+    """Centered rolling medians of the columns of `v`, evaluated only at (rows, cols).
+
+    Same windows, NaN skipping, min_periods and even-count averaging as
+    `Series.rolling(window, center=True, min_periods=...).median()`: each
+    requested window is gathered from a NaN-padded copy and sorted (NaN last).
+    """
+    after = (window - 1) // 2
+    before = window - 1 - after
+    vp = np.concatenate([np.full((before, v.shape[1]), np.nan), v, np.full((after, v.shape[1]), np.nan)])
+    offs = np.arange(window)
+    out = np.empty(len(rows))
+    step = max(1, _BLOCK_ELEMS // window)
+    for lo in range(0, len(rows), step):
+        r, c = rows[lo:lo + step], cols[lo:lo + step]
+        w = np.sort(vp[r[:, None] + offs, c[:, None]], axis=1)
+        k = window - np.isnan(w).sum(axis=1)
+        upper = w[np.arange(len(r)), k // 2]
+        lower = w[np.arange(len(r)), np.maximum((k - 1) // 2, 0)]
+        med = np.where(k % 2 == 1, upper, (upper + lower) / 2)
+        out[lo:lo + step] = np.where(k >= max(min_periods, 1), med, np.nan)
+    return out
+
+def _spread(mask: np.ndarray, before: int, after: int) -> np.ndarray:
+    """Rows within `before` rows above or `after` rows below a True row (per column)."""
+    c = np.concatenate([np.zeros((1, mask.shape[1]), dtype=np.int64), np.cumsum(mask, axis=0)])
+    n = mask.shape[0]
+    hi = np.minimum(np.arange(n) + before + 1, n)
+    lo = np.maximum(np.arange(n) - after, 0)
+    return (c[hi] - c[lo]) > 0
+
+def _patch_columns(x: np.ndarray, lengths: np.ndarray, max_jump: float, z_max: float, window: int):
+    """Isolated-spike patch for columns of `x` holding series of `lengths` rows (NaN below).
+
+    Returns (patched copy, iso mask). Only returns above `max_jump` can be
+    flagged, so the rolling median is evaluated just in the windows feeding
+    those rows' MAD, and the MAD just at those rows. Decisions use the raw
+    values only and an isolated spike never has a flagged neighbour, so all
+    fills are independent.
+    """
+    n, m = x.shape
+    inside = np.arange(n)[:, None] < lengths[None, :]
+    filled = pd.DataFrame(x).ffill().to_numpy()          # pct_change pads gaps inside a series
+    r = np.full_like(x, np.nan)
+    big = np.zeros(x.shape, dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r[1:] = filled[1:] / filled[:-1] - 1
+        r[~inside] = np.nan
+        cand = np.abs(r) > max_jump
+        if cand.any():
+            after = (window - 1) // 2
+            need = _spread(cand, window - 1 - after, after)   # medians inside candidates' MAD windows
+            med = np.full_like(r, np.nan)
+            med[need] = _window_medians(r, *np.nonzero(need), window)
+            rows, cols = np.nonzero(cand)
+            mad = _window_medians(np.abs(r - med), rows, cols, window)
+            z = (r[rows, cols] - med[rows, cols]) / np.where(mad == 0.0, np.nan, mad)
+            big[rows, cols] = np.abs(z) > z_max
+    iso = big.copy()
+    iso[1:] &= ~big[:-1]
+    iso[:-1] &= ~big[1:]
+    out = x.copy()
+    t, j = np.nonzero(iso)
+    if len(t):
+        last = t == lengths[j] - 1
+        mid = (t > 0) & ~last
+        out[t[mid], j[mid]] = 0.5 * (x[t[mid] - 1, j[mid]] + x[t[mid] + 1, j[mid]])
+        out[t[last], j[last]] = x[t[last] - 1, j[last]]
+        first = t == 0
+        out[t[first], j[first]] = x[t[first] + 1, j[first]]
+    return out, iso
+
+def _tail_context(window: int) -> int:
+    # Rows before a re-evaluated row that still reach it: two stacked windows
+    # (median, then MAD), the isolation check and pct_change.
+    return 2 * (window - 1 - (window - 1) // 2) + 2
+
+def patch_outliers_series(s: pd.Series, max_jump: float = OUTLIER_JUMP_DAILY,
+                          z_max: float = OUTLIER_Z_MAX, window: int = OUTLIER_WINDOW,
+                          tail: int = None) -> pd.Series:
+    """Replace isolated spikes (|return| > max_jump and robust z > z_max) by their neighbours' mean.
+
+    With `tail=k` only the last k rows are evaluated, from just enough raw
+    history before them to give exactly the full-series result for those rows;
+    the k patched rows are returned (for appending to a stored clean series).
+    """
     if s is None or len(s) < 5:
-        return s if s is not None else pd.Series(dtype=float)
-    r = s.pct_change()
-    med = r.rolling(21, center=True, min_periods=8).median()
-    mad = (r - med).abs().rolling(21, center=True, min_periods=8).median()
-    z = (r - med) / mad.replace(0.0, np.nan)
-    big_abs = r.abs() > max_jump
-    big_z   = z.abs() > 8
-    big = big_abs & big_z
-    iso = big & (~big.shift(1).fillna(False)) & (~big.shift(-1).fillna(False))
+        if s is None:
+            return pd.Series(dtype=float)
+        return s if tail is None else s.iloc[-tail:]
+    if tail is not None:
+        tail = min(int(tail), len(s))
+        part = s.iloc[max(0, len(s) - tail - _tail_context(window)):]
+        return _patch_series(part, max_jump, z_max, window).iloc[-tail:]
+    return _patch_series(s, max_jump, z_max, window)
+
+def _patch_series(s: pd.Series, max_jump: float, z_max: float, window: int) -> pd.Series:
+    x = s.to_numpy(dtype=float).reshape(-1, 1)
+    out, iso = _patch_columns(x, np.array([len(s)]), max_jump, z_max, window)
     if not iso.any():
         return s
     s2 = s.copy()
-    idx = np.where(iso)[0]
-    for i in idx:
-        if 0 < i < len(s2)-1:
-            s2.iloc[i] = 0.5 * (s2.iloc[i-1] + s2.iloc[i+1])
-        else:
-            s2.iloc[i] = s2.iloc[i-1] if i > 0 else s2.iloc[i+1]
+    s2[:] = out[:, 0]
     return s2
 
+def patch_outliers_batch(series: dict, max_jump: float = OUTLIER_JUMP_DAILY,
+                         z_max: float = OUTLIER_Z_MAX, window: int = OUTLIER_WINDOW) -> dict:
+    """patch_outliers_series for many series in one matrix pass (same results, per series)."""
+    todo = {k: s for k, s in series.items() if s is not None and len(s) >= 5}
+    out = dict(series)
+    if not todo:
+        return out
+    lengths = np.array([len(s) for s in todo.values()])
+    x = np.full((lengths.max(), len(todo)), np.nan)
+    for j, s in enumerate(todo.values()):
+        x[:lengths[j], j] = s.to_numpy(dtype=float)
+    patched, iso = _patch_columns(x, lengths, max_jump, z_max, window)
+    for j, (k, s) in enumerate(todo.items()):
+        if iso[:, j].any():
+            s2 = s.copy()
+            s2[:] = patched[:lengths[j], j]
+            out[k] = s2
+    return out
+
+def patch_outliers_frame(df: pd.DataFrame, max_jump: float = OUTLIER_JUMP_DAILY,
+                         z_max: float = OUTLIER_Z_MAX, window: int = OUTLIER_WINDOW) -> pd.DataFrame:
+    """Patch every column of a dates x tickers price grid (NaN = no bar) at once.
+
+    Each column is treated as its own series of bars, exactly as
+    patch_outliers_series(df[col].dropna()) would.
+    """
+    values = df.to_numpy(dtype=float)
+    mask = ~np.isnan(values)
+    order = np.argsort(~mask, axis=0, kind="stable")    # each column's bars first, in date order
+    compact = np.take_along_axis(values, order, axis=0)
+    lengths = mask.sum(axis=0)
+    patched, iso = _patch_columns(compact, lengths, max_jump, z_max, window)
+    iso &= (lengths >= 5)[None, :]
+    if not iso.any():
+        return df
+    compact = np.where(iso, patched, compact)
+    out = np.empty_like(values)
+    np.put_along_axis(out, order, compact, axis=0)
+    return pd.DataFrame(out, index=df.index, columns=df.columns)
+
+def _clean_daily_series_map(frames: dict, tickers) -> dict:
+    """{ticker: (cleaned daily series, last factor)} from raw bar frames; outliers are patched in one batch."""
+    daily = {t: daily_close_series_from_raw(frames.get(t)) for t in tickers}
+    out = patch_outliers_batch({t: s for t, s in daily.items() if len(s)})
+    res = {}
+    for t in tickers:
+        s = out.get(t, pd.Series(dtype=float))
+        s.name = t
+        res[t] = (s, _last_factor(frames.get(t)))
+    return res
+
+def _extend_start(n: int, window: int = OUTLIER_WINDOW) -> tuple:
+    """(first row to re-evaluate, first raw row needed) for a clean series of n rows gaining bars.
+
+    New bars, and a revised last bar, reach back 2*after+1 rows through the
+    centered MAD window and the isolation check; those rows need
+    _tail_context(window) raw rows of their own.
+    """
+    s0 = max(0, n - 2 * ((window - 1) // 2) - 2)
+    return s0, max(0, s0 - _tail_context(window))
+
+def _extend_tail(base: pd.Series, factor: float, raw: pd.DataFrame):
+    """(days, adjusted daily closes, last factor) of the raw tail that extends `base`.
+
+    `raw` holds the raw bars from base's row _extend_start(len(base))[1] on; the
+    values are exactly what daily_close_series_from_raw gives for those rows
+    of the full history. None when the tail alone cannot decide that: it opens
+    without a factor to carry forward, the factor at the stored last day moved
+    (a corporate action re-adjusted history), or stored rows are missing.
+    """
+    if raw is None or raw.empty:
+        return None
+    c = raw["Close"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f = raw["AdjClose"].to_numpy(dtype=float) / c
+    f[np.isinf(f)] = np.nan
+    if np.isnan(f[0]):
+        return None     # a leading gap is filled from bars before the tail (ffill) or after it (bfill)
+    f = f[np.maximum.accumulate(np.where(np.isnan(f), 0, np.arange(len(f))))]   # ffill
+    adj = c * f
+    ok = ~np.isnan(adj)
+    days = raw.index.values.astype("datetime64[D]")[ok]
+    adj, f = adj[ok], f[ok]
+    keep = np.r_[days[1:] != days[:-1], True]     # the last bar of each day
+    days, adj, f = days[keep], adj[keep], f[keep]
+    last = base.index[-1].to_datetime64().astype("datetime64[D]")
+    at = np.searchsorted(days, last)
+    stored = base.index.values[_extend_start(len(base))[1]:].astype("datetime64[D]")
+    if at >= len(days) or days[at] != last or f[at] != factor or not np.array_equal(days[:at + 1], stored):
+        return None
+    return days, adj, float(f[-1])
+
+def _extend_clean_series_map(session, bases: dict, max_jump: float = OUTLIER_JUMP_DAILY,
+                             z_max: float = OUTLIER_Z_MAX, window: int = OUTLIER_WINDOW) -> dict:
+    """{ticker: (series, factor)} for the stored (series, factor) bases that can be extended.
+
+    Only the tails are loaded (one query per distinct tail start) and patched
+    together in one matrix pass; the stored rows before the re-evaluated ones
+    are reused as they are, so the result equals a full rebuild.
+    """
+    starts = {}
+    for k, (s, _) in bases.items():
+        if len(s) >= 5:
+            starts.setdefault(s.index[_extend_start(len(s), window)[1]], []).append(k)
+    tails = {}
+    for start, keys in starts.items():
+        raw = get_price_frames(session, keys, start=start, columns=["Close", "AdjClose"])
+        for k in keys:
+            tail = _extend_tail(*bases[k], raw.get(k))
+            if tail is not None:
+                tails[k] = tail
+    if not tails:
+        return {}
+    lengths = np.array([len(days) for days, _, _ in tails.values()])
+    x = np.full((lengths.max(), len(tails)), np.nan)
+    for j, (_, adj, _) in enumerate(tails.values()):
+        x[:lengths[j], j] = adj
+    patched, _ = _patch_columns(x, lengths, max_jump, z_max, window)
+    out = {}
+    for j, (k, (days, _, factor)) in enumerate(tails.items()):
+        base = bases[k][0]
+        s0, i0 = _extend_start(len(base), window)
+        idx = pd.DatetimeIndex(np.concatenate([base.index.values[:s0], days[s0 - i0:].astype("datetime64[ns]")]),
+                               name=base.index.name)
+        vals = np.concatenate([base.to_numpy(dtype=float)[:s0], patched[s0 - i0:lengths[j], j]])
+        out[k] = (pd.Series(vals, index=idx, name=base.name), factor)
+    return out
+
 def daily_price_series(session, ticker: str) -> pd.Series:
-    df = get_price_df(session, ticker)
-    if df is None or df.empty:
-        return pd.Series(dtype=float, name=ticker)
-    s = daily_close_series_from_raw(df)
-    s = patch_outliers_series(s)
-    s.name = ticker
-    return s
+    return daily_price_series_map(session, [ticker])[ticker]
+
+def daily_price_series_map(session, tickers) -> dict:
+    """Cleaned daily series for many tickers.
+
+    Lookup order: in-process cache, then the persisted clean_series store, then
+    the raw bars. A stale copy (cached or stored) whose history has only been
+    extended since is brought up to date from the bars after it, re-patching
+    just the rows the new bars reach; the rest (and any copy whose last-day
+    adjustment factor moved) is rebuilt from full history in one bulk query.
+    Updated series are written back to the store.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    out, missing = {}, {}
+    versions = ticker_versions(tickers)   # read before loading: a concurrent write only causes a later miss
+    for t in tickers:
+        key = t.upper().strip()
+        ver = versions[key][0]
+        hit = _series_cache.get(key, version=ver)
+        if hit is None:
+            missing[t] = (key, ver)
+        else:
+            out[t] = hit[0]
+    if missing:
+        keys = list(dict.fromkeys(k for k, _ in missing.values()))
+        stored = get_clean_series(session, keys, CLEAN_PARAMS)
+        done, bases = {}, {}
+        for k in keys:
+            _, s, factor, current = stored.get(k, (0, None, None, False))
+            if current:
+                done[k] = (s, factor)
+                continue
+            cached = _series_cache.peek(k)
+            if cached is not None and cached[1] is not None and cached[1] >= versions[k][1]:
+                bases[k] = cached[0]
+            elif s is not None:
+                bases[k] = (s, factor)
+        fresh = _extend_clean_series_map(session, bases) if bases else {}
+        rebuild = [k for k in keys if k not in done and k not in fresh]
+        if rebuild:
+            raw = get_price_frames(session, rebuild, columns=["Close", "AdjClose"])
+            fresh.update(_clean_daily_series_map(raw, rebuild))
+        if fresh:
+            put_clean_series(session, {k: (stored[k][0],) + v for k, v in fresh.items() if k in stored}, CLEAN_PARAMS)
+            done.update(fresh)
+        for t, (key, ver) in missing.items():
+            if done[key][0] is not None:
+                done[key][0].values.flags.writeable = False
+            _series_cache.put(key, done[key], version=ver)
+            out[t] = done[key][0]
+    # Shallow copies: callers get their own name/index wrapper over the shared cached data, which
+    # is read-only, so an in-place edit raises instead of corrupting the cache (copy to modify).
+    res = {}
+    for t in tickers:
+        s = out[t].copy(deep=False)
+        s.name = t
+        res[t] = s
+    return res
+
+def series_cache_stats() -> dict:
+    return _series_cache.stats()
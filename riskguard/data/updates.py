@@ -1,41 +1,76 @@
 # riskguard/data/updates.py
 import logging
+import time
 import numpy as np
 import pandas as pd
 
-try:
-    import yfinance as yf
-    HAVE_YF = True
-except Exception:
-    HAVE_YF = False
-
-from ..config import UPDATE_SKIP_JUMP
-from .normalize import normalize_price_frame
-from ..db.repo import get_price_df, bulk_upsert_prices
+from ..config import UPDATE_BATCH_SIZE
+from .guards import jump_guard
+from .providers import get_provider
+from ..db.repo import last_bars, bulk_upsert_price_frames
 
 log = logging.getLogger("riskguard.data.updates")
 
-def update_latest_prices(session, tickers):
-    """Daily-only; upsert last day; skip suspicious jumps."""
-    if not HAVE_YF:
-        return
-    for t in tickers:
-        try:
-            df = yf.download(t, period="12d", interval="1d",
-                             auto_adjust=False, progress=False, threads=False)
-            if not isinstance(df, pd.DataFrame) or df.empty:
+def _last_bars(frames: dict) -> dict:
+    """Last bar per ticker; provider frames are already normalized (sorted, canonical columns)."""
+    return {t: df.tail(1) for t, df in frames.items() if df is not None and not df.empty}
+
+def _drop_unchanged(bars: dict, last: pd.DataFrame) -> dict:
+    """Bars identical to the stored last bar (date, close and adjusted close) are not rewritten
+    (keeps data versions stable); a restated AdjClose alone is written."""
+    out = {}
+    for t, df in bars.items():
+        if t in last.index and df.index[-1] == last.at[t, "Date"]:
+            close, adj = float(df["Close"].iloc[-1]), float(df["AdjClose"].iloc[-1])
+            stored = last.at[t, "AdjClose"]
+            if close == last.at[t, "Close"] and (adj == stored or (np.isnan(adj) and np.isnan(stored))):
                 continue
-            df = normalize_price_frame(df).tail(1)
-            hist = get_price_df(session, t)
-            if not hist.empty:
-                last_close = float(hist["Close"].iloc[-1])
-                new_close  = float(df["Close"].iloc[-1])
-                if np.isfinite(last_close) and last_close > 0:
-                    jump = abs(new_close / last_close - 1.0)
-                    if jump > UPDATE_SKIP_JUMP:
-                        log.warning("Skipping suspicious bar %s: %.4f -> %.4f (%.1f%%)",
-                                    t, last_close, new_close, 100*jump)
-                        continue
-            bulk_upsert_prices(session, t, df, adj_col_exists=True)
+        out[t] = df
+    return out
+
+def update_latest_prices(session, tickers, batch_size: int = UPDATE_BATCH_SIZE) -> dict:
+    """Daily-only; upsert last day per symbol in batches; skip suspicious jumps.
+
+    One multi-symbol download per batch, one query for all stored last closes,
+    and a single upsert transaction for every accepted bar. Returns a summary
+    with per-batch timings and the number of skipped bars.
+    """
+    summary = {"written": 0, "skipped": 0, "batches": []}
+    provider = get_provider()
+    if not provider.available:
+        return summary
+    tickers = list(dict.fromkeys(t.upper().strip() for t in tickers if t))
+    if not tickers:
+        return summary
+    t0 = time.perf_counter()
+    last = last_bars(session, tickers)
+    lookup_s = time.perf_counter() - t0
+
+    accepted = {}
+    for i in range(0, len(tickers), batch_size):
+        batch = tickers[i:i+batch_size]
+        t0 = time.perf_counter()
+        try:
+            frames = provider.history_many(batch, period="12d", interval="1d")
         except Exception as e:
-            log.info("update_latest_prices failed %s: %s", t, e)
+            log.info("update_latest_prices download failed %s: %s", batch, e)
+            frames = {}
+        t1 = time.perf_counter()
+        ok, skipped = jump_guard(_drop_unchanged(_last_bars(frames), last), last["Close"])
+        accepted.update(ok)
+        stats = {"size": len(batch), "download_s": t1 - t0, "guard_s": time.perf_counter() - t1,
+                 "accepted": len(ok), "skipped": len(skipped)}
+        summary["batches"].append(stats)
+        summary["skipped"] += len(skipped)
+        log.info("update batch %d: %d symbols, download %.2fs, guard %.3fs, %d accepted, %d skipped",
+                 len(summary["batches"]), len(batch), stats["download_s"], stats["guard_s"],
+                 len(ok), len(skipped))
+
+    t0 = time.perf_counter()
+    try:
+        summary["written"] = bulk_upsert_price_frames(session, accepted, adj_col_exists=True)
+    except Exception as e:
+        session.rollback()
+        log.info("update_latest_prices upsert failed: %s", e)
+    summary["lookup_s"], summary["upsert_s"] = lookup_s, time.perf_counter() - t0
+    return summary
@@ -0,0 +1,209 @@
+# riskguard/db/archive.py
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+from urllib.parse import quote, unquote
+import numpy as np
+import pandas as pd
+from ..config import ARCHIVE_DIR
+
+log = logging.getLogger("riskguard.db.archive")
+
+COLUMNS = ("open", "high", "low", "close", "volume", "adj_close")
+_EPOCH = np.datetime64(0, "D")
+
+def to_days(index) -> np.ndarray:
+    """int32 days since 1970-01-01 for timestamps (time of day is dropped)."""
+    return (pd.DatetimeIndex(index).values.astype("datetime64[D]") - _EPOCH).astype(np.int32)
+
+def from_days(days: np.ndarray) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(np.asarray(days).astype("datetime64[D]").astype("datetime64[ns]"), name="Date")
+
+def _day(ts) -> int:
+    return int(to_days([pd.Timestamp(ts).tz_localize(None)])[0])
+
+class PriceArchive:
+    """Append-only, memory-mapped column files per symbol.
+
+    <root>/<TICKER>/days.i4 holds sorted int32 epoch days (the date index) and
+    <column>.f8 one float64 per day for each of COLUMNS. Reads are read-only
+    np.memmap views sliced by binary search on the days, so nothing is parsed
+    or copied. Bars after the last stored day are appended (columns first, days
+    last, so readers never see a day without its values; len(days) is the
+    committed length, and a crash mid-append leaves a tail the next append
+    truncates away); anything else rewrites the symbol into a fresh directory
+    that is swapped in as a unit.
+    Single writer (the refresher / import tool); any number of readers.
+    """
+
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+        self._maps = {}    # path -> ((inode, size), memmap)
+        self._lock = threading.Lock()
+
+    def _dir(self, ticker: str) -> str:
+        return os.path.join(self.root, quote(ticker.upper().strip(), safe=""))
+
+    def _map(self, path: str, dtype) -> np.ndarray:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return np.empty(0, dtype)
+        n = st.st_size // np.dtype(dtype).itemsize
+        if n == 0:
+            return np.empty(0, dtype)
+        key = (st.st_ino, st.st_size)
+        with self._lock:
+            hit = self._maps.get(path)
+            if hit is None or hit[0] != key:
+                hit = self._maps[path] = (key, np.memmap(path, dtype=dtype, mode="r", shape=(n,)).view(np.ndarray))
+        return hit[1]
+
+    def tickers(self) -> list:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(unquote(d) for d in os.listdir(self.root)
+                      if not d.endswith((".new", ".old")) and os.path.exists(os.path.join(self.root, d, "days.i4")))
+
+    def days(self, ticker: str) -> np.ndarray:
+        return self._map(os.path.join(self._dir(ticker), "days.i4"), np.int32)
+
+    def range(self, ticker: str) -> tuple:
+        """(first, last) stored day as Timestamps, or (None, None)."""
+        days = self.days(ticker)
+        if not len(days):
+            return None, None
+        return tuple(from_days(days[[0, -1]]))
+
+    def read(self, ticker: str, start=None, end=None, columns=COLUMNS) -> tuple:
+        """(days, {column: values}) views for bars in [start, end] (inclusive)."""
+        d, days = self._dir(ticker), self.days(ticker)
+        lo = 0 if start is None else int(np.searchsorted(days, _day(start), "left"))
+        hi = len(days) if end is None else int(np.searchsorted(days, _day(end), "right"))
+        cols = {c: self._map(os.path.join(d, c + ".f8"), np.float64)[lo:hi] for c in columns}
+        return days[lo:hi], cols
+
+    def _truncate(self, d: str, n: int):
+        """Cut every file of a symbol back to `n` committed bars (drops a torn append)."""
+        torn = False
+        for name, size in [("days.i4", 4)] + [(c + ".f8", 8) for c in COLUMNS]:
+            path = os.path.join(d, name)
+            if os.path.exists(path) and os.path.getsize(path) > n * size:
+                os.truncate(path, n * size)
+                torn = True
+        if torn:
+            log.warning("archive: dropped an interrupted append in %s (kept %d bars)", d, n)
+
+    def write(self, ticker: str, index: pd.DatetimeIndex, cols: dict):
+        """Upsert bars (`cols` maps every name in COLUMNS to values aligned with `index`).
+
+        `index` need not be sorted; for a day given more than once the last bar wins.
+        """
+        days = to_days(index)
+        # Sort (stable, so input order still decides among a day's bars) and keep one bar
+        # per day, the last one (same as a re-upsert of the same key).
+        order = np.argsort(days, kind="stable")
+        days = days[order]
+        last = np.r_[days[1:] != days[:-1], True]
+        days, cols = days[last], {c: np.asarray(cols[c], dtype=np.float64)[order[last]] for c in COLUMNS}
+        if not len(days):
+            return
+        d = self._dir(ticker)
+        old = self.days(ticker)
+        if not len(old) or days[0] > old[-1]:
+            os.makedirs(d, exist_ok=True)
+            self._truncate(d, len(old))
+            for c in COLUMNS:
+                with open(os.path.join(d, c + ".f8"), "ab") as f:
+                    f.write(cols[c].tobytes())
+            with open(os.path.join(d, "days.i4"), "ab") as f:
+                f.write(days.tobytes())
+            return
+        _, cur = self.read(ticker)
+        merged = np.union1d(old, days)
+        pos_old, pos_new = np.searchsorted(merged, old), np.searchsorted(merged, days)
+        out = {}
+        for c in COLUMNS:
+            v = np.empty(len(merged))
+            v[pos_old] = cur[c]
+            v[pos_new] = cols[c]
+            out[c] = v
+        self._swap(ticker, merged.astype(np.int32), out)
+
+    def _swap(self, ticker: str, days: np.ndarray, cols: dict):
+        d = self._dir(ticker)
+        new, old = d + ".new", d + ".old"
+        shutil.rmtree(new, ignore_errors=True)
+        os.makedirs(new)
+        for c in COLUMNS:
+            cols[c].astype(np.float64).tofile(os.path.join(new, c + ".f8"))
+        days.tofile(os.path.join(new, "days.i4"))
+        shutil.rmtree(old, ignore_errors=True)
+        os.rename(d, old)
+        os.rename(new, d)
+        shutil.rmtree(old, ignore_errors=True)   # open maps keep their (unlinked) files
+
+    def delete(self, ticker: str):
+        shutil.rmtree(self._dir(ticker), ignore_errors=True)
+
+    def read_clean(self, ticker: str) -> tuple:
+        """(meta, days, values) of the stored cleaned series, or (None, None, None)."""
+        d = self._dir(ticker)
+        try:
+            with open(os.path.join(d, "clean.json")) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None, None, None
+        days = self._map(os.path.join(d, "clean.days.i4"), np.int32)
+        vals = self._map(os.path.join(d, "clean.f8"), np.float64)
+        if len(days) != meta.get("n") or len(vals) != meta.get("n"):
+            return None, None, None   # mid-rewrite: treat as stale
+        return meta, days, vals
+
+    def write_clean(self, ticker: str, meta: dict, days: np.ndarray, values: np.ndarray):
+        d = self._dir(ticker)
+        os.makedirs(d, exist_ok=True)
+        for name, arr in (("clean.days.i4", days.astype(np.int32)), ("clean.f8", values.astype(np.float64))):
+            arr.tofile(os.path.join(d, name + ".tmp"))
+            os.replace(os.path.join(d, name + ".tmp"), os.path.join(d, name))
+        with open(os.path.join(d, "clean.json.tmp"), "w") as f:
+            json.dump(dict(meta, n=int(len(days))), f)
+        os.replace(os.path.join(d, "clean.json.tmp"), os.path.join(d, "clean.json"))
+
+    def delete_clean(self, ticker: str):
+        try:
+            os.remove(os.path.join(self._dir(ticker), "clean.json"))   # the data files are ignored without it
+        except FileNotFoundError:
+            pass
+
+_archive = None
+
+def price_archive() -> PriceArchive:
+    global _archive
+    if _archive is None:
+        _archive = PriceArchive()
+    return _archive
+
+def main(argv=None):
+    """python -m riskguard.db.archive {export,import} [--root DIR] [--tickers ...]"""
+    from .base import SessionLocal, init_db, ensure_schema
+    from .repo import export_archive, import_archive
+    ap = argparse.ArgumentParser(prog="python -m riskguard.db.archive",
+                                 description="Copy daily bars between the SQLite DB and a column-file archive.")
+    ap.add_argument("action", choices=["export", "import"], help="export: SQLite -> archive; import: archive -> SQLite")
+    ap.add_argument("--root", default=ARCHIVE_DIR, help="archive directory (default: %(default)s)")
+    ap.add_argument("--tickers", nargs="*", help="only these symbols (default: all)")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    init_db(); ensure_schema()
+    arc = PriceArchive(args.root)
+    with SessionLocal() as s:
+        fn = export_archive if args.action == "export" else import_archive
+        n = fn(s, arc, args.tickers)
+    log.info("%s: %d bars", args.action, n)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 # riskguard/db/base.py
 import logging
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
-from .models import Base
-from ..config import DATABASE_URL
+from .models import Base, DailyBar
+from ..config import DATABASE_URL, SQLITE_PRAGMAS
+from .storage import price_layout
 
 log = logging.getLogger("riskguard.db")
 
@@ -13,25 +14,85 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(bind=engine)
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for name, value in SQLITE_PRAGMAS.items():
+                cur.execute(f"PRAGMA {name}={value}")
+        finally:
+            cur.close()
+
+def _table_exists(conn, name: str) -> bool:
+    return conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).first() is not None
+
 def init_db():
-    Base.metadata.create_all(engine)
-    with engine.begin() as conn:
-        conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_prices_symbol_dt ON prices(symbol_id, dt)")
+    layout = price_layout()
+    unused = {"rows": "prices_daily", "compact": "prices"}[layout.name]
+    Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name != unused])
+    if layout.name == "rows":
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_prices_symbol_dt ON prices(symbol_id, dt)")
+
+def _columns(conn, table: str) -> list:
+    return [r[1] for r in conn.exec_driver_sql(f"PRAGMA table_info({table})").fetchall()]
 
 def ensure_schema() -> bool:
-    """Ensure 'adj_close' column exists on prices."""
+    """Ensure 'adj_close' on prices, 'raw_version'/'reset_version' on symbol_sync and 'factor' on clean_series."""
     with engine.connect() as conn:
-        cols = [r[1] for r in conn.exec_driver_sql("PRAGMA table_info(prices)").fetchall()]
-        if "adj_close" not in cols:
+        if _table_exists(conn, "prices") and "adj_close" not in _columns(conn, "prices"):
             conn.exec_driver_sql("ALTER TABLE prices ADD COLUMN adj_close FLOAT")
             log.info("Added prices.adj_close column.")
+        if "raw_version" not in _columns(conn, "symbol_sync"):
+            conn.exec_driver_sql("ALTER TABLE symbol_sync ADD COLUMN raw_version INTEGER DEFAULT 0")
+            log.info("Added symbol_sync.raw_version column.")
+        if "reset_version" not in _columns(conn, "symbol_sync"):
+            conn.exec_driver_sql("ALTER TABLE symbol_sync ADD COLUMN reset_version INTEGER DEFAULT 0")
+            log.info("Added symbol_sync.reset_version column.")
+        if _table_exists(conn, "clean_series") and "factor" not in _columns(conn, "clean_series"):
+            conn.exec_driver_sql("ALTER TABLE clean_series ADD COLUMN factor FLOAT")
+            log.info("Added clean_series.factor column.")
     return True
 
 def repair_adjclose_column():
     """Backfill adj_close with close where missing/zero."""
+    table = price_layout().table
     with engine.begin() as conn:
-        conn.exec_driver_sql("""
-            UPDATE prices
+        # Repaired bars rewrite history: invalidate cached and persisted cleaned series.
+        conn.exec_driver_sql(f"""
+            UPDATE symbol_sync SET raw_version = COALESCE(raw_version, 0) + 1,
+                                   reset_version = COALESCE(raw_version, 0) + 1
+            WHERE symbol_id IN (SELECT DISTINCT symbol_id FROM {table} WHERE adj_close IS NULL OR adj_close = 0)
+        """)
+        conn.exec_driver_sql(f"""
+            UPDATE {table}
             SET adj_close = close
             WHERE adj_close IS NULL OR adj_close = 0
         """)
+
+def migrate_compact_storage() -> int:
+    """Move legacy `prices` rows into the compact `prices_daily` table; returns rows moved.
+
+    Intraday timestamps collapse onto their day (the last one wins). The legacy
+    table and its index are dropped and the file is vacuumed to release the space.
+    No-op unless PRICE_STORAGE="compact" and a legacy table is present.
+    """
+    if price_layout().name != "compact":
+        return 0
+    with engine.begin() as conn:
+        if not _table_exists(conn, "prices"):
+            return 0
+        DailyBar.__table__.create(conn, checkfirst=True)
+        n = conn.exec_driver_sql("""
+            INSERT OR REPLACE INTO prices_daily (symbol_id, day, open, high, low, close, volume, adj_close)
+            SELECT symbol_id, CAST(julianday(dt) - 2440587.5 AS INTEGER), open, high, low, close,
+                   COALESCE(volume, 0.0), COALESCE(NULLIF(adj_close, 0), close)
+            FROM prices ORDER BY symbol_id, dt
+        """).rowcount
+        conn.exec_driver_sql("DROP INDEX IF EXISTS idx_prices_symbol_dt")
+        conn.exec_driver_sql("DROP TABLE prices")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+    log.info("Migrated %d price rows to compact storage.", n)
+    return n
@@ -1,6 +1,6 @@
 # riskguard/db/models.py
 from sqlalchemy.orm import declarative_base, relationship
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, Float, String, DateTime, LargeBinary, ForeignKey, UniqueConstraint
 
 Base = declarative_base()
 
@@ -26,6 +26,47 @@ class Price(Base):
     symbol = relationship("Symbol", back_populates="prices")
     __table_args__ = (UniqueConstraint("symbol_id", "dt", name="_symbol_dt_uc"),)
 
+class DailyBar(Base):
+    """Compact layout (PRICE_STORAGE="compact"): one clustered row per (symbol, day)."""
+    __tablename__ = "prices_daily"
+    symbol_id = Column(Integer, ForeignKey("symbols.id"), primary_key=True)
+    day = Column(Integer, primary_key=True)   # days since 1970-01-01
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float, nullable=False)
+    volume = Column(Float, default=0.0)
+    adj_close = Column(Float)
+    __table_args__ = {"sqlite_with_rowid": False}
+
+class SymbolSync(Base):
+    """Per-symbol history sync state: stored bar range and last successful sync."""
+    __tablename__ = "symbol_sync"
+    symbol_id = Column(Integer, ForeignKey("symbols.id"), primary_key=True)
+    first_dt = Column(DateTime)
+    last_dt = Column(DateTime)
+    last_sync_at = Column(DateTime)
+    source = Column(String, default="")
+    raw_version = Column(Integer, default=0)   # bumped on every write of the symbol's bars
+    reset_version = Column(Integer, default=0) # raw_version of the last write that rewrote (not just extended) them
+
+class CleanSeries(Base):
+    """Persisted cleaned daily series, tagged with the raw version and cleaning params it came from."""
+    __tablename__ = "clean_series"
+    symbol_id = Column(Integer, ForeignKey("symbols.id"), primary_key=True)
+    raw_version = Column(Integer, nullable=False)
+    params = Column(String, nullable=False)
+    days = Column(LargeBinary, nullable=False)     # int32 days since 1970-01-01
+    closes = Column(LargeBinary, nullable=False)   # float64
+    factor = Column(Float)                         # AdjClose/Close factor of the last bar
+
+class RiskState(Base):
+    """Checkpoint of a book's online risk statistics (risk/online.py), valid for one holdings fingerprint."""
+    __tablename__ = "risk_state"
+    name = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    data = Column(LargeBinary, nullable=False)     # np.savez archive
+
 class Position(Base):
     __tablename__ = "positions"
     id = Column(Integer, primary_key=True)
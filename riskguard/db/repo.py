@@ -1,12 +1,21 @@
 # riskguard/db/repo.py
+import logging
+from itertools import chain
+from datetime import datetime
 import numpy as np
 import pandas as pd
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 from .base import SessionLocal
-from .models import Symbol, Price, Position
-from ..data.fetch import fetch_history, fetch_history_real
+from .models import Symbol, Position, SymbolSync
+from .archive import price_archive, from_days, to_days
+from .storage import price_layout
+from ..config import PRICE_BACKEND, SYNC_BATCH_SIZE
+from ..data.fetch import simulate_history
+from ..data.providers import get_provider
 from ..data.normalize import normalize_price_frame
 
+log = logging.getLogger("riskguard.db.repo")
+
 def upsert_symbol(session, ticker: str) -> Symbol:
     t = ticker.upper().strip()
     sym = session.query(Symbol).filter(Symbol.ticker == t).one_or_none()
@@ -15,70 +24,442 @@ def upsert_symbol(session, ticker: str) -> Symbol:
         session.add(sym); session.commit()
     return sym
 
-def bulk_upsert_prices(session, ticker: str, df: pd.DataFrame, adj_col_exists: bool = True):
-    df = normalize_price_frame(df)
-    if df is None or df.empty:
-        return
-    sym = upsert_symbol(session, ticker)
-
-    if adj_col_exists:
-        sql = """
-        INSERT INTO prices (symbol_id, dt, open, high, low, close, volume, adj_close)
-        VALUES (:sid, :dt, :open, :high, :low, :close, :volume, :adj_close)
-        ON CONFLICT(symbol_id, dt) DO UPDATE SET
+_UPSERT_SQL = {
+    True: """
+        INSERT INTO {table} (symbol_id, {key}, open, high, low, close, volume, adj_close)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(symbol_id, {key}) DO UPDATE SET
             open = excluded.open, high = excluded.high, low  = excluded.low,
             close= excluded.close, volume = excluded.volume, adj_close = excluded.adj_close
-        """
-    else:
-        sql = """
-        INSERT INTO prices (symbol_id, dt, open, high, low, close, volume)
-        VALUES (:sid, :dt, :open, :high, :low, :close, :volume)
-        ON CONFLICT(symbol_id, dt) DO UPDATE SET
+        """,
+    False: """
+        INSERT INTO {table} (symbol_id, {key}, open, high, low, close, volume)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(symbol_id, {key}) DO UPDATE SET
             open = excluded.open, high = excluded.high, low  = excluded.low,
             close= excluded.close, volume = excluded.volume
-        """
-
-    recs = []
-    for dt_, o, h, l, c, adj, v in df[["Open","High","Low","Close","AdjClose","Volume"]].itertuples(index=True, name=None):
-        recs.append({
-            "sid": sym.id,
-            "dt": pd.Timestamp(dt_).to_pydatetime().replace(tzinfo=None),
-            "open": float(o) if pd.notna(o) else float(c),
-            "high": float(h) if pd.notna(h) else float(c),
-            "low":  float(l) if pd.notna(l) else float(c),
-            "close": float(c),
-            "volume": float(v) if pd.notna(v) else 0.0,
-            "adj_close": float(adj) if pd.notna(adj) else float(c),
-        })
-    if recs:
-        session.execute(text(sql), recs)
-        session.commit()
+        """,
+}
 
-def ensure_history(session, tickers):
+# raw_version is the persistent watermark derived data (clean_series) is checked against.
+_SYNC_RANGE_SQL = """
+    INSERT INTO symbol_sync (symbol_id, first_dt, last_dt, source, raw_version)
+    VALUES (:sid, {lo}, {hi}, '', 1)
+    ON CONFLICT(symbol_id) DO UPDATE SET first_dt = excluded.first_dt, last_dt = excluded.last_dt,
+        raw_version = COALESCE(symbol_sync.raw_version, 0) + 1
+"""
+
+def _range_sql(layout) -> dict:
+    # Stored range is re-read from the (symbol_id, date) key, so it is exact even for older DBs.
+    return {"table": layout.table, "lo": layout.text_sql(f"MIN({layout.key})"),
+            "hi": layout.text_sql(f"MAX({layout.key})")}
+
+def _archive():
+    """The column-file archive when PRICE_BACKEND="archive", else None (SQLite)."""
+    return price_archive() if PRICE_BACKEND == "archive" else None
+
+def _symbol_id_map(session, tickers) -> dict:
+    """{ticker: id}, creating missing symbols without committing."""
+    ids = {t: sid for sid, t in _symbol_ids(session, tickers).items()}
+    missing = [t for t in dict.fromkeys(tickers) if t not in ids]
+    if missing:
+        syms = [Symbol(ticker=t, name=t) for t in missing]
+        session.add_all(syms); session.flush()
+        ids.update({s.ticker: s.id for s in syms})
+    return ids
+
+def _price_columns(df: pd.DataFrame, adj_col_exists: bool = True) -> dict:
+    """Stored columns built column-wise (NaN O/H/L/AdjClose -> Close, Volume -> 0)."""
+    c = df["Close"].to_numpy(dtype=float)
+    cols = {k.lower(): np.where(np.isnan(x), c, x)
+            for k, x in ((k, df[k].to_numpy(dtype=float)) for k in ("Open", "High", "Low"))}
+    cols["close"], cols["volume"] = c, np.nan_to_num(df["Volume"].to_numpy(dtype=float), nan=0.0)
+    if adj_col_exists:
+        adj = df["AdjClose"].to_numpy(dtype=float)
+        cols["adj_close"] = np.where(np.isnan(adj), c, adj)
+    return cols
+
+def _write_bars(session, ids: dict, frames: dict, adj_col_exists: bool, arc) -> int:
+    """Write normalized frames to the archive or the SQLite price table and refresh sync ranges."""
+    n = sum(len(df) for df in frames.values())
+    if arc is not None:
+        for t, df in frames.items():
+            cols = _price_columns(df, True)
+            if not adj_col_exists:
+                cols["adj_close"] = cols["close"]
+            arc.write(t, df.index, cols)
+        ranges = [dict(zip(("sid", "lo", "hi"), (ids[t],) + tuple(str(x) for x in arc.range(t)))) for t in frames]
+        session.execute(text(_SYNC_RANGE_SQL.format(lo=":lo", hi=":hi")), ranges)
+        return n
+    layout = price_layout()
+    upsert = _UPSERT_SQL[adj_col_exists].format(table=layout.table, key=layout.key)
+    names = ["open", "high", "low", "close", "volume"] + (["adj_close"] if adj_col_exists else [])
+    rng = _range_sql(layout)
+    sync = _SYNC_RANGE_SQL.format(lo="(SELECT {lo} FROM {table} WHERE symbol_id = :sid)".format(**rng),
+                                  hi="(SELECT {hi} FROM {table} WHERE symbol_id = :sid)".format(**rng))
+    cur = session.connection().connection.cursor()
+    try:
+        for t, df in frames.items():
+            cols = _price_columns(df, adj_col_exists)
+            cur.executemany(upsert, zip([ids[t]]*len(df), layout.keys(df.index), *(cols[c].tolist() for c in names)))
+        cur.executemany(sync, [{"sid": ids[t]} for t in frames])
+    finally:
+        cur.close()
+    return n
+
+def _history_rewrites(session, ids: dict, frames: dict, arc) -> list:
+    """Tickers whose frames start before their stored last day (history rewritten, not extended).
+
+    Their persisted clean series are dropped in the same transaction: only an
+    extended history can be cleaned incrementally from a stored copy.
+    """
+    sids = {ids[t]: t for t in frames}
+    last = session.execute(text("SELECT symbol_id, last_dt FROM symbol_sync WHERE symbol_id IN ({})".format(
+        ",".join(str(i) for i in sids)))).fetchall()
+    out = [sids[sid] for sid, dt in last
+           if dt is not None and frames[sids[sid]].index[0].normalize() < pd.Timestamp(dt).normalize()]
+    if out:
+        if arc is not None:
+            for t in out:
+                arc.delete_clean(t)
+        else:
+            session.execute(text("DELETE FROM clean_series WHERE symbol_id IN ({})".format(
+                ",".join(str(ids[t]) for t in out))))
+    return out
+
+def _mark_rewrites(session, ids: dict, rewritten):
+    """Record history rewrites in symbol_sync (after the write bumped raw_version), so other
+    processes drop cached series instead of extending them."""
+    if rewritten:
+        session.execute(text("UPDATE symbol_sync SET reset_version = raw_version WHERE symbol_id IN ({})".format(
+            ",".join(str(ids[t]) for t in rewritten))))
+
+def bulk_upsert_price_frames(session, frames: dict, adj_col_exists: bool = True) -> int:
+    """Upsert {ticker: frame} in one transaction; returns the number of rows written.
+
+    Rows go through one prepared executemany on the session's DBAPI connection
+    (or are appended to the column-file archive when that backend is active).
+    """
+    frames = {t.upper().strip(): normalize_price_frame(df) for t, df in frames.items()}
+    frames = {t: df for t, df in frames.items() if df is not None and not df.empty}
+    if not frames:
+        return 0
+    ids = _symbol_id_map(session, list(frames))
+    session.flush()   # pending ORM changes (e.g. sync state) must precede the raw writes
+    arc = _archive()
+    rewritten = _history_rewrites(session, ids, frames, arc)
+    n = _write_bars(session, ids, frames, adj_col_exists, arc)
+    _mark_rewrites(session, ids, rewritten)
+    session.commit()
+    return n
+
+def bulk_upsert_prices(session, ticker: str, df: pd.DataFrame, adj_col_exists: bool = True):
+    bulk_upsert_price_frames(session, {ticker: df}, adj_col_exists)
+
+def _stored_range(session, sid: int, ticker: str) -> tuple:
+    arc = _archive()
+    if arc is not None:
+        return arc.range(ticker)
+    return tuple(session.execute(text("SELECT {lo}, {hi} FROM {table} WHERE symbol_id=:sid".format(
+        **_range_sql(price_layout()))), {"sid": sid}).one())
+
+def _delete_bars(session, sid: int, ticker: str):
+    arc = _archive()
+    if arc is not None:
+        arc.delete(ticker)
+    else:
+        session.execute(text(f"DELETE FROM {price_layout().table} WHERE symbol_id=:sid"), {"sid": sid})
+
+def _sync_states(session, ids: dict) -> dict:
+    """{ticker: SymbolSync}; states for symbols seen for the first time are seeded from prices."""
+    rows = session.query(SymbolSync).filter(SymbolSync.symbol_id.in_(list(ids.values()))).all()
+    by_id = {st.symbol_id: st for st in rows}
+    out = {}
+    for t, sid in ids.items():
+        st = by_id.get(sid)
+        if st is None:
+            lo, hi = _stored_range(session, sid, t)
+            st = SymbolSync(symbol_id=sid, source="")
+            if lo is not None:
+                st.first_dt, st.last_dt = pd.Timestamp(lo).to_pydatetime(), pd.Timestamp(hi).to_pydatetime()
+            session.add(st)
+        out[t] = st
+    return out
+
+def sync_history(session, tickers, period="5y", batch_size: int = SYNC_BATCH_SIZE):
+    """Gap-aware sync: fetch only bars since the last stored one.
+
+    Symbols already synced during the current session day are skipped without any
+    network call. A symbol with no stored bars gets a full `period` download, and
+    the simulated fallback if that fails too (re-tried for real data the next day).
+    Symbols sharing a start date are fetched with one provider call per batch and
+    written in one transaction.
+    """
+    now = datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    tickers = list(dict.fromkeys(x.upper().strip() for x in tickers if x))
+    if not tickers:
+        return
+    ids = _symbol_id_map(session, tickers)
+    states = _sync_states(session, ids)
+    groups = {}
     for t in tickers:
-        df = fetch_history_real(t)
-        if df is None or df.empty:
-            sym = upsert_symbol(session, t)
-            exists = session.query(Price.id).filter(Price.symbol_id == sym.id).limit(1).first()
-            if exists:
+        st = states[t]
+        if st.last_sync_at is not None and st.last_sync_at >= today:
+            continue
+        real_tail = st.last_dt is not None and st.source != "sim"
+        groups.setdefault(st.last_dt if real_tail else None, []).append(t)
+
+    provider = get_provider()
+    for start, group in groups.items():
+        for i in range(0, len(group), batch_size):
+            chunk = group[i:i+batch_size]
+            fetched = provider.history_many(chunk, period=period, start=start)
+            write = {}
+            for t in chunk:
+                st, df = states[t], fetched.get(t)
+                if df is None or df.empty:
+                    if st.last_dt is not None:
+                        if st.source == "sim":
+                            st.last_sync_at = now
+                        continue   # keep what we have; real symbols retry on a later tick
+                    write[t], st.source = simulate_history(t), "sim"
+                else:
+                    if st.source == "sim":
+                        # Real data is back: drop the simulated bars rather than mixing them in.
+                        _delete_bars(session, ids[t], t)
+                    write[t], st.source = df, provider.name
+                st.last_sync_at = now
+            bulk_upsert_price_frames(session, write)
+            session.commit()
+
+def ensure_history(session, tickers):
+    sync_history(session, tickers)
+
+PRICE_COLUMNS = {"Open": "open", "High": "high", "Low": "low", "Close": "close",
+                 "AdjClose": "adj_close", "Volume": "volume"}
+
+def _symbol_ids(session, tickers) -> dict:
+    tickers = sorted({t.upper().strip() for t in tickers if t})
+    if not tickers:
+        return {}
+    q = text("SELECT id, ticker FROM symbols WHERE ticker IN :tickers").bindparams(
+        bindparam("tickers", expanding=True))
+    return {int(sid): t for sid, t in session.execute(q, {"tickers": tickers}).fetchall()}
+
+def get_price_frames(session, tickers, start=None, end=None, columns=None) -> dict:
+    """Bulk-load daily bars for many tickers on one raw cursor, bypassing the ORM.
+
+    Returns {ticker: DataFrame} shaped like get_price_df (missing tickers are omitted).
+    `start`/`end` (inclusive) and `columns` are pushed down into the SQL. With the
+    archive backend the frames wrap read-only memory-mapped column views instead.
+    """
+    cols = list(PRICE_COLUMNS) if columns is None else [c for c in PRICE_COLUMNS if c in columns]
+    arc = _archive()
+    if arc is not None:
+        return _archive_frames(arc, tickers, start, end, cols)
+    return _sql_price_frames(session, tickers, start, end, cols)
+
+def _archive_frames(arc, tickers, start, end, cols) -> dict:
+    out = {}
+    for t in sorted({t.upper().strip() for t in tickers if t}):
+        days, data = arc.read(t, start, end, [PRICE_COLUMNS[c] for c in cols])
+        if len(days):
+            out[t] = pd.DataFrame({c: data[PRICE_COLUMNS[c]] for c in cols}, index=from_days(days),
+                                  columns=cols, copy=False)
+    return out
+
+def _sql_price_frames(session, tickers, start, end, cols) -> dict:
+    ids = _symbol_ids(session, tickers)
+    if not ids:
+        return {}
+
+    layout = price_layout()
+    key = layout.key
+    where, params = ["symbol_id = :sid"], {}
+    if start is not None:
+        where.append(f"{key} >= :start")
+        params["start"] = layout.bound(pd.Timestamp(start).tz_localize(None).normalize())
+    if end is not None:
+        where.append(f"{key} < :end")
+        params["end"] = layout.bound(pd.Timestamp(end).tz_localize(None).normalize() + pd.Timedelta(days=1))
+    width = 1 + (len(cols) or 1)
+    sql = "SELECT {}, {} FROM {} WHERE {} ORDER BY {}".format(
+        layout.days_sql(key), ", ".join(PRICE_COLUMNS[c] for c in cols) or "NULL",
+        layout.table, " AND ".join(where), key)
+
+    # Raw DBAPI cursor, one indexed range scan per symbol: every cell is a REAL, so the
+    # row tuples flatten straight into one preallocated float block (no ORM / Row objects,
+    # no per-row date parsing, no symbol_id column to split on).
+    out = {}
+    cur = session.connection().connection.cursor()
+    try:
+        for sid, ticker in ids.items():
+            cur.execute(sql, {**params, "sid": sid})
+            rows = cur.fetchall()
+            if not rows:
                 continue
-            df = fetch_history(t)
-        bulk_upsert_prices(session, t, df)
+            try:
+                block = np.fromiter(chain.from_iterable(rows), dtype=float, count=len(rows) * width)
+                block = block.reshape(len(rows), width)
+            except TypeError:   # NULL cells (e.g. legacy adj_close): slower path maps them to NaN
+                block = np.array(rows, dtype=float)
+            secs = np.rint(block[:, 0] * 86400.0).astype(np.int64)
+            idx = pd.DatetimeIndex(secs.astype("datetime64[s]").astype("datetime64[ns]"), name="Date")
+            out[ticker] = pd.DataFrame(block[:, 1:1 + len(cols)], index=idx, columns=cols)
+    finally:
+        cur.close()
+    return dict(sorted(out.items()))
 
 def get_price_df(session, ticker: str) -> pd.DataFrame:
-    sym = session.query(Symbol).filter(Symbol.ticker == ticker.upper()).one_or_none()
-    if not sym:
-        return pd.DataFrame()
-    rows = session.query(Price).filter(Price.symbol_id == sym.id).order_by(Price.dt.asc()).all()
+    return get_price_frames(session, [ticker]).get(ticker.upper().strip(), pd.DataFrame())
+
+def last_bars(session, tickers) -> pd.DataFrame:
+    """Date, close and adjusted close of the latest stored bar per ticker, in one aggregate query."""
+    cols = ["Date", "Close", "AdjClose"]
+    arc = _archive()
+    if arc is not None:
+        last = {}
+        for t in sorted({t.upper().strip() for t in tickers if t}):
+            days, data = arc.read(t, columns=["close", "adj_close"])
+            if len(days):
+                last[t] = (from_days(days[-1:])[0], float(data["close"][-1]), float(data["adj_close"][-1]))
+        return pd.DataFrame(list(last.values()), index=list(last), columns=cols)
+    ids = _symbol_ids(session, tickers)
+    if not ids:
+        return pd.DataFrame(columns=cols, dtype=float)
+    layout = price_layout()
+    rows = session.execute(text(
+        "SELECT p.symbol_id, {dt}, p.close, p.adj_close FROM {table} p JOIN ("
+        "  SELECT symbol_id, MAX({key}) AS k FROM {table} WHERE symbol_id IN ({ids}) GROUP BY symbol_id"
+        ") m ON m.symbol_id = p.symbol_id AND m.k = p.{key}".format(
+            dt=layout.text_sql("p." + layout.key), table=layout.table, key=layout.key,
+            ids=",".join(str(i) for i in ids))
+    )).fetchall()
+    return pd.DataFrame({"Date": pd.to_datetime([r[1] for r in rows], format="ISO8601"),
+                         "Close": [float(r[2]) for r in rows],
+                         "AdjClose": [np.nan if r[3] is None else float(r[3]) for r in rows]},
+                        index=[ids[int(r[0])] for r in rows])
+
+def last_closes(session, tickers) -> pd.Series:
+    """Close of the latest stored bar per ticker, in one aggregate query."""
+    return last_bars(session, tickers)["Close"].astype(float)
+
+def get_clean_series(session, tickers, params: str) -> dict:
+    """{ticker: (raw_version, series or None, factor, current)} for known symbols.
+
+    `series` is the stored cleaned copy made under `params` (None when there is
+    none) and `factor` the adjustment factor of its last bar; `current` tells
+    whether it was made from the current raw version. A stale copy is still
+    returned: its history has only been extended since (rewrites drop it).
+    """
+    ids = _symbol_ids(session, tickers)
+    if not ids:
+        return {}
+    arc = _archive()
+    if arc is not None:
+        return _archive_clean_series(session, arc, ids, params)
+    rows = session.execute(text(
+        "SELECT s.id, COALESCE(y.raw_version, 0), c.raw_version, c.params, c.days, c.closes, c.factor "
+        "FROM symbols s LEFT JOIN symbol_sync y ON y.symbol_id = s.id "
+        "LEFT JOIN clean_series c ON c.symbol_id = s.id WHERE s.id IN ({})".format(",".join(str(i) for i in ids))
+    )).fetchall()
+    out = {}
+    for sid, raw_ver, ver, tag, days, closes, factor in rows:
+        t = ids[int(sid)]
+        if ver is None or tag != params or factor is None:
+            out[t] = (raw_ver, None, None, False)
+            continue
+        idx = pd.DatetimeIndex(np.frombuffer(days, dtype=np.int32).astype("datetime64[D]").astype("datetime64[ns]"),
+                               name="Date")
+        s = pd.Series(np.frombuffer(closes, dtype=np.float64).copy(), index=idx, name=t)
+        out[t] = (raw_ver, s, float(factor), ver == raw_ver)
+    return out
+
+def _archive_clean_series(session, arc, ids: dict, params: str) -> dict:
+    raw = dict(session.execute(text(
+        "SELECT symbol_id, COALESCE(raw_version, 0) FROM symbol_sync WHERE symbol_id IN ({})".format(
+            ",".join(str(i) for i in ids)))).fetchall())
+    out = {}
+    for sid, t in ids.items():
+        raw_ver = raw.get(sid, 0)
+        meta, days, vals = arc.read_clean(t)
+        if meta is None or meta.get("params") != params or meta.get("factor") is None:
+            out[t] = (raw_ver, None, None, False)
+        else:
+            out[t] = (raw_ver, pd.Series(vals, index=from_days(days), name=t, copy=False),
+                      float(meta["factor"]), meta.get("raw_version") == raw_ver)
+    return out
+
+def put_clean_series(session, entries: dict, params: str):
+    """Persist {ticker: (raw_version, series, factor)}; a failed write only costs a later recompute."""
+    arc = _archive()
+    if arc is not None:
+        for t, (raw_ver, s, factor) in entries.items():
+            if s is not None:
+                arc.write_clean(t, {"raw_version": raw_ver, "params": params, "factor": factor},
+                                to_days(s.index), s.to_numpy(dtype=np.float64))
+        return
+    ids = {t: sid for sid, t in _symbol_ids(session, entries).items()}
+    rows = []
+    for t, (raw_ver, s, factor) in entries.items():
+        if t not in ids or s is None:
+            continue
+        days = (s.index.values.astype("datetime64[D]") - np.datetime64(0, "D")).astype(np.int32)
+        rows.append({"sid": ids[t], "rv": raw_ver, "p": params, "d": days.tobytes(),
+                     "c": np.ascontiguousarray(s.to_numpy(dtype=np.float64)).tobytes(), "f": factor})
     if not rows:
-        return pd.DataFrame()
-    data = []
-    for r in rows:
-        adj = getattr(r, "adj_close", None)
-        data.append((r.dt, r.open, r.high, r.low, r.close, adj, r.volume))
-    df = pd.DataFrame(data, columns=["Date","Open","High","Low","Close","AdjClose","Volume"]).set_index("Date")
-    df.index = pd.to_datetime(df.index).tz_localize(None)
-    return df
+        return
+    try:
+        session.execute(text(
+            "INSERT OR REPLACE INTO clean_series (symbol_id, raw_version, params, days, closes, factor) "
+            "VALUES (:sid, :rv, :p, :d, :c, :f)"), rows)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        log.info("clean_series write failed: %s", e)
+
+def get_risk_state(session, name: str) -> tuple:
+    """(fingerprint, data) of a checkpointed risk state, or (None, None)."""
+    row = session.execute(text("SELECT fingerprint, data FROM risk_state WHERE name = :n"), {"n": name}).first()
+    return (row[0], bytes(row[1])) if row else (None, None)
+
+def put_risk_state(session, name: str, fingerprint: str, data: bytes):
+    """Checkpoint a risk state; a failed write only costs a rebuild after restart."""
+    try:
+        session.execute(text("INSERT OR REPLACE INTO risk_state (name, fingerprint, data) VALUES (:n, :f, :d)"),
+                        {"n": name, "f": fingerprint, "d": data})
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        log.info("risk_state write failed: %s", e)
+
+def export_archive(session, arc, tickers=None, chunk: int = 200) -> int:
+    """Copy bars from the SQLite price table into `arc`; returns the number of bars."""
+    tickers = tickers or [t for (t,) in session.execute(text("SELECT ticker FROM symbols ORDER BY ticker"))]
+    n = 0
+    for i in range(0, len(tickers), chunk):
+        for t, df in _sql_price_frames(session, tickers[i:i+chunk], None, None, list(PRICE_COLUMNS)).items():
+            arc.write(t, df.index, {PRICE_COLUMNS[c]: df[c].to_numpy() for c in PRICE_COLUMNS})
+            n += len(df)
+        log.info("export: %d/%d symbols", min(i + chunk, len(tickers)), len(tickers))
+    return n
+
+def import_archive(session, arc, tickers=None, chunk: int = 200) -> int:
+    """Upsert every bar in `arc` into the SQLite price table (one transaction per chunk)."""
+    tickers = [t.upper().strip() for t in (tickers or arc.tickers())]
+    n = 0
+    for i in range(0, len(tickers), chunk):
+        frames = _archive_frames(arc, tickers[i:i+chunk], None, None, list(PRICE_COLUMNS))
+        if frames:
+            ids = _symbol_id_map(session, list(frames))
+            session.flush()
+            rewritten = _history_rewrites(session, ids, frames, None)
+            n += _write_bars(session, ids, frames, True, None)
+            _mark_rewrites(session, ids, rewritten)
+            session.commit()
+        log.info("import: %d/%d symbols", min(i + chunk, len(tickers)), len(tickers))
+    return n
 
 def positions_df(session) -> pd.DataFrame:
     rows = session.execute(text(
@@ -0,0 +1,34 @@
+# riskguard/db/version.py
+from sqlalchemy import bindparam, text
+from .base import engine
+
+# Data versions are the persisted symbol_sync watermarks: every write of a symbol's bars
+# bumps its raw_version in the same transaction (and sets reset_version when it rewrote,
+# not just extended, the history). Caches keyed on them therefore see writes from any
+# process -- the refresher, `python -m riskguard.ingest`, an archive import or another
+# app worker -- at the cost of one small query per lookup.
+
+_VERSIONS_SQL = text(
+    "SELECT s.ticker, COALESCE(y.raw_version, 0), COALESCE(y.reset_version, 0) "
+    "FROM symbols s JOIN symbol_sync y ON y.symbol_id = s.id WHERE s.ticker IN :tickers"
+).bindparams(bindparam("tickers", expanding=True))
+
+def ticker_versions(tickers) -> dict:
+    """{TICKER: (raw_version, reset_version)} for `tickers` in one query; (0, 0) when never written."""
+    keys = list(dict.fromkeys(t.upper().strip() for t in tickers))
+    out = dict.fromkeys(keys, (0, 0))
+    if keys:
+        with engine.connect() as conn:
+            out.update({t: (int(v), int(r)) for t, v, r in conn.execute(_VERSIONS_SQL, {"tickers": keys})})
+    return out
+
+def ticker_version(ticker: str) -> int:
+    return ticker_versions([ticker])[ticker.upper().strip()][0]
+
+def reset_version(ticker: str) -> int:
+    return ticker_versions([ticker])[ticker.upper().strip()][1]
+
+def data_version() -> int:
+    """Watermark over all symbols: grows with every write of any symbol's bars."""
+    with engine.connect() as conn:
+        return int(conn.execute(text("SELECT COALESCE(SUM(raw_version), 0) FROM symbol_sync")).scalar())
@@ -0,0 +1,221 @@
+# riskguard/ingest.py
+import argparse
+import io
+import itertools
+import json
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+    HAVE_PARQUET = True
+except Exception:
+    HAVE_PARQUET = False
+
+from .config import INGEST_CHUNK_ROWS
+from .data.normalize import normalize_price_frame
+from .data.guards import jump_guard
+from .db.base import SessionLocal, init_db, ensure_schema, migrate_compact_storage
+from .db.repo import bulk_upsert_price_frames, get_price_frames, last_bars
+
+log = logging.getLogger("riskguard.ingest")
+
+_TICKER_COLS = ("ticker", "symbol", "sym", "code")
+_DATE_COLS = ("date", "datetime", "timestamp", "time", "dt")
+
+def _find(columns, names):
+    lower = {str(c).strip().lower(): c for c in columns}
+    return next((lower[n] for n in names if n in lower), None)
+
+def _csv_chunks(path: str, chunk_rows: int, position):
+    """(frame, position) per chunk; position is the byte offset after the chunk."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        if position:
+            f.seek(position)
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                return
+            yield pd.read_csv(io.BytesIO(header + b"".join(lines))), f.tell()
+
+def _parquet_chunks(path: str, chunk_rows: int, position):
+    """(frame, position) per record batch; position is [row group, batches done in it]."""
+    pf = pq.ParquetFile(path)
+    rg0, skip = position or (0, 0)
+    for rg in range(rg0, pf.num_row_groups):
+        for b, batch in enumerate(pf.iter_batches(batch_size=chunk_rows, row_groups=[rg])):
+            if rg == rg0 and b < skip:
+                continue
+            df = batch.to_pandas()
+            if df.index.name is not None or isinstance(df.index, pd.DatetimeIndex):
+                df = df.reset_index()   # pandas-written files restore the date index
+            yield df, [rg, b + 1]
+
+def _split(df: pd.DataFrame, fmt: str, date_col=None, ticker_col=None) -> tuple:
+    """({ticker: normalized frame}, close_only) for one chunk.
+
+    Wide input is close-only: its frames carry Open/High/Low = Close and Volume 0
+    until _keep_stored_bars restores whatever is already stored for those days.
+    """
+    dcol = date_col or _find(df.columns, _DATE_COLS) or df.columns[0]
+    tcol = ticker_col or _find(df.columns, _TICKER_COLS)
+    df[dcol] = pd.to_datetime(df[dcol], errors="coerce")   # once per chunk; frames need a DatetimeIndex
+    close_only = not (fmt == "long" or (fmt == "auto" and tcol is not None))
+    if not close_only:
+        if tcol is None:
+            raise ValueError("long format needs a ticker/symbol column (see --ticker-col)")
+        groups = df.set_index(dcol).groupby(tcol, sort=False)
+        frames = {str(t): g.drop(columns=tcol) for t, g in groups}
+    else:
+        wide = df.set_index(dcol)
+        frames = {str(t): wide[[t]].set_axis(["Close"], axis=1) for t in wide.columns}
+    out = {}
+    for t, g in frames.items():
+        g = normalize_price_frame(g)
+        if not g.empty:
+            out[t.upper().strip()] = g
+    return out, close_only
+
+def _keep_stored_bars(session, frames: dict) -> dict:
+    """Close-only frames: keep the stored Open/High/Low/Volume of days already in the store.
+
+    A wide dump then updates closes without wiping real OHLCV from an earlier long
+    import; High/Low are widened to the new close so every bar stays consistent.
+    """
+    if not frames:
+        return frames
+    lo = min(g.index[0] for g in frames.values())
+    hi = max(g.index[-1] for g in frames.values())
+    stored = get_price_frames(session, list(frames), lo, hi, columns=["Open", "High", "Low", "Volume"])
+    for t, old in stored.items():
+        g = frames[t]
+        old = old.reindex(g.index)
+        has = old.notna().any(axis=1).to_numpy()
+        if not has.any():
+            continue
+        o, close = old[has], g["Close"][has]
+        g = g.copy()
+        g.loc[has, "Open"] = o["Open"].fillna(close)
+        g.loc[has, "High"] = np.fmax(o["High"], close)
+        g.loc[has, "Low"] = np.fmin(o["Low"], close)
+        g.loc[has, "Volume"] = o["Volume"].fillna(0.0)
+        frames[t] = g
+    return frames
+
+class _Checkpoint:
+    """Resume state for one input file, stored next to it as <file>.ckpt.json."""
+
+    def __init__(self, path: str, restart: bool = False):
+        self.file = path + ".ckpt.json"
+        st = os.stat(path)
+        self.ident = {"size": st.st_size, "mtime": int(st.st_mtime)}
+        self.state = {"position": None, "chunks": 0, "rows": 0, "bars": 0, "skipped": 0, "done": False}
+        if not restart and os.path.exists(self.file):
+            with open(self.file) as f:
+                saved = json.load(f)
+            if saved.get("ident") == self.ident:
+                self.state.update(saved["state"])
+            else:
+                log.warning("%s changed since the last run; starting over", path)
+
+    def save(self, **state):
+        self.state.update(state)
+        tmp = self.file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"ident": self.ident, "state": self.state}, f)
+        os.replace(tmp, self.file)
+
+def _guard(frames: dict, last: dict) -> tuple:
+    """Seam check: a chunk extending stored history must not open with a jump from the stored close.
+
+    Like the daily updater, only the offending bar is skipped; the rest of the
+    chunk is kept. Bars inside the chunk are left to the series outlier patch;
+    overlapping (re-imported) ranges are not checked.
+    """
+    seam = {t: df.head(1) for t, df in frames.items() if t in last and df.index[0] > last[t][0]}
+    if not seam:
+        return frames, []
+    _, skipped = jump_guard(seam, pd.Series({t: last[t][1] for t in seam}, dtype=float))
+    if not skipped:
+        return frames, []
+    out = {t: df.iloc[1:] if t in skipped else df for t, df in frames.items()}
+    return {t: df for t, df in out.items() if not df.empty}, skipped
+
+def ingest_file(session, path: str, fmt: str = "auto", chunk_rows: int = INGEST_CHUNK_ROWS,
+                date_col=None, ticker_col=None, restart: bool = False) -> dict:
+    """Stream one CSV/Parquet dump into the price store; returns the checkpoint state.
+
+    The file is read in bounded chunks (CSV by lines, Parquet by record batches),
+    so memory stays flat regardless of file size. Each chunk is split per symbol,
+    normalized, seam-checked by the jump guard (an offending first bar is
+    skipped, the rest of the chunk kept) and written with one bulk
+    upsert; the position is then saved to <file>.ckpt.json so an interrupted run
+    resumes after the last committed chunk. Never touches the network.
+    """
+    parquet = path.lower().endswith((".parquet", ".pq"))
+    if parquet and not HAVE_PARQUET:
+        raise RuntimeError("reading Parquet needs pyarrow")
+    ckpt = _Checkpoint(path, restart)
+    if ckpt.state["done"]:
+        log.info("%s: already ingested (use --restart to load it again)", path)
+        return ckpt.state
+    size = os.path.getsize(path)
+    chunks = (_parquet_chunks if parquet else _csv_chunks)(path, chunk_rows, ckpt.state["position"])
+    last = {}   # ticker -> (last stored date, close), filled lazily per chunk
+    t_start, rows0 = time.perf_counter(), ckpt.state["rows"]
+    for df, position in chunks:
+        t0 = time.perf_counter()
+        frames, close_only = _split(df, fmt, date_col, ticker_col)
+        if close_only:
+            frames = _keep_stored_bars(session, frames)
+        new = [t for t in frames if t not in last]
+        if new:
+            lb = last_bars(session, new)
+            last.update({t: (lb.at[t, "Date"], float(lb.at[t, "Close"])) for t in lb.index})
+        tails = {t: (g.index[-1], float(g["Close"].iloc[-1])) for t, g in frames.items()}
+        frames, skipped = _guard(frames, last)
+        bars = bulk_upsert_price_frames(session, frames)
+        # the next seam is checked against this chunk's own tail, even when its first bar was skipped
+        last.update({t: v for t, v in tails.items() if t not in last or v[0] > last[t][0]})
+        st = ckpt.state
+        ckpt.save(position=position, chunks=st["chunks"] + 1, rows=st["rows"] + len(df),
+                  bars=st["bars"] + bars, skipped=st["skipped"] + len(skipped))
+        elapsed = time.perf_counter() - t_start
+        done = f"{100 * position / size:.1f}%" if not parquet else f"row group {position[0] + 1}"
+        log.info("%s: chunk %d, %d rows -> %d bars / %d symbols (%d skipped) in %.2fs; %s, %.0f rows/s",
+                 os.path.basename(path), ckpt.state["chunks"], len(df), bars, len(frames), len(skipped),
+                 time.perf_counter() - t0, done, (ckpt.state["rows"] - rows0) / max(elapsed, 1e-9))
+    ckpt.save(done=True)
+    return ckpt.state
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(
+        prog="python -m riskguard.ingest",
+        description="Stream CSV/Parquet price history into the RiskGuard price store.",
+        epilog="long: a ticker/symbol column plus OHLCV columns; wide: one close column per symbol. "
+               "Both need a date column (date/datetime/timestamp, else the first). "
+               "Wide input is close-only: new bars get Open/High/Low = Close and Volume 0, "
+               "days already stored keep their Open/High/Low/Volume. "
+               "auto = long when a symbol column exists.")
+    ap.add_argument("files", nargs="+", help="CSV or Parquet (.parquet/.pq) dumps")
+    ap.add_argument("--format", choices=["auto", "long", "wide"], default="auto")
+    ap.add_argument("--chunk-rows", type=int, default=INGEST_CHUNK_ROWS, help="rows per chunk (default: %(default)s)")
+    ap.add_argument("--date-col", help="date column (default: date/datetime/timestamp, else the first column)")
+    ap.add_argument("--ticker-col", help="symbol column for long format (default: ticker/symbol)")
+    ap.add_argument("--restart", action="store_true", help="ignore existing checkpoints")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    init_db(); ensure_schema(); migrate_compact_storage()
+    with SessionLocal() as s:
+        for path in args.files:
+            t0 = time.perf_counter()
+            st = ingest_file(s, path, args.format, args.chunk_rows, args.date_col, args.ticker_col, args.restart)
+            log.info("%s: %d rows, %d bars written, %d seam bars skipped by the jump guard (%.1fs)",
+                     path, st["rows"], st["bars"], st["skipped"], time.perf_counter() - t0)
+
+if __name__ == "__main__":
+    main()
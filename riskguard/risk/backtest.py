@@ -0,0 +1,257 @@
+# riskguard/risk/backtest.py
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from ..config import (BACKTEST_BAND, BACKTEST_CACHE_MAX_BYTES, BACKTEST_CHUNK, BACKTEST_COST_BPS,
+                      BACKTEST_WORKERS)
+from ..data.panel import panel_version
+from .metrics import buy_hold_metrics
+from ..utils.cache import LRUCache
+
+SCHEDULES = ("none", "daily", "monthly", "quarterly", "threshold")
+METRICS = ["CAGR", "AnnVol", "Sharpe", "MaxDD", "Turnover", "Costs"]
+_bt_cache = LRUCache(BACKTEST_CACHE_MAX_BYTES)
+
+def rebalance_rows(dates: pd.DatetimeIndex, schedule: str) -> np.ndarray:
+    """Rows (after the first) at whose close a calendar schedule rebalances: every row, or the
+    first trading day of each month / quarter; none for buy-and-hold."""
+    if schedule == "daily":
+        return np.arange(1, len(dates))
+    if schedule in ("monthly", "quarterly"):
+        p = dates.to_period("M" if schedule == "monthly" else "Q").asi8
+        return np.flatnonzero(p[1:] != p[:-1]) + 1
+    return np.empty(0, dtype=np.int64)
+
+def _targets(W: np.ndarray, avail: np.ndarray, cash: float) -> np.ndarray:
+    """Target asset weights (strategies x assets) over the assets with a price, summing to 1 - cash."""
+    T = W * avail
+    tot = T.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(tot > 0, T / tot * (1.0 - cash), 0.0)
+
+def _run_daily(R: np.ndarray, bars: np.ndarray, W: np.ndarray, cost: float, cash: float,
+               cash_rate: float, min_coverage: float, block: int = 1 << 22) -> tuple:
+    """_run for the daily schedule without a loop over days.
+
+    Same rule as portfolio_returns_panel: each day's holdings are the targets
+    over the assets with a bar that day (`bars`), and a day on which those carry
+    less than `min_coverage` of a strategy's weight is skipped (NAV factor 1).
+    With zero cost the NAV is (1 + portfolio_returns_panel).cumprod().
+    Rebalancing every close makes each day's NAV factor independent of the NAV
+    level: gross = T_prev . (1 + r) plus cash, less `cost` x sum |T gross - T_prev (1 + r)|.
+    Targets T only change with the set of assets trading, so the factors of
+    a run of days are one matrix product plus one broadcast over
+    (strategies x days x assets) for the traded value, in blocks of about `block` elements.
+    """
+    n, S = len(R), len(W)
+    avail = np.r_[bars[1:], bars[-1:]]   # avail[t]: assets held into day t + 1
+    tot = W.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        skip = (tot[:, None] > 0) & ((W @ bars.T) / tot[:, None] < min_coverage)
+    f = np.ones((S, n))
+    turnover, costs = np.zeros(S), np.zeros(S)
+    g_cash = 1.0 + cash_rate
+    changes = np.flatnonzero((avail[1:] != avail[:-1]).any(axis=1)) + 1
+    T_prev = _targets(W, avail[0], cash)
+    for a, b in zip(np.r_[1, changes], np.r_[changes, n]):
+        if b <= a:
+            continue
+        T = _targets(W, avail[a], cash)
+        # Row a still grows the previous targets; rows after it hold T throughout.
+        for lo, hi, Tp in ((a, a + 1, T_prev), (a + 1, b, T)):
+            if hi <= lo:
+                continue
+            G = 1.0 + R[lo:hi]
+            gross = Tp @ G.T + (1.0 - Tp.sum(axis=1))[:, None] * g_cash
+            trade = np.empty_like(gross)
+            step = max(1, block // max(S * W.shape[1], 1))
+            absT = np.abs(T)[:, :, None]
+            for i in range(0, hi - lo, step):
+                g = gross[:, i:i + step, None]
+                if Tp is T:   # |T g - T (1 + r)| = |T| |g - (1 + r)|
+                    D = np.abs(g - G[None, i:i + step])
+                    trade[:, i:i + step] = (D @ absT)[:, :, 0]
+                else:
+                    trade[:, i:i + step] = np.abs(T[:, None, :] * g - Tp[:, None, :] * G[None, i:i + step]).sum(axis=2)
+            s = skip[:, lo:hi]
+            gross[s], trade[s] = 1.0, 0.0
+            f[:, lo:hi] = gross - cost * trade
+            with np.errstate(invalid="ignore", divide="ignore"):
+                turnover += (trade / gross).sum(axis=1)
+                costs += (cost * trade / gross).sum(axis=1)
+        T_prev = T
+    return np.cumprod(f, axis=1), turnover, costs
+
+def _run(R: np.ndarray, avail: np.ndarray, W: np.ndarray, schedule: str, rows: np.ndarray,
+         band: float, cost: float, cash: float, cash_rate: float, min_coverage: float) -> tuple:
+    """(nav paths, turnover, costs) of strategies W (S x k) over returns R (n x k, 0 = no bar).
+
+    Holdings are NAV fractions bought at the first close (not charged), with
+    target weights spread over the assets `avail` marks as listed (between
+    their first and last bar; a gap leaves a holding at its last price). The
+    daily schedule instead takes `avail` as the bars of each day (see
+    _run_daily). Calendar schedules
+    hold between rebalance rows, so a segment is one growth matrix times the
+    holdings of every strategy; the threshold schedule checks the drift daily
+    and rebalances only the strategies beyond `band`. Costs are `cost` x traded
+    asset value, taken from NAV at the rebalance.
+    """
+    if schedule == "daily":
+        return _run_daily(R, avail, W, cost, cash, cash_rate, min_coverage)
+    n, S = len(R), len(W)
+    nav = np.empty((S, n))
+    nav[:, 0] = 1.0
+    H = _targets(W, avail[0], cash)
+    C = 1.0 - H.sum(axis=1)                      # cash, including weight with no asset to buy
+    turnover, costs = np.zeros(S), np.zeros(S)
+    g_cash = 1.0 + cash_rate
+
+    def rebalance(t, which):
+        V = nav[which, t]
+        T = _targets(W[which], avail[t], cash) * V[:, None]
+        trade = np.abs(T - H[which]).sum(axis=1)
+        fee = cost * trade
+        after = V - fee
+        H[which] = T * (after / V)[:, None]
+        C[which] = after - H[which].sum(axis=1)
+        nav[which, t] = after
+        turnover[which] += trade / V
+        costs[which] += fee / V
+
+    if schedule == "threshold":
+        listed = np.r_[False, (avail[1:] != avail[:-1]).any(axis=1)]
+        T = _targets(W, avail[0], cash)
+        buf = np.empty_like(H)
+        for t in range(1, n):
+            if listed[t]:
+                T = _targets(W, avail[t], cash)
+            H *= 1.0 + R[t]
+            C *= g_cash
+            nav[:, t] = H.sum(axis=1) + C
+            np.divide(H, nav[:, t, None], out=buf)
+            buf -= T
+            drift = np.abs(buf, out=buf).max(axis=1, initial=0.0)
+            hit = np.flatnonzero(drift > band)
+            if len(hit):
+                rebalance(t, hit)
+        return nav, turnover, costs
+    everyone = np.arange(S)
+    rows = [int(r) for r in rows if 0 < r < n]
+    for a, b, rebal in zip([0] + rows, rows + [n - 1], [True] * len(rows) + [False]):
+        if b > a:
+            G = np.cumprod(1.0 + R[a + 1:b + 1], axis=0)    # growth of each asset over the segment
+            nav[:, a + 1:b + 1] = H @ G.T + np.outer(C, g_cash ** np.arange(1, b - a + 1))
+            H *= G[-1]
+            C *= g_cash ** (b - a)
+        if rebal:
+            rebalance(b, everyone)
+    return nav, turnover, costs
+
+def _valid_rows(W: np.ndarray, bars: np.ndarray, schedule: str, min_coverage: float) -> np.ndarray:
+    """Strategies x dates: bars on which a strategy's assets traded (and, daily, passed the coverage rule)."""
+    if schedule != "daily":
+        return (np.abs(W) @ bars.T) > 0
+    cover = W @ bars.T
+    tot = W.sum(axis=1)[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (cover != 0) & ~((tot > 0) & (cover / tot < min_coverage))
+
+def _run_shared(task) -> tuple:
+    """Pool worker: _run on the return panel attached from shared memory."""
+    name, shape, W, (avail, *rest) = task
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return _run(np.ndarray(shape, dtype=np.float64, buffer=shm.buf), avail, W, *rest)
+    finally:
+        shm.close()
+
+def nav_metrics(nav: np.ndarray, valid: np.ndarray, turnover: np.ndarray, costs: np.ndarray) -> np.ndarray:
+    """buy_hold_metrics of many NAV paths at once, plus annualized turnover and costs (strategies x METRICS).
+
+    Only the bars `valid` marks (strategies x dates) count: days the coverage
+    rule skipped, or on which none of a strategy's assets traded, would
+    otherwise dilute CAGR and volatility with flat bars.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = np.where(valid[:, 1:], nav[:, 1:] / nav[:, :-1] - 1.0, np.nan)
+    met = buy_hold_metrics(pd.DataFrame(r.T)).to_numpy()
+    m = valid[:, 1:].sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        per_year = np.where(m > 0, 252 / m, np.nan)
+    return np.column_stack([met, turnover * per_year, costs * per_year])
+
+def backtest(panel, weights, start=None, schedules=("daily",), band: float = BACKTEST_BAND,
+             cost_bps: float = BACKTEST_COST_BPS, cash: float = 0.0, cash_rate: float = 0.0,
+             workers: int = BACKTEST_WORKERS, chunk: int = BACKTEST_CHUNK, min_coverage: float = 0.7) -> dict:
+    """Rebalancing backtest of one or many weight sets over a PricePanel.
+
+    `weights` is a {ticker: weight} dict or a strategies x tickers DataFrame;
+    `schedules` one name or several from SCHEDULES (the grid is every weight set
+    under every schedule). `cash` is a target cash weight earning `cash_rate`
+    per bar. The daily schedule applies portfolio_returns_panel's `min_coverage`
+    rule (and matches it at zero cost); the others hold what they bought and
+    value a position at its last price through gaps in its bars. Weight sets are split into `chunk`-sized tasks; with `workers` > 1
+    they run in a process pool that attaches the return panel from shared
+    memory instead of pickling it per task. Results are cached per weights,
+    schedule, parameters, start date and data version.
+
+    Returns {"nav": dates x (schedule, strategy) NAV paths starting at 1,
+    "metrics": (schedule, strategy) x METRICS}.
+    """
+    single = isinstance(weights, dict)
+    Wdf = pd.DataFrame([weights], index=["portfolio"]) if single else weights
+    Wdf = Wdf.reindex(columns=list(panel.tickers)).fillna(0.0).astype(float)
+    schedules = [schedules] if isinstance(schedules, str) else list(schedules)
+    bad = [s for s in schedules if s not in SCHEDULES]
+    if bad:
+        raise ValueError(f"unknown schedule(s) {bad}; expected one of {SCHEDULES}")
+    lo = int(panel.dates.searchsorted(pd.Timestamp(start))) if start is not None else 0
+    W = Wdf.to_numpy()
+    key = (panel.tickers, len(panel), hashlib.sha1(W.tobytes()).hexdigest(), tuple(Wdf.index),
+           tuple(schedules), lo, float(band), float(cost_bps), float(cash), float(cash_rate), float(min_coverage))
+    ver = panel_version(panel)
+    hit = _bt_cache.get(key, version=ver)
+    if hit is not None:
+        return hit
+
+    dates = panel.dates[lo:]
+    R = np.nan_to_num(panel.returns[lo:], nan=0.0)
+    bars = panel.mask[lo:] & ~np.isnan(panel.returns[lo:])
+    seen = panel.mask
+    listed = (np.maximum.accumulate(seen, axis=0) & np.maximum.accumulate(seen[::-1], axis=0)[::-1])[lo:]
+    if len(dates) == 0 or len(W) == 0:
+        out = {"nav": pd.DataFrame(index=dates), "metrics": pd.DataFrame(columns=METRICS)}
+        _bt_cache.put(key, out, version=ver)
+        return out
+    cost = float(cost_bps) / 1e4
+    blocks = [(sched, i) for sched in schedules for i in range(0, len(W), max(1, int(chunk)))]
+    step = max(1, int(chunk))
+
+    def args(sched):
+        return (bars if sched == "daily" else listed, sched, rebalance_rows(dates, sched),
+                band, cost, cash, cash_rate, min_coverage)
+
+    if workers and workers > 1 and len(blocks) > 1:
+        shm = shared_memory.SharedMemory(create=True, size=max(R.nbytes, 1))
+        try:
+            np.ndarray(R.shape, dtype=np.float64, buffer=shm.buf)[:] = R
+            tasks = [(shm.name, R.shape, W[i:i + step], args(sched)) for sched, i in blocks]
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                parts = list(ex.map(_run_shared, tasks))
+        finally:
+            shm.close()
+            shm.unlink()
+    else:
+        parts = [_run(R, args(sched)[0], W[i:i + step], *args(sched)[1:]) for sched, i in blocks]
+
+    nav = np.concatenate([p[0] for p in parts])
+    valid = np.concatenate([_valid_rows(W, bars, sched, min_coverage) for sched in schedules])
+    met = nav_metrics(nav, valid, np.concatenate([p[1] for p in parts]), np.concatenate([p[2] for p in parts]))
+    cols = pd.MultiIndex.from_tuples([(sched, name) for sched in schedules for name in Wdf.index],
+                                     names=["schedule", "strategy"])
+    out = {"nav": pd.DataFrame(nav.T, index=dates, columns=cols),
+           "metrics": pd.DataFrame(met, index=cols, columns=METRICS)}
+    _bt_cache.put(key, out, version=ver)
+    return out
@@ -0,0 +1,150 @@
+# riskguard/risk/correlation.py
+import numpy as np
+import pandas as pd
+from ..config import CORR_CACHE_MAX_BYTES, EWMA_LAMBDA
+from ..data.panel import panel_version
+from ..utils.cache import LRUCache
+
+try:
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+    HAVE_SCIPY = True
+except Exception:
+    HAVE_SCIPY = False
+
+CORR_METHODS = ("pairwise", "shrink", "ewma")
+FLAT_RTOL = 1e-10   # variance / sum of squares below which a series counts as flat
+_corr_cache = LRUCache(CORR_CACHE_MAX_BYTES)
+
+def corr_from_sums(pn, ps, pq, pxy) -> np.ndarray:
+    """Pairwise-complete correlation from co-moment sums over the dates both assets have:
+    counts pn, sums ps[i, j] (of i where j has a bar), squares pq and cross products pxy.
+
+    A variance within FLAT_RTOL of the sum of squares is the round-off of a
+    flat series and counts as zero, so (as in pandas) such pairs are NaN.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        num = pxy - ps * ps.T / pn
+        var = pq - ps * ps / pn
+        var = np.where(var > FLAT_RTOL * pq, var, np.nan)
+        c = num / np.sqrt(var * var.T)
+    c = np.where(pn >= 2, np.clip(c, -1.0, 1.0), np.nan)
+    d = np.diag_indices_from(c)
+    c[d] = np.where(np.isfinite(c[d]), 1.0, np.nan)
+    return c
+
+def pairwise_corr(x: np.ndarray) -> np.ndarray:
+    """Same matrix as DataFrame.corr() on a dates x assets array (NaN = no bar), from four
+    masked matrix products instead of a loop over pairs."""
+    m = ~np.isnan(x)
+    x0, mf = np.where(m, x, 0.0), m.astype(float)
+    return corr_from_sums(mf.T @ mf, x0.T @ mf, (x0 * x0).T @ mf, x0.T @ x0)
+
+def shrink_corr(x: np.ndarray) -> tuple:
+    """(Ledoit-Wolf shrunk correlation, shrinkage intensity) toward the identity.
+
+    The sample matrix is the correlation of the standardized returns with
+    missing bars as 0 (unlike pairwise estimates it is positive semidefinite),
+    shrunk with Ledoit and Wolf's (2004) intensity; the result is positive
+    definite even with more assets than dates. The dispersion and the
+    estimation error are both taken from that one matrix (columns rescaled to
+    unit norm); flat or empty columns are left out and come back as identity.
+    """
+    m = ~np.isnan(x)
+    n = max(int(m.any(axis=1).sum()), 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = np.where(m, x, 0.0).sum(axis=0) / m.sum(axis=0)
+        sd = np.sqrt(np.where(m, (x - mu) ** 2, 0.0).sum(axis=0) / m.sum(axis=0))
+        z = np.nan_to_num(np.where(m, (x - mu) / sd, 0.0), posinf=0.0, neginf=0.0)
+    d = np.sqrt((z * z).sum(axis=0) / n)
+    live = d > 0
+    p = int(live.sum())
+    out = np.eye(z.shape[1])
+    if p == 0:
+        return out, 1.0
+    z = z[:, live] / d[live]
+    c = z.T @ z / n
+    np.fill_diagonal(c, 1.0)
+    d2 = ((c - np.eye(p)) ** 2).sum() / p
+    b2 = (((z * z).sum(axis=1) ** 2).sum() / n - (c * c).sum()) / n / p
+    delta = float(min(max(b2, 0.0), d2) / d2) if d2 > 0 else 1.0
+    out[np.ix_(live, live)] = delta * np.eye(p) + (1.0 - delta) * c
+    return out, delta
+
+def ewma_corr(x: np.ndarray, lam: float = EWMA_LAMBDA) -> np.ndarray:
+    """Correlation of the RiskMetrics EWMA covariance (zero mean, missing bars as 0), newest bar weighted most."""
+    x0 = np.nan_to_num(x)
+    w = (1.0 - lam) * lam ** np.arange(len(x0) - 1, -1, -1)
+    cov = (x0 * w[:, None]).T @ x0
+    sd = np.sqrt(np.diag(cov))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        c = np.clip(cov / np.outer(sd, sd), -1.0, 1.0)
+    np.fill_diagonal(c, np.where(sd > 0, 1.0, np.nan))
+    return c
+
+def cluster_order(corr: np.ndarray) -> np.ndarray:
+    """Row order that puts correlated assets next to each other: average-linkage clustering on
+    sqrt((1 - c) / 2) with SciPy, else the order of the leading eigenvector."""
+    c = np.nan_to_num(np.asarray(corr, dtype=float))
+    np.fill_diagonal(c, 1.0)
+    p = len(c)
+    if p < 3:
+        return np.arange(p)
+    if HAVE_SCIPY:
+        dist = np.sqrt(np.clip((1.0 - c) / 2.0, 0.0, None))
+        np.fill_diagonal(dist, 0.0)
+        return leaves_list(linkage(squareform((dist + dist.T) / 2, checks=False), method="average"))
+    _, vecs = np.linalg.eigh(c)
+    return np.argsort(vecs[:, -1])
+
+def correlation_matrix(panel, tickers, method: str = "pairwise", lam: float = EWMA_LAMBDA,
+                       ordered: bool = True) -> pd.DataFrame:
+    """Correlation of `tickers` over a PricePanel's returns, cached per data version.
+
+    method: "pairwise" (as DataFrame.corr), "shrink" (Ledoit-Wolf) or "ewma".
+    With `ordered`, rows/columns follow cluster_order.
+    """
+    if method not in CORR_METHODS:
+        raise ValueError(f"unknown correlation method {method!r}; expected one of {CORR_METHODS}")
+    tickers = list(tickers)
+    key = (panel.tickers, len(panel), tuple(tickers), method, float(lam), bool(ordered))
+    ver = panel_version(panel)
+    hit = _corr_cache.get(key, version=ver)
+    if hit is not None:
+        return hit
+    x = panel.returns[:, [panel.col(t) for t in tickers]]
+    if method == "shrink":
+        c = shrink_corr(x)[0]
+    elif method == "ewma":
+        c = ewma_corr(x, lam)
+    else:
+        c = pairwise_corr(x)
+    order = cluster_order(c) if ordered else np.arange(len(tickers))
+    names = [tickers[i] for i in order]
+    out = pd.DataFrame(c[np.ix_(order, order)], index=names, columns=names)
+    _corr_cache.put(key, out, version=ver)
+    return out
+
+def heatmap_view(corr: pd.DataFrame, max_n: int, weights: dict = None) -> tuple:
+    """(matrix to draw, note) with at most max_n rows: the max_n largest positions by |weight| when
+    weights are given, else block averages of consecutive (cluster-ordered) assets."""
+    p = len(corr)
+    if p <= max_n:
+        return corr, ""
+    if weights is not None:
+        keep = set(pd.Series({t: abs(float(weights.get(t, 0.0))) for t in corr.index}).nlargest(max_n).index)
+        names = [t for t in corr.index if t in keep]        # keep the cluster order
+        return corr.loc[names, names], f"top {max_n} of {p} positions by weight"
+    groups = np.arange(p) * max_n // p
+    c = corr.to_numpy()
+    sums = np.zeros((max_n, max_n))
+    counts = np.zeros((max_n, max_n))
+    ok = ~np.isnan(c)
+    np.add.at(sums, (groups[:, None], groups[None, :]), np.where(ok, c, 0.0))
+    np.add.at(counts, (groups[:, None], groups[None, :]), ok)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg = sums / counts
+    first = np.searchsorted(groups, np.arange(max_n))
+    last = np.r_[first[1:], p] - 1
+    labels = [f"{corr.index[a]}…{corr.index[b]}" if b > a else corr.index[a] for a, b in zip(first, last)]
+    return pd.DataFrame(avg, index=labels, columns=labels), f"{p} assets averaged into {max_n} blocks"
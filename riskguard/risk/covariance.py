@@ -0,0 +1,49 @@
+# riskguard/risk/covariance.py
+import numpy as np
+import pandas as pd
+from ..config import COV_CACHE_MAX_BYTES
+from ..data.panel import panel_version
+from ..utils.cache import LRUCache
+
+_moments_cache = LRUCache(COV_CACHE_MAX_BYTES)
+
+def sample_moments(returns) -> tuple:
+    """(means, covariance) of a dates x assets return panel, NaN = no bar.
+
+    Each covariance entry uses the dates both assets have (pairwise-complete,
+    like DataFrame.cov), computed with three matrix products instead of a loop
+    over pairs. Pairs with fewer than two common dates get 0.
+    """
+    x = returns.to_numpy(dtype=float) if isinstance(returns, pd.DataFrame) else np.asarray(returns, dtype=float)
+    m = ~np.isnan(x)
+    x0 = np.where(m, x, 0.0)
+    mf = m.astype(float)
+    n = mf.T @ mf                  # common dates per pair
+    s = x0.T @ mf                  # s[i, j]: sum of asset i over dates where j has a bar
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (x0.T @ x0 - s * s.T / n) / (n - 1)
+        mean = x0.sum(axis=0) / m.sum(axis=0)
+    cov = np.where(n >= 2, cov, 0.0)
+    return np.nan_to_num(mean), (cov + cov.T) / 2
+
+def cov_factor(cov: np.ndarray) -> np.ndarray:
+    """L with L @ L.T == cov: Cholesky, or an eigen factor (negative eigenvalues clipped
+    to 0) when the matrix is not positive definite, e.g. for pairwise estimates,
+    collinear assets or fewer dates than assets."""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        vals, vecs = np.linalg.eigh(cov)
+        return vecs * np.sqrt(np.clip(vals, 0.0, None))
+
+def panel_moments(panel) -> tuple:
+    """sample_moments of a PricePanel's returns, cached per data version (shared by every view
+    of the same grid, so a k-asset book pays the O(n k^2) products once per data change)."""
+    key = (panel.tickers, len(panel), panel.dates[-1] if len(panel) else None)
+    ver = panel_version(panel)
+    hit = _moments_cache.get(key, version=ver)
+    if hit is not None:
+        return hit
+    out = sample_moments(panel.returns)
+    _moments_cache.put(key, out, version=ver)
+    return out
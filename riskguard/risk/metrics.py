@@ -1,6 +1,8 @@
 # riskguard/risk/metrics.py
+import warnings
 import numpy as np
 import pandas as pd
+from ..config import RISK_ALPHAS, RISK_HORIZONS
 
 try:
     from scipy.stats import norm
@@ -8,29 +10,128 @@ try:
 except Exception:
     HAVE_SCIPY = False
 
+# Inverse normal CDF without SciPy (Acklam's rational approximation, |rel err| < 1.2e-9).
+_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+      1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+      6.680131188771972e+01, -1.328068155288572e+01)
+_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+      -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+
+def _norm_ppf(p) -> np.ndarray:
+    p = np.asarray(p, dtype=float)
+    if HAVE_SCIPY:
+        return norm.ppf(p)
+    q = np.sqrt(-2 * np.log(np.minimum(p, 1 - p)))
+    tail = (((((_C[0]*q + _C[1])*q + _C[2])*q + _C[3])*q + _C[4])*q + _C[5]) / \
+           ((((_D[0]*q + _D[1])*q + _D[2])*q + _D[3])*q + 1)
+    r = (p - 0.5) ** 2
+    mid = (((((_A[0]*r + _A[1])*r + _A[2])*r + _A[3])*r + _A[4])*r + _A[5]) * (p - 0.5) / \
+          (((((_B[0]*r + _B[1])*r + _B[2])*r + _B[3])*r + _B[4])*r + 1)
+    return np.where(p < 0.02425, tail, np.where(p > 1 - 0.02425, -tail, mid))
+
+def _norm_pdf(z) -> np.ndarray:
+    return np.exp(-0.5 * np.square(z)) / np.sqrt(2 * np.pi)
+
 def parametric_var_es(ret: pd.Series, alpha: float = 0.95):
     if ret is None or ret.empty: return float("nan"), float("nan")
-    mu = float(ret.mean()); sd = float(ret.std(ddof=1))
-    if not np.isfinite(sd) or sd == 0.0: return float("nan"), float("nan")
-    q = 1.0 - alpha
-    if HAVE_SCIPY:
-        z = norm.ppf(q)
-        var = -(mu + sd * z)
-        es  = -(mu - sd * norm.pdf(z) / q)
-    else:
-        z_map = {0.90:-1.2816, 0.95:-1.6449, 0.99:-2.3263}
-        z = z_map.get(round(alpha,2), -1.6449)
-        var = -(mu + sd*z); es = 1.25*var
-    return float(max(var,0.0)), float(max(es,0.0))
+    r = risk_report(ret, alphas=[alpha], methods=["param"], horizons=[1])
+    return float(r["VaR"].iloc[0]), float(r["ES"].iloc[0])
 
 def historical_var_es(ret: pd.Series, alpha: float = 0.95):
     if ret is None or ret.empty: return float("nan"), float("nan")
-    q = ret.quantile(1.0 - alpha)
-    tail = ret[ret <= q]
-    es = tail.mean() if not tail.empty else float("nan")
-    return float(abs(q)), float(abs(es))
+    r = risk_report(ret, alphas=[alpha], methods=["hist"], horizons=[1])
+    return float(r["VaR"].iloc[0]), float(r["ES"].iloc[0])
+
+def _hist_tails(x: np.ndarray, n: int, qs: np.ndarray) -> tuple:
+    """Empirical quantiles (linear interpolation, as Series.quantile) and means of the
+    returns at or below them, for columns of `x` holding n values each (NaN after).
 
-def buy_hold_metrics(port_ret: pd.Series):
+    One np.partition with every needed order statistic as a pivot replaces the
+    full sort (NaN sorts last, so padding never reaches a pivot); the pivots also
+    split each column into segments whose running sums give the tail sums. Only
+    values tied with a quantile above its lower order statistic need an extra
+    comparison pass (rare with real returns).
+    """
+    pos = (n - 1) * qs
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, n - 1)
+    frac = (pos - lo)[:, None]
+    part = np.partition(x, np.unique(np.r_[lo, hi]), axis=0)
+    a, b = part[lo], part[hi]
+    q = np.where(frac < 0.5, a + (b - a) * frac, b - (b - a) * (1 - frac))   # numpy's lerp
+    tail_sum = np.cumsum(part[:hi.max() + 1], axis=0)[lo]
+    tail_n = np.repeat((lo + 1.0)[:, None], x.shape[1], axis=1)
+    for i, j in zip(*np.nonzero((b <= q) & (hi > lo)[:, None])):
+        below = x[:, j] <= q[i, j]
+        tail_sum[i, j], tail_n[i, j] = x[below, j].sum(), below.sum()
+    return q, tail_sum / tail_n
+
+def risk_report(returns, alphas=RISK_ALPHAS, methods=("hist", "param"), horizons=RISK_HORIZONS) -> pd.DataFrame:
+    """VaR and ES for every (method, horizon, alpha) in one pass over the returns.
+
+    `returns` is one return series, or a dates x portfolios frame/array for many
+    portfolios at once (each column uses its own non-missing values). Methods:
+    "hist" (empirical quantile and tail mean, reported as absolute values) and
+    "param" (normal with the sample mean and stdev, floored at 0). Horizons are
+    in days: parametric figures scale the mean by h and the stdev by sqrt(h);
+    historical ones are scaled by sqrt(h) (square-root-of-time).
+
+    Returns a frame with columns VaR and ES (positive = loss), indexed by
+    (method, horizon, alpha), with a leading `portfolio` level for matrix input.
+    """
+    single = not (isinstance(returns, pd.DataFrame) or np.ndim(returns) == 2)
+    if isinstance(returns, pd.DataFrame):
+        names, x = list(returns.columns), returns.to_numpy(dtype=float)
+    else:
+        x = np.asarray(returns, dtype=float)
+        x = x[:, None] if x.ndim == 1 else x
+        names = list(range(x.shape[1]))
+    alphas = [float(a) for a in alphas]
+    horizons = [int(h) for h in horizons]
+    qs = 1.0 - np.asarray(alphas)
+    m = x.shape[1]
+    counts = np.count_nonzero(~np.isnan(x), axis=0)
+    one_day = {}   # method -> (VaR, ES) arrays, alphas x portfolios, or per-horizon functions of h
+    if "hist" in methods:
+        var_q, es_q = np.full((len(qs), m), np.nan), np.full((len(qs), m), np.nan)
+        for n in np.unique(counts[counts > 0]):
+            cols = np.flatnonzero(counts == n)
+            var_q[:, cols], es_q[:, cols] = _hist_tails(x[:, cols], int(n), qs)
+        var_q, es_q = np.abs(var_q), np.abs(es_q)
+        one_day["hist"] = lambda h: (var_q * np.sqrt(h), es_q * np.sqrt(h))
+    if "param" in methods:
+        filled = np.where(np.isnan(x), 0.0, x)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mu = filled.sum(axis=0) / counts
+            dev = np.where(np.isnan(x), 0.0, x - mu)
+            sd = np.sqrt((dev * dev).sum(axis=0) / (counts - 1))
+        sd = np.where(np.isfinite(sd) & (sd > 0), sd, np.nan)   # NaN propagates to VaR/ES
+        z = _norm_ppf(qs)[:, None]
+        k = _norm_pdf(z) / qs[:, None]
+        one_day["param"] = lambda h: tuple(np.where(np.isnan(v), np.nan, np.maximum(v, 0.0)) for v in
+                                           (-(mu * h + sd * np.sqrt(h) * z), -(mu * h - sd * np.sqrt(h) * k)))
+    keys, var, es = [], [], []
+    for meth in [mt for mt in methods if mt in one_day]:
+        for h in horizons:
+            v, e = one_day[meth](h)
+            keys += [(meth, h, a) for a in alphas]
+            var.append(v); es.append(e)
+    var = np.concatenate(var) if var else np.empty((0, m))
+    es = np.concatenate(es) if es else np.empty((0, m))
+    if single:
+        idx = pd.MultiIndex.from_tuples(keys, names=["method", "horizon", "alpha"])
+        return pd.DataFrame({"VaR": var[:, 0], "ES": es[:, 0]}, index=idx)
+    idx = pd.MultiIndex.from_tuples([(p,) + k for p in names for k in keys],
+                                    names=["portfolio", "method", "horizon", "alpha"])
+    return pd.DataFrame({"VaR": var.T.ravel(), "ES": es.T.ravel()}, index=idx)
+
+def buy_hold_metrics(port_ret):
+    """CAGR / AnnVol / Sharpe / MaxDD of a return Series (dict), or of every column of a
+    dates x portfolios frame (portfolios x metrics; NaN rows are skipped per column)."""
+    if isinstance(port_ret, pd.DataFrame):
+        return _buy_hold_matrix(port_ret)
     if port_ret.empty: return {}
     equity = (1 + port_ret).cumprod()
     cagr = equity.iloc[-1] ** (252/len(port_ret)) - 1
@@ -38,3 +139,18 @@ def buy_hold_metrics(port_ret: pd.Series):
     sharpe = (port_ret.mean() / port_ret.std(ddof=1)) * np.sqrt(252) if port_ret.std(ddof=1) else np.nan
     mdd = float((equity / equity.cummax() - 1).min())
     return {"CAGR": float(cagr), "AnnVol": float(vol), "Sharpe": float(sharpe), "MaxDD": mdd}
+
+def _buy_hold_matrix(rets: pd.DataFrame) -> pd.DataFrame:
+    x = rets.to_numpy(dtype=float)
+    ok = ~np.isnan(x)
+    n = ok.sum(axis=0)
+    growth = np.cumprod(np.where(ok, 1.0 + x, 1.0), axis=0)
+    equity = np.where(ok, growth, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)   # columns with fewer than two returns
+        cagr = np.where(n > 0, growth[-1] ** (252 / n) - 1, np.nan) if len(x) else np.full(x.shape[1], np.nan)
+        sd = np.nanstd(x, axis=0, ddof=1)
+        sharpe = np.where(sd > 0, np.nanmean(x, axis=0) / sd * np.sqrt(252), np.nan)
+        mdd = np.nanmin(equity / np.fmax.accumulate(equity, axis=0) - 1, axis=0)
+    return pd.DataFrame({"CAGR": cagr, "AnnVol": sd * np.sqrt(252), "Sharpe": sharpe, "MaxDD": mdd},
+                        index=rets.columns)
@@ -0,0 +1,109 @@
+# riskguard/risk/montecarlo.py
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from ..config import MC_CACHE_MAX_BYTES, MC_PATHS, MC_CHUNK, MC_SEED, MC_WORKERS, RISK_ALPHAS, RISK_HORIZONS
+from ..data.panel import panel_version
+from ..utils.cache import LRUCache
+from .covariance import cov_factor, panel_moments, sample_moments
+from .metrics import risk_report
+
+_mc_cache = LRUCache(MC_CACHE_MAX_BYTES)
+
+def _simulate_chunk(task) -> np.ndarray:
+    """Portfolio returns of one chunk of paths: (paths, horizons).
+
+    Daily asset returns are drawn as mean + L @ z and compounded per asset, so
+    multi-day horizons keep the non-linearity of holding the assets.
+    """
+    seed, n, mean, factor, weights, horizons = task
+    rng = np.random.default_rng(seed)
+    growth = np.ones((n, len(mean)))
+    out = np.empty((n, len(horizons)))
+    col = {h: i for i, h in enumerate(horizons)}
+    for day in range(1, max(horizons) + 1):
+        growth *= np.maximum(1.0 + mean + rng.standard_normal((n, len(mean))) @ factor.T, 0.0)
+        if day in col:
+            out[:, col[day]] = (growth - 1.0) @ weights
+    return out
+
+def simulate_portfolio_returns(asset_returns: pd.DataFrame, weights, horizons=RISK_HORIZONS,
+                               n_paths: int = MC_PATHS, chunk: int = MC_CHUNK,
+                               seed: int = MC_SEED, workers: int = MC_WORKERS) -> pd.DataFrame:
+    """Simulated portfolio returns (paths x horizons) from correlated normal asset returns.
+
+    Mean and covariance come from the aligned return panel; scenarios are drawn
+    in chunks of `chunk` paths, so memory is bounded by one chunk of asset
+    returns plus one float per path and horizon. Each chunk has its own seed
+    spawned from `seed`, so results are identical with or without a process
+    pool (`workers` > 1 spreads the chunks over that many processes).
+    """
+    w = np.array([float(weights.get(t, 0.0)) for t in asset_returns.columns])
+    mean, cov = sample_moments(asset_returns)
+    return _simulate(mean, cov, w, horizons, n_paths, chunk, seed, workers)
+
+def _simulate(mean, cov, w, horizons, n_paths, chunk, seed, workers) -> pd.DataFrame:
+    w = w / w.sum() if w.sum() else w
+    factor = cov_factor(cov)
+    horizons = sorted({int(h) for h in horizons})
+    sizes = [min(chunk, n_paths - i) for i in range(0, n_paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(sd, n, mean, factor, w, horizons) for sd, n in zip(seeds, sizes)]
+    if workers and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(_simulate_chunk, tasks))
+    else:
+        parts = [_simulate_chunk(t) for t in tasks]
+    sims = np.concatenate(parts) if parts else np.empty((0, len(horizons)))
+    return pd.DataFrame(sims, columns=horizons)
+
+def monte_carlo_report(asset_returns: pd.DataFrame, weights, alphas=RISK_ALPHAS, horizons=RISK_HORIZONS,
+                       n_paths: int = MC_PATHS, chunk: int = MC_CHUNK,
+                       seed: int = MC_SEED, workers: int = MC_WORKERS) -> pd.DataFrame:
+    """Monte Carlo VaR/ES, shaped like risk_report (method "mc", horizon, alpha)."""
+    alphas = [float(a) for a in alphas]
+    horizons = [int(h) for h in horizons]
+    if asset_returns is None or asset_returns.empty or n_paths <= 0:
+        return _empty_report(alphas, horizons)
+    sims = simulate_portfolio_returns(asset_returns, weights, horizons, n_paths, chunk, seed, workers)
+    return _tail_report(sims, alphas, horizons)
+
+def book_monte_carlo(panel, weights, held, alphas=RISK_ALPHAS, horizons=RISK_HORIZONS,
+                     n_paths: int = MC_PATHS, chunk: int = MC_CHUNK,
+                     seed: int = MC_SEED, workers: int = MC_WORKERS) -> pd.DataFrame:
+    """monte_carlo_report for the `held` assets of a PricePanel.
+
+    Moments come from the shared panel_moments cache, and the report is memoized
+    per holdings, weights, alphas, horizons, paths, seed and data version. Interval
+    ticks between data changes therefore never rerun the simulation.
+    """
+    held = list(held)
+    alphas = [float(a) for a in alphas]
+    horizons = [int(h) for h in horizons]
+    if not held or not len(panel) or n_paths <= 0:
+        return _empty_report(alphas, horizons)
+    key = (panel.tickers, tuple(held), tuple(round(float(weights.get(t, 0.0)), 6) for t in held),
+           tuple(alphas), tuple(horizons), int(n_paths), int(chunk), seed)
+    ver = panel_version(panel)
+    hit = _mc_cache.get(key, version=ver)
+    if hit is not None:
+        return hit
+    mean, cov = panel_moments(panel)
+    cols = [panel.col(t) for t in held]
+    w = np.array([float(weights.get(t, 0.0)) for t in held])
+    sims = _simulate(mean[cols], cov[np.ix_(cols, cols)], w, horizons, n_paths, chunk, seed, workers)
+    out = _tail_report(sims, alphas, horizons)
+    _mc_cache.put(key, out, version=ver)
+    return out
+
+def _empty_report(alphas, horizons) -> pd.DataFrame:
+    idx = pd.MultiIndex.from_tuples([("mc", h, a) for h in horizons for a in alphas],
+                                    names=["method", "horizon", "alpha"])
+    return pd.DataFrame({"VaR": np.nan, "ES": np.nan}, index=idx)
+
+def _tail_report(sims: pd.DataFrame, alphas, horizons) -> pd.DataFrame:
+    # Empirical tails of the simulated paths: one hist pass over all horizons (columns).
+    rep = risk_report(sims, alphas=alphas, methods=["hist"], horizons=[1])
+    rep = rep.reset_index()
+    rep = rep.assign(method="mc", horizon=rep["portfolio"])
+    return rep.set_index(["method", "horizon", "alpha"]).loc[[("mc", h, a) for h in horizons for a in alphas], ["VaR", "ES"]]
@@ -0,0 +1,252 @@
+# riskguard/risk/online.py
+import io
+import json
+import threading
+import numpy as np
+import pandas as pd
+from ..config import EWMA_LAMBDA, ONLINE_REWEIGHT_TOL, OUTLIER_WINDOW
+from ..db.repo import get_risk_state, put_risk_state
+from ..db.version import ticker_versions
+from .portfolio import panel_weights, portfolio_return_rows
+
+ROLL_WINDOW = 21
+_FORMAT = 2   # checkpoint layout; older checkpoints are rebuilt
+# Trailing bars the outlier patch may still revise when the next bar arrives: they are
+# applied to a copy of the state on every read and committed once they have settled.
+_SETTLE = OUTLIER_WINDOW + 1
+
+class RunningMoments:
+    """Running risk statistics of one book, extended bar by bar.
+
+    Portfolio path: running equity peak and max drawdown, and the last
+    ROLL_WINDOW-1 returns for the rolling vol, O(1) per bar. Assets:
+    pairwise-complete co-moment sums (means and the pairwise covariance, as
+    DataFrame.cov) and an EWMA covariance, O(k^2) per bar for k assets; the
+    portfolio's mean and variance are projected from them on any weights.
+    """
+    _SCALARS = ("n", "equity", "peak", "mdd", "ewma_n")
+
+    def __init__(self, k: int, window: int = ROLL_WINDOW, lam: float = EWMA_LAMBDA):
+        self.window, self.lam = window, lam
+        self.n = 0
+        self.equity, self.peak, self.mdd = 1.0, 0.0, 0.0
+        self.tail = np.empty(0)                      # last window-1 returns
+        self.pn, self.ps, self.pq, self.pxy = (np.zeros((k, k)) for _ in range(4))
+        self.ewma, self.ewma_n = np.zeros((k, k)), 0
+
+    def copy(self) -> "RunningMoments":
+        c = RunningMoments.__new__(RunningMoments)
+        c.__dict__.update(self.__dict__)
+        for name in ("pn", "ps", "pq", "pxy", "ewma"):
+            setattr(c, name, getattr(self, name).copy())
+        return c
+
+    def extend(self, r: np.ndarray, a: np.ndarray) -> np.ndarray:
+        """Add bars (portfolio returns r, asset returns a with NaN = no bar); returns their rolling vols."""
+        m = len(r)
+        if m == 0:
+            return np.empty(0)
+        self.n += m
+        # Drawdown from the running peak (the first bar's equity starts the peak, as with cummax).
+        eq = self.equity * np.cumprod(1.0 + r)
+        peaks = np.maximum.accumulate(np.r_[self.peak, eq])[1:]
+        self.mdd = min(self.mdd, float((eq / peaks - 1.0).min()))
+        self.equity, self.peak = float(eq[-1]), float(peaks[-1])
+        # Rolling vol over the last `window` returns.
+        seq = np.r_[self.tail, r]
+        vol = np.full(m, np.nan)
+        if len(seq) >= self.window:
+            wins = np.lib.stride_tricks.sliding_window_view(seq, self.window)
+            vol[-len(wins):] = wins.std(axis=1, ddof=1) * np.sqrt(252)
+        self.tail = seq[-(self.window - 1):].copy() if self.window > 1 else np.empty(0)
+        # Asset co-moments (pairwise-complete) and EWMA covariance.
+        mk = ~np.isnan(a)
+        a0 = np.where(mk, a, 0.0)
+        mf = mk.astype(float)
+        self.pn += mf.T @ mf
+        self.ps += a0.T @ mf
+        self.pq += (a0 * a0).T @ mf
+        self.pxy += a0.T @ a0
+        if self.ewma_n == 0:
+            self.ewma = np.outer(a0[0], a0[0])
+            a0 = a0[1:]
+        if len(a0):
+            decay = self.lam ** np.arange(len(a0) - 1, -1, -1)
+            self.ewma = self.lam ** len(a0) * self.ewma + (1 - self.lam) * (a0 * decay[:, None]).T @ a0
+        self.ewma_n += m
+        return vol
+
+    def project(self, w: np.ndarray) -> tuple:
+        """Daily (mean, variance) of the portfolio with asset weights `w`, O(k^2) on the co-moment sums.
+
+        Means are over each asset's bars and covariances pairwise-complete;
+        pairs with fewer than two common bars count as uncorrelated.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mu = np.diag(self.ps) / np.diag(self.pn)
+            cov = (self.pxy - self.ps * self.ps.T / self.pn) / (self.pn - 1)
+        cov = np.where(self.pn >= 2, cov, 0.0)
+        return float(np.nan_to_num(mu) @ w), float(max(w @ cov @ w, 0.0))
+
+    def ann_vol(self, w: np.ndarray) -> float:
+        return float(np.sqrt(self.project(w)[1] * 252)) if self.n > 1 else float("nan")
+
+    def sharpe(self, w: np.ndarray) -> float:
+        mean, var = self.project(w)
+        return float(mean / np.sqrt(var) * np.sqrt(252)) if self.n > 1 and var > 0 else float("nan")
+
+    def max_drawdown(self) -> float:
+        return float(self.mdd) if self.n else float("nan")
+
+    def ewma_vol(self, w: np.ndarray) -> float:
+        return float(np.sqrt(max(w @ self.ewma @ w, 0.0) * 252)) if self.ewma_n else float("nan")
+
+    def to_arrays(self) -> dict:
+        out = {k: getattr(self, k) for k in ("tail", "pn", "ps", "pq", "pxy", "ewma")}
+        out["scalars"] = np.array([float(getattr(self, k)) for k in self._SCALARS])
+        out["params"] = np.array([self.window, self.lam])
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "RunningMoments":
+        window, lam = arrays["params"]
+        st = cls(len(arrays["pn"]), int(window), float(lam))
+        for k in ("tail", "pn", "ps", "pq", "pxy", "ewma"):
+            setattr(st, k, np.array(arrays[k]))
+        for k, v in zip(cls._SCALARS, arrays["scalars"]):
+            setattr(st, k, int(v) if k in ("n", "ewma_n") else float(v))
+        return st
+
+class BookState:
+    """Online risk state of a book: moments committed over panel rows [0, rows), plus the
+    return and rolling-vol histories the charts need.
+
+    Valid for one holdings fingerprint and panel layout. The return path
+    (series, rolling vol, drawdown) keeps the weights it was built with until
+    they drift beyond ONLINE_REWEIGHT_TOL, so daily updates stay O(1)/O(k^2)
+    instead of re-weighting the whole history; volatility, Sharpe and EWMA vol
+    are projected on the current weights at every read, O(k^2).
+    """
+
+    def __init__(self, fingerprint: str, tickers, held, W: np.ndarray, resets: int):
+        self.fingerprint = fingerprint
+        self.tickers, self.held = tuple(tickers), list(held)
+        self.W = W
+        self.cols = [self.tickers.index(t) for t in self.held]
+        self.rows, self.last_date = 0, None
+        self.moments = RunningMoments(len(self.held))
+        self.dates = np.empty(0, dtype="datetime64[ns]")
+        self.rets, self.rolling = np.empty(0), np.empty(0)
+        self.resets = resets
+
+    def valid(self, panel, W: np.ndarray, held, fingerprint: str, resets: int) -> bool:
+        if (fingerprint != self.fingerprint or panel.tickers != self.tickers or list(held) != self.held
+                or self.rows > len(panel) or resets > self.resets):
+            return False
+        if self.rows and panel.dates[self.rows - 1] != self.last_date:
+            return False   # history before the committed rows changed
+        if W.sum() <= 0 or self.W.sum() <= 0:
+            return False
+        return float(np.abs(W / W.sum() - self.W / self.W.sum()).max()) <= ONLINE_REWEIGHT_TOL
+
+    def _rows(self, panel, start: int, stop: int) -> tuple:
+        """(dates, portfolio returns, held asset returns) of panel rows [start, stop) with a portfolio return."""
+        r = portfolio_return_rows(panel, self.W, start, stop)
+        ok = ~np.isnan(r)
+        return panel.dates[start:stop][ok], r[ok], panel.returns[start:stop][:, self.cols][ok]
+
+    def commit(self, panel, stop: int):
+        d, r, a = self._rows(panel, self.rows, stop)
+        vol = self.moments.extend(r, a)
+        self.dates = np.concatenate([self.dates, d.values])
+        self.rets, self.rolling = np.r_[self.rets, r], np.r_[self.rolling, vol]
+        self.rows, self.last_date = stop, panel.dates[stop - 1]
+
+    def view(self, panel, W: np.ndarray) -> dict:
+        """Statistics over the whole panel: committed state plus the unsettled rows, applied to a copy;
+        volatility, Sharpe and EWMA vol at the current weights `W`."""
+        m = self.moments.copy()
+        d, r, a = self._rows(panel, self.rows, len(panel))
+        vol = m.extend(r, a)
+        idx = pd.DatetimeIndex(np.concatenate([self.dates, d.values]))
+        w = W[self.cols]
+        w = w / w.sum() if w.sum() > 0 else np.full(len(w), np.nan)
+        return {
+            "port_ret": pd.Series(np.r_[self.rets, r], index=idx),
+            "rolling_vol": pd.Series(np.r_[self.rolling, vol], index=idx),
+            "ann_vol": m.ann_vol(w), "sharpe": m.sharpe(w), "mdd": m.max_drawdown(),
+            "ewma_vol": m.ewma_vol(w),
+        }
+
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        meta = {"format": _FORMAT, "tickers": list(self.tickers), "held": self.held, "rows": self.rows, "resets": self.resets,
+                "last_date": str(self.last_date) if self.last_date is not None else None}
+        np.savez(buf, meta=np.array(json.dumps(meta)), W=self.W, dates=self.dates.astype("int64"),
+                 rets=self.rets, rolling=self.rolling, **self.moments.to_arrays())
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, fingerprint: str, data: bytes) -> "BookState":
+        z = np.load(io.BytesIO(data))
+        meta = json.loads(str(z["meta"]))
+        if meta.get("format") != _FORMAT:
+            raise ValueError("risk state checkpoint from an older layout")
+        st = cls(fingerprint, meta["tickers"], meta["held"], z["W"], meta["resets"])
+        st.rows = meta["rows"]
+        st.last_date = pd.Timestamp(meta["last_date"]) if meta["last_date"] else None
+        st.dates = z["dates"].astype("datetime64[ns]")
+        st.rets, st.rolling = z["rets"], z["rolling"]
+        st.moments = RunningMoments.from_arrays(z)
+        return st
+
+def holdings_fingerprint(quantities: dict) -> str:
+    return json.dumps(sorted((str(t), float(q)) for t, q in quantities.items()))
+
+_states = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+def _book_lock(name: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(name, threading.Lock())
+
+def book_risk(session, name: str, panel, weights: dict, held, fingerprint: str) -> dict:
+    """Risk statistics of a book over `panel`, kept online per book `name`.
+
+    New bars are committed to the state (and checkpointed to risk_state) once
+    they have settled; until then, and between daily bars, a read costs a copy
+    of the state plus the last few bars. The state is rebuilt (from the
+    checkpoint after a restart) only when the holdings, the panel's tickers or
+    committed history, or the weights beyond ONLINE_REWEIGHT_TOL change.
+    Each book has its own lock, held only for the in-memory work: the version
+    lookup and checkpoint read/write happen outside it.
+    """
+    W = panel_weights(panel, weights)
+    held = list(held)
+    resets = max((r for _, r in ticker_versions(held).values()), default=0)
+    lock = _book_lock(name)
+    with lock:
+        st = _states.get(name)
+    saved = None
+    if st is None:
+        saved_fp, data = get_risk_state(session, name)
+        if saved_fp == fingerprint and data:
+            try:
+                saved = BookState.from_bytes(fingerprint, data)
+            except Exception:
+                saved = None
+    checkpoint = None
+    with lock:
+        st = _states.get(name) or saved   # another reader may have installed a state meanwhile
+        if st is None or not st.valid(panel, W, held, fingerprint, resets):
+            st = BookState(fingerprint, panel.tickers, held, W, resets)
+        settle = len(panel) - _SETTLE
+        if st.rows < settle:
+            st.commit(panel, settle)
+            checkpoint = st.to_bytes()
+        _states[name] = st
+        out = st.view(panel, W)
+    if checkpoint is not None:
+        put_risk_state(session, name, fingerprint, checkpoint)
+    return out
@@ -1,6 +1,7 @@
 # riskguard/risk/portfolio.py
 import numpy as np
 import pandas as pd
+from ..config import WORST_WINDOWS
 
 def portfolio_returns_dynamic(price_map, weights, min_coverage: float = 0.7) -> pd.Series:
     if not price_map:
@@ -19,11 +20,98 @@ def portfolio_returns_dynamic(price_map, weights, min_coverage: float = 0.7) ->
         port_ret = port_ret.where(coverage >= min_coverage)
     return port_ret.dropna().sort_index()
 
+def panel_weights(panel, weights) -> np.ndarray:
+    """Weight per panel column (0 for tickers not held or with fewer than two bars).
+
+    As in portfolio_returns_dynamic, a ticker needs a return (two bars) to
+    count toward the coverage total. A {ticker: weight} dict gives a vector;
+    a portfolios x tickers DataFrame gives a tickers x portfolios matrix (one
+    column per portfolio).
+    """
+    priced = panel.mask.sum(axis=0) > 1
+    if isinstance(weights, pd.DataFrame):
+        W = weights.reindex(columns=list(panel.tickers)).to_numpy(dtype=float).T
+        return np.where(np.isfinite(W) & priced[:, None], W, 0.0)
+    W = np.array([weights.get(t, 0.0) for t in panel.tickers], dtype=float)
+    return np.where(np.isfinite(W) & priced, W, 0.0)
+
+def portfolio_return_rows(panel, W: np.ndarray, start: int = 0, stop: int = None,
+                          min_coverage: float = 0.7) -> np.ndarray:
+    """Portfolio return of panel rows [start, stop), NaN where the coverage rule fails.
+
+    W is one weight vector (-> rows) or a tickers x portfolios matrix (-> rows x
+    portfolios); either way it is two masked matrix products over the panel.
+    """
+    M = panel.mask[start:stop] & ~np.isnan(panel.returns[start:stop])
+    tot = W.sum(axis=0)
+    tot = np.where(tot != 0.0, tot, np.nan)
+    weighted_sum = np.where(M, panel.returns[start:stop], 0.0) @ W
+    weight_in_play = M @ W
+    with np.errstate(divide="ignore", invalid="ignore"):
+        port_ret = weighted_sum / np.where(weight_in_play == 0, np.nan, weight_in_play)
+        ok = np.isfinite(tot) & (tot > 0)
+        port_ret = np.where(~ok | (weight_in_play / tot >= min_coverage), port_ret, np.nan)
+    return port_ret
+
+def portfolio_returns_panel(panel, weights, min_coverage: float = 0.7) -> pd.Series:
+    """portfolio_returns_dynamic over a prebuilt PricePanel (same coverage rule)."""
+    if panel is None or len(panel) < 2:
+        return pd.Series(dtype=float)
+    port_ret = portfolio_return_rows(panel, panel_weights(panel, weights), min_coverage=min_coverage)
+    return pd.Series(port_ret, index=panel.dates).dropna().sort_index()
+
+def portfolio_returns_matrix(panel, weights: pd.DataFrame, min_coverage: float = 0.7) -> pd.DataFrame:
+    """portfolio_returns_panel for many portfolios at once (weights: portfolios x tickers).
+
+    Returns dates x portfolios, NaN where a portfolio fails the coverage rule on
+    a date (dates where every portfolio does are dropped); each column equals
+    portfolio_returns_panel of that row of weights. Feed it to risk_report or
+    buy_hold_metrics, which evaluate every column in one call.
+    """
+    if panel is None or len(panel) < 2 or weights is None or weights.empty:
+        return pd.DataFrame(columns=getattr(weights, "index", None), dtype=float)
+    rets = portfolio_return_rows(panel, panel_weights(panel, weights), min_coverage=min_coverage)
+    out = pd.DataFrame(rets, index=panel.dates, columns=weights.index)
+    return out[out.notna().any(axis=1)].sort_index()
+
+def worst_windows(port_ret: pd.Series, windows=WORST_WINDOWS, top: int = 1) -> pd.DataFrame:
+    """Worst compounded returns over each window length, `top` non-overlapping windows per length.
+
+    Every window's return is exp(L[i] - L[i-w]) - 1 over one cumulative sum L
+    of log returns, so each length is a single vectorized pass. -100% bars are
+    kept out of L and counted in Z instead: a window is -100% exactly when its
+    endpoints' counts differ. Start/end are
+    the first and last dates of the window in the series' own index.
+    Columns: window, rank, start, end, ret (lengths longer than the history are skipped).
+    """
+    rows = []
+    r = port_ret.dropna()
+    if len(r):
+        x = r.to_numpy(dtype=float)
+        wiped = x <= -1.0
+        L = np.r_[0.0, np.cumsum(np.log1p(np.where(wiped, 0.0, x)))]
+        Z = np.r_[0, np.cumsum(wiped)]                  # zero-wealth bars so far
+        idx = r.index
+        for w in windows:
+            w = int(w)
+            if w < 1 or len(r) < w:
+                continue
+            ret = np.expm1(L[w:] - L[:-w])              # ret[j]: window of returns j .. j+w-1
+            ret[Z[w:] != Z[:-w]] = -1.0                 # a -100% bar inside the window
+            cand = ret.copy()
+            for rank in range(1, top + 1):
+                j = int(np.argmin(cand))
+                if not np.isfinite(cand[j]):
+                    break
+                rows.append((w, rank, idx[j], idx[j + w - 1], float(ret[j])))
+                cand[max(0, j - w + 1):j + w] = np.inf   # windows sharing a day with this one
+    return pd.DataFrame(rows, columns=["window", "rank", "start", "end", "ret"])
+
 def worst_window_stats(port_ret: pd.Series, window: int = 20):
     if len(port_ret) < window + 1:
         return {}
-    roll = (1 + port_ret).rolling(window).apply(lambda x: x.prod() - 1, raw=False)
-    idx = roll.idxmin()
-    return {"window_days": window,
-            "start": (idx - pd.tseries.offsets.BDay(window-1)).date(),
-            "end": idx.date(), "ret": float(roll.loc[idx])}
+    ww = worst_windows(port_ret, windows=[window])
+    if ww.empty:
+        return {}
+    w = ww.iloc[0]
+    return {"window_days": window, "start": w["start"].date(), "end": w["end"].date(), "ret": float(w["ret"])}
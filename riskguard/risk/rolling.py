@@ -0,0 +1,146 @@
+# riskguard/risk/rolling.py
+import numpy as np
+import pandas as pd
+from ..config import BENCHMARK, ROLLING_CACHE_MAX_BYTES, ROLLING_WINDOW
+from ..data.panel import panel_version
+from ..utils.cache import LRUCache
+from .correlation import FLAT_RTOL, corr_from_sums
+from .metrics import _norm_ppf
+from .portfolio import panel_weights, portfolio_return_rows
+
+_rolling_cache = LRUCache(ROLLING_CACHE_MAX_BYTES)
+
+def rolling_quantile(x, window: int, q: float) -> np.ndarray:
+    """Rolling linear-interpolated quantile of each column over full windows (NaN where a window has a gap).
+
+    pandas keeps each window in an indexable skiplist, so every step is an
+    O(log window) insert/delete plus an order-statistic lookup instead of a
+    re-sort, and all columns go through one call.
+    """
+    x = np.asarray(x, dtype=float)
+    out = pd.DataFrame(x.reshape(len(x), -1)).rolling(window, min_periods=window).quantile(q).to_numpy()
+    return out.reshape(x.shape)
+
+def _window_sums(x: np.ndarray, window: int) -> np.ndarray:
+    """Sums over trailing windows of `window` rows from one cumulative sum (rows before the first full window NaN)."""
+    c = np.cumsum(np.vstack([np.zeros((1,) + x.shape[1:]), x]), axis=0)
+    out = np.full(x.shape, np.nan)
+    out[window - 1:] = c[window:] - c[:-window]
+    return out
+
+def _centered(v: np.ndarray, mask: np.ndarray) -> tuple:
+    """(v minus its column mean over `mask`, 0 elsewhere; the means)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = np.where(mask, v, 0.0).sum(axis=0) / mask.sum(axis=0)
+    return np.where(mask, v - mu, 0.0), mu
+
+def rolling_moments(x, y=None, window: int = ROLLING_WINDOW) -> dict:
+    """Rolling mean and variance of the columns of x (and their covariance with y), O(n) per column.
+
+    Every statistic is a difference of cumulative sums. Only windows whose
+    `window` rows are all present (in x and y) are filled, as with pandas'
+    default min_periods; columns are centered on their own mean first, which
+    keeps the sum-of-squares form well conditioned. Flat windows (variance
+    within FLAT_RTOL of the raw sum of squares) get variance and covariance
+    exactly 0, so correlations and betas over them are NaN, as in pandas.
+    Returns {"mean", "var"[, "var_y", "cov"]} arrays shaped like x.
+    """
+    x = np.asarray(x, dtype=float)
+    x = x[:, None] if x.ndim == 1 else x
+    mask = ~np.isnan(x)
+    if y is not None:
+        y = np.broadcast_to(np.asarray(y, dtype=float).reshape(-1, 1), x.shape)
+        mask &= ~np.isnan(y)
+    full = _window_sums(mask.astype(float), window) == window
+    xc, mx = _centered(x, mask)
+    sx, sxx = _window_sums(xc, window), _window_sums(xc * xc, window)
+    flat_x = _flat(sxx - sx * sx / window, x, mask, window)
+    nan = np.nan
+    out = {"mean": np.where(full, sx / window + mx, nan),
+           "var": np.where(full, np.where(flat_x, 0.0, sxx - sx * sx / window) / (window - 1), nan)}
+    if y is not None:
+        yc, _ = _centered(y, mask)
+        sy, syy, sxy = _window_sums(yc, window), _window_sums(yc * yc, window), _window_sums(xc * yc, window)
+        flat_y = _flat(syy - sy * sy / window, y, mask, window)
+        out["var_y"] = np.where(full, np.where(flat_y, 0.0, syy - sy * sy / window) / (window - 1), nan)
+        out["cov"] = np.where(full, np.where(flat_x | flat_y, 0.0, sxy - sx * sy / window) / (window - 1), nan)
+    return out
+
+def _flat(ss: np.ndarray, v: np.ndarray, mask: np.ndarray, window: int) -> np.ndarray:
+    """Windows whose centered sum of squares `ss` is round-off (within FLAT_RTOL of the raw sum of squares)."""
+    return ss <= FLAT_RTOL * _window_sums(np.where(mask, v * v, 0.0), window)
+
+def rolling_param_var(ret: pd.Series, window: int = ROLLING_WINDOW, alpha: float = 0.95) -> pd.Series:
+    """Rolling normal VaR, -(mean + sd * z), floored at 0 (parametric_var_es per window)."""
+    m = rolling_moments(ret.to_numpy(dtype=float), window=window)
+    z = float(_norm_ppf(1.0 - alpha))
+    with np.errstate(invalid="ignore"):
+        sd = np.sqrt(m["var"][:, 0])
+        var = np.maximum(-(m["mean"][:, 0] + sd * z), 0.0)
+    return pd.Series(np.where(sd > 0, var, np.nan), index=ret.index, name="param_var")
+
+def rolling_hist_var(ret: pd.Series, window: int = ROLLING_WINDOW, alpha: float = 0.95) -> pd.Series:
+    """Rolling historical VaR, |quantile(1 - alpha)| of each window (historical_var_es per window)."""
+    return pd.Series(np.abs(rolling_quantile(ret.to_numpy(dtype=float), window, 1.0 - alpha)),
+                     index=ret.index, name="hist_var")
+
+def rolling_beta(returns: pd.DataFrame, bench: pd.Series, window: int = ROLLING_WINDOW) -> pd.DataFrame:
+    """Rolling beta of each column against `bench` (cov / var of the benchmark over common days)."""
+    m = rolling_moments(returns.to_numpy(dtype=float), bench.reindex(returns.index).to_numpy(dtype=float), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        beta = m["cov"] / np.where(m["var_y"] > 0, m["var_y"], np.nan)
+    return pd.DataFrame(beta, index=returns.index, columns=returns.columns)
+
+def rolling_corr(returns: pd.DataFrame, other: pd.Series, window: int = ROLLING_WINDOW) -> pd.DataFrame:
+    """Rolling correlation of each column with `other` over common days."""
+    m = rolling_moments(returns.to_numpy(dtype=float), other.reindex(returns.index).to_numpy(dtype=float), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        c = m["cov"] / np.sqrt(m["var"] * m["var_y"])
+    return pd.DataFrame(np.clip(c, -1.0, 1.0), index=returns.index, columns=returns.columns)
+
+def rolling_pair_corr(returns: pd.DataFrame, pairs, window: int = ROLLING_WINDOW) -> pd.DataFrame:
+    """Rolling correlation for each (a, b) column pair; one column per pair, named "a/b"."""
+    out = {}
+    for a, b in pairs:
+        out[f"{a}/{b}"] = rolling_corr(returns[[a]], returns[b], window).iloc[:, 0]
+    return pd.DataFrame(out, index=returns.index)
+
+def rolling_corr_matrix(returns: pd.DataFrame, window: int = ROLLING_WINDOW, end=None) -> pd.DataFrame:
+    """Correlation matrix of the `window` rows ending at `end` (default: the last row), rows with a gap in
+    either column excluded pairwise. One k x k product instead of k^2 rolling series."""
+    x = returns.loc[:end].to_numpy(dtype=float)[-window:] if end is not None else returns.to_numpy(dtype=float)[-window:]
+    mask = ~np.isnan(x)
+    mf, x0 = mask.astype(float), np.where(mask, x, 0.0)
+    n = mf.T @ mf
+    c = corr_from_sums(n, x0.T @ mf, (x0 * x0).T @ mf, x0.T @ x0)
+    c = np.where(n == window, c, np.nan)   # same all-present rule as the rolling series
+    return pd.DataFrame(c, index=returns.columns, columns=returns.columns)
+
+def rolling_report(panel, weights: dict, held, window: int = ROLLING_WINDOW, alpha: float = 0.95) -> dict:
+    """Rolling analytics of a book over a PricePanel, cached per data version.
+
+    Returns {"hist_var", "param_var", "beta"} for the portfolio (Series, with
+    beta against BENCHMARK) and {"asset_beta", "asset_corr"} for the held
+    assets (dates x assets; correlation with the portfolio).
+    """
+    held = list(held)
+    key = (panel.tickers, tuple(sorted((t, round(float(w), 6)) for t, w in weights.items())), tuple(held),
+           int(window), float(alpha), len(panel))
+    ver = panel_version(panel)
+    hit = _rolling_cache.get(key, version=ver)
+    if hit is not None:
+        return hit
+    W = panel_weights(panel, weights)
+    port = pd.Series(portfolio_return_rows(panel, W), index=panel.dates).dropna()
+    rets = panel.returns_frame()
+    assets = rets[held].loc[port.index]
+    bench = rets[BENCHMARK].loc[port.index] if BENCHMARK in rets.columns else pd.Series(np.nan, index=port.index)
+    out = {
+        "hist_var": rolling_hist_var(port, window, alpha),
+        "param_var": rolling_param_var(port, window, alpha),
+        "beta": rolling_beta(port.to_frame("portfolio"), bench, window)["portfolio"],
+        "asset_beta": rolling_beta(assets, bench, window),
+        "asset_corr": rolling_corr(assets, port, window),
+    }
+    _rolling_cache.put(key, out, version=ver)
+    return out
@@ -0,0 +1,115 @@
+# riskguard/risk/stress.py
+import numpy as np
+import pandas as pd
+from ..config import (BENCHMARK, STRESS_EPISODES, STRESS_SHOCKS, STRESS_TICKER_SHOCKS,
+                      WORST_WINDOWS, WORST_WINDOWS_TOP)
+from .covariance import panel_moments
+from .portfolio import worst_windows
+
+def asset_betas(panel, tickers, bench: str = BENCHMARK) -> pd.Series:
+    """Beta of each ticker against `bench` from the panel's cached covariance (0 without overlap)."""
+    _, cov = panel_moments(panel)
+    cols = [panel.col(t) for t in tickers]
+    if bench not in panel.tickers:
+        return pd.Series(0.0, index=list(tickers))
+    b = panel.col(bench)
+    var_b = cov[b, b]
+    return pd.Series(cov[cols, b] / var_b if var_b > 0 else 0.0, index=list(tickers))
+
+def parallel_scenarios(shocks, tickers) -> pd.DataFrame:
+    """Every position moves by the same return."""
+    shocks = [float(x) for x in shocks]
+    return pd.DataFrame(np.repeat(np.array(shocks)[:, None], len(tickers), axis=1),
+                        index=[f"Parallel {x:+.0%}" for x in shocks], columns=list(tickers))
+
+def beta_scenarios(shocks, betas: pd.Series, bench: str = BENCHMARK) -> pd.DataFrame:
+    """`bench` moves by each shock; positions move by beta x shock."""
+    shocks = np.array([float(x) for x in shocks])
+    return pd.DataFrame(shocks[:, None] * betas.to_numpy(dtype=float)[None, :],
+                        index=[f"{bench} {x:+.0%} (beta)" for x in shocks], columns=betas.index)
+
+def ticker_scenarios(specs: dict, tickers) -> pd.DataFrame:
+    """User-defined shocks, {scenario: {ticker: return}}; unlisted positions do not move."""
+    tickers = list(tickers)
+    out = pd.DataFrame(0.0, index=list(specs), columns=tickers)
+    for name, shocks in specs.items():
+        for t, x in shocks.items():
+            if t in out.columns:
+                out.at[name, t] = float(x)
+    return out
+
+def episode_scenarios(panel, tickers, episodes, betas: pd.Series = None, bench: str = BENCHMARK) -> tuple:
+    """Replay stored history: each position's return from the close before `start` to the close at `end`.
+
+    `episodes` is a sequence of (name, start, end). All episodes are looked up
+    at once on the forward-filled price grid. A position without a price at
+    either end (e.g. listed later) gets beta x the benchmark's move, or 0 when
+    that is missing too. Returns (shocks, skipped): episodes the stored history
+    does not cover (no close before `start`, or none inside the episode) are
+    listed by name in `skipped` instead of being replayed.
+    """
+    tickers = list(tickers)
+    episodes = list(episodes)
+    if not episodes or not len(panel):
+        return pd.DataFrame(columns=tickers, dtype=float), [e[0] for e in episodes]
+    filled = pd.DataFrame(panel.prices).ffill().to_numpy()
+    starts = pd.DatetimeIndex([pd.Timestamp(s) for _, s, _ in episodes])
+    ends = pd.DatetimeIndex([pd.Timestamp(e) for _, _, e in episodes])
+    i0 = panel.dates.searchsorted(starts, "left") - 1          # base: last close before the episode
+    i1 = panel.dates.searchsorted(ends, "right") - 1
+    ok = (i0 >= 0) & (i1 > i0)
+    i0, i1 = i0[ok], i1[ok]
+    names = [e[0] for e, k in zip(episodes, ok) if k]
+    skipped = [e[0] for e, k in zip(episodes, ok) if not k]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rets = filled[i1] / filled[i0] - 1.0                    # episodes x all panel tickers
+    cols = [panel.col(t) for t in tickers]
+    out = rets[:, cols]
+    if betas is not None and bench in panel.tickers:
+        proxy = rets[:, [panel.col(bench)]] * betas.reindex(tickers).to_numpy(dtype=float)[None, :]
+        out = np.where(np.isnan(out), proxy, out)
+    return pd.DataFrame(np.nan_to_num(out, nan=0.0), index=names, columns=tickers), skipped
+
+def worst_window_episodes(port_ret: pd.Series, windows=WORST_WINDOWS, top: int = WORST_WINDOWS_TOP) -> list:
+    """The book's own worst windows (worst_windows) as (name, start, end) episodes for replay."""
+    ww = worst_windows(port_ret, windows, top=top)
+    return [(f"Worst {w.window}d #{w.rank} ({w.start.date()}..{w.end.date()})", w.start, w.end)
+            for w in ww.itertuples(index=False)]
+
+def run_scenarios(shocks: pd.DataFrame, values: pd.Series) -> tuple:
+    """(per-scenario summary, per-position P/L) of scenarios x positions return shocks.
+
+    P/L is one product of the shock matrix with the market values; the summary
+    has P/L, P/L % of the book and the worst position of each scenario.
+    """
+    tickers = list(shocks.columns)
+    v = values.reindex(tickers).fillna(0.0).to_numpy(dtype=float)
+    S = shocks.to_numpy(dtype=float)
+    per_pos = S * v
+    pnl = S @ v
+    total = v.sum()
+    worst = per_pos.argmin(axis=1) if len(tickers) else np.zeros(len(S), dtype=int)
+    summary = pd.DataFrame({
+        "P/L": pnl,
+        "P/L %": pnl / total if total else np.nan,
+        "Worst Position": [tickers[j] for j in worst] if len(tickers) else None,
+        "Worst P/L": per_pos[np.arange(len(S)), worst] if len(tickers) else np.nan,
+    }, index=shocks.index)
+    summary.index.name = "Scenario"
+    return summary, pd.DataFrame(per_pos, index=shocks.index, columns=tickers)
+
+def book_scenarios(panel, tickers, port_ret: pd.Series = None) -> tuple:
+    """Default scenario set of a book: parallel and beta-scaled shocks (STRESS_SHOCKS), user-defined
+    ticker shocks (STRESS_TICKER_SHOCKS), stored episodes (STRESS_EPISODES) and the book's worst windows.
+
+    Returns (shocks, skipped) like episode_scenarios."""
+    tickers = list(tickers)
+    betas = asset_betas(panel, tickers)
+    episodes = list(STRESS_EPISODES)
+    if port_ret is not None:
+        episodes += worst_window_episodes(port_ret)
+    replay, skipped = episode_scenarios(panel, tickers, episodes, betas)
+    parts = [parallel_scenarios(STRESS_SHOCKS, tickers), beta_scenarios(STRESS_SHOCKS, betas),
+             ticker_scenarios(STRESS_TICKER_SHOCKS, tickers), replay]
+    parts = [p for p in parts if len(p)]
+    return (pd.concat(parts) if parts else pd.DataFrame(columns=tickers, dtype=float)), skipped
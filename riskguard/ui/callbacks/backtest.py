@@ -1,24 +1,40 @@
 # riskguard/ui/callbacks/backtest.py
-from dash import Input, Output, State, html
+from dash import Input, Output, State, ctx, html
+from dash.exceptions import PreventUpdate
 import plotly.graph_objects as go
 import pandas as pd
-from ...config import BENCHMARK
+from ...config import BACKTEST_SCHEDULE, BENCHMARK
 from ...db.base import SessionLocal
-from ...db.repo import ensure_history
-from .positions import build_positions_view
-from ...data.series import daily_price_series
-from ...risk.portfolio import portfolio_returns_dynamic
+from ...db.repo import positions_df
+from ...data.refresher import refresher
+from .positions import build_positions_view, book_panel
+from ...risk.portfolio import portfolio_returns_panel
+from ...risk.backtest import backtest
 from ...risk.metrics import buy_hold_metrics
 
 def register_backtest_callbacks(app):
     @app.callback(
         Output("bt-curve","figure"),
         Output("bt-metrics","children"),
+        Output("bt-pending","data"),
         Input("bt-run","n_clicks"),
+        Input("tick","n_intervals"),
+        State("bt-pending","data"),
         State("bt-start","date"),
+        State("bt-schedule","value"),
+        State("bt-cost","value"),
         prevent_initial_call=True
     )
-    def run_backtest(_n, start_date):
+    def run_backtest(_n, _tick, pending, start_date, schedule, cost_bps):
+        if ctx.triggered_id == "tick" and not pending:
+            raise PreventUpdate
+        with SessionLocal() as s:
+            tickers = list(positions_df(s)["Ticker"])
+        if tickers and not refresher.request(tickers + [BENCHMARK]):
+            return go.Figure(), html.Div("Loading price history…", className="text-muted"), True
+        return (*_backtest_view(start_date, schedule, cost_bps), False)
+
+    def _backtest_view(start_date, schedule, cost_bps):
         with SessionLocal() as s:
             view = build_positions_view(s)
             if view is None or view.empty:
@@ -29,23 +45,17 @@ def register_backtest_callbacks(app):
                 return go.Figure(), html.Div("Portfolio value is zero — cannot backtest.")
 
             tickers = list(view["Ticker"])
-            ensure_history(s, tickers + [BENCHMARK])
 
-            frames = {}
-            for t in tickers:
-                ser = daily_price_series(s, t)
-                if len(ser):
-                    frames[t] = ser
-            if not frames:
+            panel = book_panel(s, tickers)
+            if not any(panel.has_history(t) for t in tickers):
                 return go.Figure(), html.Div("No price history found for your positions.")
 
             weights = (view.set_index("Ticker")["Market Value"] / total_value).to_dict()
-            port_ret = portfolio_returns_dynamic(frames, weights)
+            port_ret = portfolio_returns_panel(panel, weights)
 
-            bser = daily_price_series(s, BENCHMARK)
-            if bser.empty:
+            bench = panel.returns_frame()[BENCHMARK].dropna()
+            if bench.empty:
                 return go.Figure(), html.Div(f"No history for benchmark {BENCHMARK}.")
-            bench = bser.pct_change().dropna()
 
         common_idx = port_ret.index.intersection(bench.index)
         if common_idx.empty:
@@ -63,8 +73,15 @@ def register_backtest_callbacks(app):
                    "Try a later date or remove assets with very short history.")
             return go.Figure(), html.Div(msg)
 
-        met = buy_hold_metrics(port_ret)
-        eq  = (1 + port_ret).cumprod() * 100
+        # Invest at the close before start_eff, so both curves include start_eff's return.
+        schedule = schedule or BACKTEST_SCHEDULE
+        i0 = max(int(panel.dates.searchsorted(start_eff)) - 1, 0)
+        res = backtest(panel, weights, start=panel.dates[i0], schedules=schedule, cost_bps=float(cost_bps or 0.0))
+        nav = res["nav"][(schedule, "portfolio")]
+        # Metrics over the plotted window: the strategy's (net) returns on the portfolio's valid days.
+        met = {**res["metrics"].loc[(schedule, "portfolio")],
+               **buy_hold_metrics(nav.pct_change().reindex(port_ret.index).dropna())}
+        eq  = nav.loc[start_eff:] * 100
         spy = (1 + bench).cumprod() * 100
 
         fig = go.Figure()
@@ -80,10 +97,11 @@ def register_backtest_callbacks(app):
 
         metrics_div = html.Div([
             html.Ul([
-                html.Li(f"CAGR: {met.get('CAGR', float('nan')):.2%}" if 'CAGR' in met else "CAGR: n/a"),
-                html.Li(f"Ann. Vol: {met.get('AnnVol', float('nan')):.2%}" if 'AnnVol' in met else "Ann. Vol: n/a"),
-                html.Li(f"Sharpe: {met.get('Sharpe', float('nan')):.2f}" if 'Sharpe' in met else "Sharpe: n/a"),
-                html.Li(f"Max Drawdown: {met.get('MaxDD', float('nan')):.2%}" if 'MaxDD' in met else "Max DD: n/a"),
+                html.Li(f"CAGR: {met['CAGR']:.2%}"),
+                html.Li(f"Ann. Vol: {met['AnnVol']:.2%}"),
+                html.Li(f"Sharpe: {met['Sharpe']:.2f}"),
+                html.Li(f"Max Drawdown: {met['MaxDD']:.2%}"),
+                html.Li(f"Turnover: {met['Turnover']:.0%}/yr, costs {met['Costs']:.2%}/yr"),
             ]),
             html.Small(f"Start date{note}")
         ])
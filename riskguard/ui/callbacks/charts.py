@@ -4,10 +4,10 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 from ...db.base import SessionLocal
-from ...db.repo import ensure_history, get_price_df
-from ...data.series import daily_price_series
+from ...db.repo import get_price_df
+from ...data.series import daily_price_series_map
 from ...data.normalize import ohlcv_by_day
-from ...data.updates import update_latest_prices
+from ...data.refresher import refresher
 from ...utils.dates import parse_lookback_df, parse_lookback_series
 from ...config import DEFAULT_TICKERS
 
@@ -21,18 +21,13 @@ def register_charts_callbacks(app):
     )
     def update_chart(_n, ctype, tickers, lb):
         tickers = (tickers or DEFAULT_TICKERS)[:]
+        refresher.watch(tickers)   # ingestion happens in the background worker
         with SessionLocal() as s:
-            ensure_history(s, tickers)
-            try:
-                update_latest_prices(s, tickers)
-            except Exception:
-                pass
-
             if ctype == "line":
                 fig = go.Figure()
+                series = daily_price_series_map(s, tickers)
                 for t in tickers:
-                    sers = daily_price_series(s, t)
-                    sers = parse_lookback_series(lb, sers)
+                    sers = parse_lookback_series(lb, series[t])
                     if sers is None or sers.empty:
                         continue
                     fig.add_trace(go.Scatter(x=sers.index, y=sers.values, mode="lines", name=t))
@@ -1,27 +1,38 @@
 # riskguard/ui/callbacks/forecast.py
-from dash import Input, Output, State
+from dash import Input, Output, State, ctx
+from dash.exceptions import PreventUpdate
 import plotly.graph_objects as go
 from ...db.base import SessionLocal
-from ...db.repo import ensure_history
+from ...data.refresher import refresher
 from ...data.series import daily_price_series
 from ...risk.forecast import forecast_series
 
 def register_forecast_callbacks(app):
     @app.callback(
         Output("forecast-graph","figure"),
+        Output("fc-pending","data"),
         Input("fc-run","n_clicks"),
+        Input("tick","n_intervals"),
+        State("fc-pending","data"),
         State("fc-ticker","value"),
         State("fc-horizon","value"),
         State("risk-alpha","value"),
         prevent_initial_call=True
     )
-    def run_forecast(_n, ticker, horizon, alpha):
+    def run_forecast(_n, _tick, pending, ticker, horizon, alpha):
+        if ctx.triggered_id == "tick" and not pending:
+            raise PreventUpdate
         if not ticker:
-            return go.Figure()
-        horizon = int(horizon or 30); alpha = float(alpha or 0.95)
+            return go.Figure(), False
         ticker = ticker.upper().strip()
+        if not refresher.request([ticker]):
+            fig = go.Figure()
+            fig.update_layout(title=f"{ticker}: loading price history…", margin=dict(l=10,r=10,t=30,b=10), height=420)
+            return fig, True
+        return _forecast_figure(ticker, int(horizon or 30), float(alpha or 0.95)), False
+
+    def _forecast_figure(ticker, horizon, alpha):
         with SessionLocal() as s:
-            ensure_history(s, [ticker])
             close = daily_price_series(s, ticker)
             if close.empty:
                 return go.Figure()
@@ -4,22 +4,25 @@ import dash_bootstrap_components as dbc
 import numpy as np
 import pandas as pd
 from ...db.base import SessionLocal
-from ...db.repo import positions_df, upsert_symbol, bulk_upsert_prices, ensure_history
+from ...db.repo import positions_df, upsert_symbol
 from ...utils.search import search_symbols
-from ...data.fetch import fetch_history
-from ...data.updates import update_latest_prices
+from ...config import BENCHMARK
+from ...data.refresher import refresher
 
-def build_positions_view(session) -> pd.DataFrame:
+def book_panel(session, tickers):
+    """PricePanel over the book plus benchmark; one shared grid for all callbacks."""
+    from ...data.panel import get_price_panel
+    return get_price_panel(session, list(tickers) + [BENCHMARK])
+
+def build_positions_view(session, panel=None) -> pd.DataFrame:
     pos = positions_df(session)
     if pos.empty:
         return pos
-    from ...data.series import daily_price_series
-    last_prices = []
-    for t in pos["Ticker"]:
-        ser = daily_price_series(session, t)
-        last_prices.append(float(ser.iloc[-1]) if len(ser) else np.nan)
+    if panel is None:
+        panel = book_panel(session, pos["Ticker"])
+    last = panel.last_prices()
     pos = pos.copy()
-    pos["Current Price"] = pd.to_numeric(last_prices, errors="coerce")
+    pos["Current Price"] = pd.to_numeric(last.reindex(pos["Ticker"]).to_numpy(), errors="coerce")
     pos["Market Value"]  = pd.to_numeric(pos["Quantity"], errors="coerce") * pos["Current Price"]
     pos["P/L"]           = (pos["Current Price"] - pd.to_numeric(pos["Cost Basis"], errors="coerce")) * pd.to_numeric(pos["Quantity"], errors="coerce")
     denom = (pd.to_numeric(pos["Quantity"], errors="coerce") * pd.to_numeric(pos["Cost Basis"], errors="coerce"))
@@ -54,9 +57,8 @@ def register_positions_callbacks(app):
         if not ticker or qty is None or cost is None:
             return dbc.Alert("Fill symbol, quantity, and cost.", color="warning")
         ticker = ticker.strip().upper()
+        ready = refresher.request([ticker])   # never waits: prices fill in on a later tick
         with SessionLocal() as s:
-            df = fetch_history(ticker)
-            bulk_upsert_prices(s, ticker, df, adj_col_exists=True)
             sym = upsert_symbol(s, ticker)
             from ...db.models import Position
             pos = s.query(Position).filter(Position.symbol_id==sym.id).one_or_none()
@@ -65,6 +67,8 @@ def register_positions_callbacks(app):
             else:
                 s.add(Position(symbol_id=sym.id, quantity=float(qty), cost_basis=float(cost)))
             s.commit()
+        if not ready:
+            return dbc.Alert(f"Saved {ticker}; loading its price history…", color="success")
         return dbc.Alert(f"Saved {ticker}.", color="success")
 
     @app.callback(
@@ -94,14 +98,6 @@ def register_positions_callbacks(app):
     )
     def refresh_positions(_n, _msg):
         with SessionLocal() as s:
-            pos = positions_df(s)
-            tickers = list(pos["Ticker"]) if not pos.empty else []
-            if tickers:
-                try:
-                    ensure_history(s, tickers)
-                    update_latest_prices(s, tickers)
-                except Exception:
-                    pass
             view = build_positions_view(s)
             full_cols = ["Ticker","Name","Quantity","Cost Basis","Current Price","Market Value","P/L","P/L %"]
             cols = [{"name":c,"id":c} for c in full_cols]
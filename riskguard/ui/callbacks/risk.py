@@ -1,83 +1,117 @@
 # riskguard/ui/callbacks/risk.py
-from dash import Input, Output, html
+from dash import Input, Output, dash_table, html
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import numpy as np
 import pandas as pd
 from ...db.base import SessionLocal
-from .positions import build_positions_view
-from ...data.series import daily_price_series
-from ...risk.portfolio import portfolio_returns_dynamic
-from ...risk.metrics import parametric_var_es, historical_var_es
+from .positions import build_positions_view, book_panel
+from ...risk.online import book_risk, holdings_fingerprint
+from ...risk.metrics import risk_report
+from ...risk.montecarlo import book_monte_carlo
+from ...risk.rolling import rolling_report
+from ...risk.decomposition import book_decomposition, DECOMP_COLUMNS
+from ...risk.correlation import CORR_METHODS, correlation_matrix, heatmap_view
 from ...utils.dates import parse_lookback_series  # not used here but handy
+from ...config import BENCHMARK, CORR_HEATMAP_MAX, CORR_METHOD, RISK_HORIZONS, ROLLING_WINDOW
 
 def register_risk_callbacks(app):
     @app.callback(
         Output("risk-cards","children"),
         Output("rolling-vol-graph","figure"),
         Output("corr-heat","figure"),
+        Output("risk-decomp-table","data"),
+        Output("risk-decomp-table","columns"),
         Input("tick","n_intervals"),
         Input("risk-alpha","value"),
         Input("risk-method","value"),
+        Input("corr-method","value"),
     )
-    def risk_views(_n, alpha, method):
+    def risk_views(_n, alpha, method, corr_method):
         with SessionLocal() as s:
             view = build_positions_view(s)
             if view is None or view.empty:
                 cards = dbc.Row([dbc.Col(dbc.Alert("No positions in portfolio.", color="info"))])
-                return cards, go.Figure(), go.Figure()
+                return cards, go.Figure(), go.Figure(), [], []
 
             total_value = float(pd.to_numeric(view["Market Value"], errors="coerce").sum())
             if not np.isfinite(total_value) or total_value <= 0:
                 cards = dbc.Row([dbc.Col(dbc.Alert("Portfolio value is zero.", color="warning"))])
-                return cards, go.Figure(), go.Figure()
+                return cards, go.Figure(), go.Figure(), [], []
 
             weights = (view.set_index("Ticker")["Market Value"] / total_value).to_dict()
-            frames = {}
-            for t in view["Ticker"]:
-                ser = daily_price_series(s, t)
-                if len(ser):
-                    frames[t] = ser
+            panel = book_panel(s, view["Ticker"])
 
-        if not frames:
-            cards = dbc.Row([dbc.Col(dbc.Alert("No price history available.", color="warning"))])
-            return cards, go.Figure(), go.Figure()
+            held = [t for t in view["Ticker"] if panel.has_history(t)]
+            if not held:
+                cards = dbc.Row([dbc.Col(dbc.Alert("No price history available.", color="warning"))])
+                return cards, go.Figure(), go.Figure(), [], []
 
-        port_ret = portfolio_returns_dynamic(frames, weights, min_coverage=0.7)
+            # Online state: between daily bars this is a copy of the checkpointed statistics.
+            stats = book_risk(s, "book", panel, weights, held,
+                              holdings_fingerprint(view.set_index("Ticker")["Quantity"].to_dict()))
 
-        prices = pd.concat(frames.values(), axis=1).sort_index()
-        asset_rets = prices.pct_change().loc[port_ret.index].dropna(how="all")
+        port_ret = stats["port_ret"]
+        ann_vol, sharpe, mdd = stats["ann_vol"], stats["sharpe"], stats["mdd"]
 
-        ann_vol = float(port_ret.std(ddof=1) * np.sqrt(252)) if len(port_ret) else float("nan")
-        sharpe  = float((port_ret.mean() / port_ret.std(ddof=1)) * np.sqrt(252)) if port_ret.std(ddof=1) > 0 else float("nan")
-        equity  = (1 + port_ret).cumprod()
-        mdd     = float((equity / equity.cummax() - 1).min()) if len(equity) else float("nan")
-
-        if method == "param":
-            var_val, es_val = parametric_var_es(port_ret, alpha)
-            v_label, e_label = f"VaR {int(alpha*100)}% (Param)", f"ES {int(alpha*100)}% (Param)"
+        method = method if method in ("param", "mc") else "hist"
+        alpha = float(alpha)
+        if method == "mc":
+            report = book_monte_carlo(panel, weights, held, alphas=[alpha], horizons=RISK_HORIZONS)
         else:
-            var_val, es_val = historical_var_es(port_ret, alpha)
-            v_label, e_label = f"VaR {int(alpha*100)}% (Hist)", f"ES {int(alpha*100)}% (Hist)"
+            report = risk_report(port_ret, alphas=[alpha], methods=[method], horizons=RISK_HORIZONS)
+        tag = f"{alpha:.1%}".replace(".0%", "%") + {"param": " (Param)", "hist": " (Hist)", "mc": " (MC)"}[method]
+
+        def var_card(measure):
+            vals = report[measure].xs(method)   # horizon, alpha -> value
+            first, *rest = RISK_HORIZONS
+            v = float(vals.loc[(first, alpha)])
+            return dbc.Card(dbc.CardBody([
+                html.Div(f"{measure} {tag}"),
+                html.H4(f"{v:.2%}" if np.isfinite(v) else "n/a"),
+                html.Small(" · ".join(f"{h}d {float(vals.loc[(h, alpha)]):.2%}" for h in rest), className="text-muted"),
+            ]))
 
         cards = dbc.Row([
-            dbc.Col(dbc.Card(dbc.CardBody([html.Div("Ann. Volatility"), html.H4(f"{ann_vol:.2%}" if np.isfinite(ann_vol) else "n/a")])), md=2),
+            dbc.Col(dbc.Card(dbc.CardBody([html.Div("Ann. Volatility"), html.H4(f"{ann_vol:.2%}" if np.isfinite(ann_vol) else "n/a"),
+                                           html.Small(f"EWMA {stats['ewma_vol']:.2%}" if np.isfinite(stats["ewma_vol"]) else "",
+                                                      className="text-muted")])), md=2),
             dbc.Col(dbc.Card(dbc.CardBody([html.Div("Sharpe Ratio"),  html.H4(f"{sharpe:.2f}" if np.isfinite(sharpe) else "n/a")])), md=2),
             dbc.Col(dbc.Card(dbc.CardBody([html.Div("Max Drawdown"),  html.H4(f"{mdd:.2%}" if np.isfinite(mdd) else "n/a")])), md=2),
-            dbc.Col(dbc.Card(dbc.CardBody([html.Div(v_label),         html.H4(f"{var_val:.2%}" if np.isfinite(var_val) else "n/a")])), md=3),
-            dbc.Col(dbc.Card(dbc.CardBody([html.Div(e_label),         html.H4(f"{es_val:.2%}" if np.isfinite(es_val) else "n/a")])), md=3),
+            dbc.Col(var_card("VaR"), md=3),
+            dbc.Col(var_card("ES"), md=3),
         ], className="gy-2")
 
-        rv = port_ret.rolling(21).std(ddof=1) * np.sqrt(252)
+        rv = stats["rolling_vol"]
         vol_fig = go.Figure()
         if len(rv):
             vol_fig.add_trace(go.Scatter(x=rv.index, y=rv, mode="lines", name="21d Rolling Vol"))
+            roll = rolling_report(panel, weights, held, ROLLING_WINDOW, alpha)
+            kind = "param" if method == "param" else "hist"   # no rolling Monte Carlo; show historical
+            rvar = roll[f"{kind}_var"]
+            vol_fig.add_trace(go.Scatter(x=rvar.index, y=rvar, mode="lines",
+                                         name=f"{ROLLING_WINDOW}d VaR {alpha:.1%} ({kind.title()})"))
+            beta = roll["beta"]
+            if beta.notna().any():
+                vol_fig.add_trace(go.Scatter(x=beta.index, y=beta, mode="lines", yaxis="y2",
+                                             name=f"{ROLLING_WINDOW}d Beta vs {BENCHMARK}", line=dict(dash="dot")))
+                vol_fig.update_layout(yaxis2=dict(overlaying="y", side="right", showgrid=False, title="Beta"))
         vol_fig.update_layout(margin=dict(l=10,r=10,t=30,b=10), height=280)
 
+        # Cluster-ordered, cached per data version; large books draw only their top positions.
         corr_fig = go.Figure()
-        if not asset_rets.empty:
-            cm = asset_rets.corr()
-            corr_fig.add_trace(go.Heatmap(z=cm.values, x=cm.columns, y=cm.index, zmin=-1, zmax=1, colorscale="RdBu"))
-            corr_fig.update_layout(margin=dict(l=10,r=10,t=30,b=10), height=320)
+        if len(port_ret) and held:
+            cm = correlation_matrix(panel, held, corr_method if corr_method in CORR_METHODS else CORR_METHOD)
+            cm, note = heatmap_view(cm, CORR_HEATMAP_MAX, weights)
+            corr_fig.add_trace(go.Heatmap(z=cm.values.round(3), x=cm.columns, y=cm.index, zmin=-1, zmax=1, colorscale="RdBu"))
+            corr_fig.update_layout(margin=dict(l=10,r=10,t=30,b=10), height=320,
+                                   title=dict(text=note, font=dict(size=11)) if note else None)
+
+        # Per-position contributions: one cached covariance, then matrix-vector products.
+        decomp = book_decomposition(panel, weights, held, alpha)
+        pct = dash_table.FormatTemplate.percentage(2)
+        decomp_cols = [{"name": "Ticker", "id": "Ticker"}] + [
+            {"name": c, "id": c, "type": "numeric", "format": pct} for c in DECOMP_COLUMNS]
+        decomp_rows = decomp.reset_index().replace([np.inf, -np.inf], np.nan).round(6).to_dict("records")
 
-        return cards, vol_fig, corr_fig
+        return cards, vol_fig, corr_fig, decomp_rows, decomp_cols
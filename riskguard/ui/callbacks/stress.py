@@ -1,47 +1,64 @@
 # riskguard/ui/callbacks/stress.py
-from dash import Input, Output
+from dash import ALL, Input, Output, ctx, html
 import dash
+import dash_bootstrap_components as dbc
 from ...db.base import SessionLocal
-from .positions import build_positions_view
-from ...data.series import daily_price_series
-from ...risk.portfolio import portfolio_returns_dynamic, worst_window_stats
+from .positions import build_positions_view, book_panel
+from ...risk.portfolio import portfolio_returns_panel, worst_windows
+from ...risk.stress import book_scenarios, run_scenarios
+from ...config import STRESS_SHOCKS, STRESS_TABLE_ROWS, WORST_WINDOWS, WORST_WINDOWS_TOP
 import pandas as pd
 
 def register_stress_callbacks(app):
     @app.callback(
         Output("stress-out","children"),
         Output("worst-window-out","children"),
-        Input("stress-5","n_clicks"),
-        Input("stress-10","n_clicks"),
-        Input("stress-20","n_clicks"),
+        Input({"type": "stress-shock", "index": ALL}, "n_clicks"),
         prevent_initial_call=True
     )
-    def run_stress(n5, n10, n20):
-        clicks = [(n5 or 0), (n10 or 0), (n20 or 0)]
-        if max(clicks) == 0:
+    def run_stress(clicks):
+        # One button per STRESS_SHOCKS entry (see layout); the one clicked picks the parallel shift.
+        if not ctx.triggered_id or not any(clicks):
             return dash.no_update, dash.no_update
-        shock = [-0.05, -0.10, -0.20][clicks.index(max(clicks))]
+        i = ctx.triggered_id["index"]
+        shock = STRESS_SHOCKS[i]
 
-        frames, weights, total_value = {}, {}, 0.0
+        weights, total_value = {}, 0.0
         with SessionLocal() as s:
             view = build_positions_view(s)
             if view is None or view.empty:
                 return "Add positions to run a stress test.", ""
             total_value = float(pd.to_numeric(view["Market Value"], errors="coerce").sum())
-            for t in view["Ticker"]:
-                ser = daily_price_series(s, t)
-                if len(ser):
-                    frames[t] = ser
-            if not frames:
+            panel = book_panel(s, view["Ticker"])
+            if not any(panel.has_history(t) for t in view["Ticker"]):
                 return "No price history available.", ""
-            weights = (view.set_index("Ticker")["Market Value"] / total_value).to_dict()
+            values = pd.to_numeric(view.set_index("Ticker")["Market Value"], errors="coerce").fillna(0.0)
+            weights = (values / total_value).to_dict()
 
-        port_ret = portfolio_returns_dynamic(frames, weights)
+        port_ret = portfolio_returns_panel(panel, weights)
         if port_ret.empty:
             return "Insufficient history for stress test.", ""
 
-        pnl_pct = shock; pnl_usd = total_value * pnl_pct
-        stress_msg = f"Shock {int(shock*100)}% ⇒ Estimated P/L: {pnl_pct:.2%} (~${pnl_usd:,.0f})"
-        ww = worst_window_stats(port_ret, window=20)
-        ww_msg = f"Worst 20d window: {ww['start']} → {ww['end']} : {ww['ret']:.2%}" if ww else "Not enough data for 20-day window."
-        return stress_msg, ww_msg
+        # All scenarios x positions in one product; the clicked button is the parallel shift.
+        held = [t for t in values.index if t in panel.tickers]
+        shocks, skipped = book_scenarios(panel, held, port_ret)
+        summary, _ = run_scenarios(shocks, values.reindex(held))
+        clicked = summary.iloc[i]   # book_scenarios lists the parallel shifts first, in STRESS_SHOCKS order
+        stress_msg = [html.Div(f"Shock {int(shock*100)}% ⇒ Estimated P/L: {clicked['P/L %']:.2%} (~${clicked['P/L']:,.0f})")]
+        worst = summary.sort_values("P/L").head(STRESS_TABLE_ROWS)
+        if len(worst) or skipped:
+            head = html.Thead(html.Tr([html.Th(c) for c in ["Scenario", "P/L", "P/L %", "Worst position"]]))
+            body = html.Tbody([html.Tr([html.Td(name), html.Td(f"${r['P/L']:,.0f}"), html.Td(f"{r['P/L %']:.2%}"),
+                                        html.Td(f"{r['Worst Position']} (${r['Worst P/L']:,.0f})")])
+                               for name, r in worst.iterrows()] +
+                              [html.Tr([html.Td(name), html.Td("insufficient history", colSpan=3, className="text-muted")])
+                               for name in skipped])
+            stress_msg.append(dbc.Table([head, body], size="sm", bordered=False, striped=True, className="mt-2 mb-0"))
+        ww = worst_windows(port_ret, WORST_WINDOWS, top=WORST_WINDOWS_TOP)
+        if ww.empty:
+            return stress_msg, "Not enough data for the worst-window table."
+        head = html.Thead(html.Tr([html.Th(c) for c in ["Window", "#", "Start", "End", "Return"]]))
+        body = html.Tbody([html.Tr([html.Td(f"{w.window}d"), html.Td(w.rank), html.Td(str(w.start.date())),
+                                    html.Td(str(w.end.date())), html.Td(f"{w.ret:.2%}")])
+                           for w in ww.itertuples(index=False)])
+        return stress_msg, dbc.Table([head, body], size="sm", bordered=False, striped=True, className="mb-0")
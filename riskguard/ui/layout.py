@@ -1,7 +1,8 @@
 # riskguard/ui/layout.py
 from dash import dcc, html, dash_table
 import dash_bootstrap_components as dbc
-from ..config import THEME, UPDATE_MS, DEFAULT_TICKERS
+from ..config import (THEME, UPDATE_MS, DEFAULT_TICKERS, CORR_METHOD, BACKTEST_BAND, BACKTEST_COST_BPS, BACKTEST_SCHEDULE,
+                      STRESS_SHOCKS)
 
 def build_layout():
     sidebar = dbc.Card(dbc.CardBody([
@@ -33,11 +34,17 @@ def build_layout():
         html.Div("Risk Settings", className="text-muted small mb-1"),
         dbc.Row([
             dbc.Col(dbc.Select(id="risk-alpha",
-                options=[{"label":"90%","value":0.90},{"label":"95%","value":0.95},{"label":"99%","value":0.99}],
+                options=[{"label":"90%","value":0.90},{"label":"95%","value":0.95},{"label":"97.5%","value":0.975},{"label":"99%","value":0.99}],
                 value=0.95), md=6),
             dbc.Col(dbc.Select(id="risk-method",
-                options=[{"label":"Parametric","value":"param"},{"label":"Historical","value":"hist"}],
+                options=[{"label":"Parametric","value":"param"},{"label":"Historical","value":"hist"},
+                         {"label":"Monte Carlo","value":"mc"}],
                 value="param"), md=6),
+            dbc.Col(dbc.Select(id="corr-method",
+                options=[{"label":"Correlation: pairwise","value":"pairwise"},
+                         {"label":"Correlation: Ledoit-Wolf","value":"shrink"},
+                         {"label":"Correlation: EWMA","value":"ewma"}],
+                value=CORR_METHOD), md=12, class_name="mt-2"),
         ], class_name="mb-2"),
 
         html.Hr(),
@@ -46,6 +53,8 @@ def build_layout():
 
     return dbc.Container([
         dcc.Interval(id="tick", interval=UPDATE_MS, n_intervals=0),
+        dcc.Store(id="bt-pending", data=False),   # set while a run waits for history; `tick` retries it
+        dcc.Store(id="fc-pending", data=False),
         dbc.Row([
             dbc.Col(sidebar, md=3),
             dbc.Col([
@@ -88,15 +97,29 @@ def build_layout():
                     dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(id="rolling-vol-graph", style={"height":"280px"})])), md=6),
                     dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(id="corr-heat", style={"height":"320px"})])), md=6),
                 ], className="gy-3"),
+                dbc.Row([
+                    dbc.Col(dbc.Card(dbc.CardBody([
+                        html.Div("Risk decomposition (per position, 1-day)", className="text-muted small mb-1"),
+                        dash_table.DataTable(
+                            id="risk-decomp-table",
+                            page_size=10,
+                            sort_action="native",
+                            style_table={"overflowX": "auto"},
+                            style_header={"fontWeight": "600"},
+                            style_cell={"fontFamily": "monospace", "padding": "6px", "textAlign": "right"},
+                            style_cell_conditional=[{"if": {"column_id": "Ticker"}, "textAlign": "left"}],
+                        )
+                    ])), md=12),
+                ], className="gy-3 mt-1"),
 
                 html.Hr(),
                 html.H5("Stress Test"),
                 dbc.Row([
                     dbc.Col(
                         dbc.ButtonGroup([
-                            dbc.Button("Shock -5%",  id="stress-5",  color="warning", size="sm"),
-                            dbc.Button("Shock -10%", id="stress-10", color="danger",  size="sm"),
-                            dbc.Button("Shock -20%", id="stress-20", color="danger",  size="sm"),
+                            dbc.Button(f"Shock {x:+.0%}", id={"type": "stress-shock", "index": i},
+                                       color="warning" if abs(x) < 0.1 else "danger", size="sm")
+                            for i, x in enumerate(STRESS_SHOCKS)
                         ]),
                         md=6
                     ),
@@ -105,13 +128,22 @@ def build_layout():
                 dbc.Row([dbc.Col(html.Div(id="worst-window-out", className="small text-muted"))]),
 
                 html.Hr(),
-                html.H4("Backtest (Buy & Hold)"),
+                html.H4("Backtest"),
                 dbc.Row([
                     dbc.Col(dcc.DatePickerSingle(id="bt-start"), md=3),
+                    dbc.Col(dbc.Select(id="bt-schedule",
+                        options=[{"label":"Buy & hold","value":"none"},
+                                 {"label":"Daily rebalance","value":"daily"},
+                                 {"label":"Monthly rebalance","value":"monthly"},
+                                 {"label":"Quarterly rebalance","value":"quarterly"},
+                                 {"label":f"Drift > {BACKTEST_BAND:.0%}","value":"threshold"}],
+                        value=BACKTEST_SCHEDULE), md=2),
+                    dbc.Col(dbc.InputGroup([dbc.Input(id="bt-cost", type="number", min=0, step=1, value=BACKTEST_COST_BPS),
+                                            dbc.InputGroupText("bps")]), md=2),
                     dbc.Col(dbc.Button("Run Backtest", id="bt-run", color="primary"), md=2),
-                    dbc.Col(html.Div("Uses your current portfolio positions & market-value weights.",
-                                     className="text-muted small"), md=7),
-                ], class_name="mb-2"),
+                    dbc.Col(html.Div("Uses your current positions' market-value weights.",
+                                     className="text-muted small"), md=3),
+                ], class_name="mb-2 g-2"),
                 dbc.Row([
                     dbc.Col(dbc.Card(dbc.CardBody([dcc.Graph(id="bt-curve", style={"height":"320px"})])), md=8),
                     dbc.Col(dbc.Card(dbc.CardBody([html.Div(id="bt-metrics")])), md=4),
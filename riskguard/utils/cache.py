@@ -0,0 +1,86 @@
+# riskguard/utils/cache.py
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+def nbytes(value) -> int:
+    """Rough in-memory size of cached values (arrays/frames exact, containers summed)."""
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=False))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(nbytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+class LRUCache:
+    """Thread-safe LRU bounded by total value size in bytes.
+
+    Entries may carry a version tag; `get(key, version=v)` treats an entry with a
+    different tag as a miss (the stale entry stays until replaced or evicted).
+    """
+
+    def __init__(self, max_bytes: int, sizeof=nbytes):
+        self.max_bytes = int(max_bytes)
+        self._sizeof = sizeof
+        self._data = OrderedDict()   # key -> (value, size, version)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None, version=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or (version is not None and item[2] != version):
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def peek(self, key):
+        """(value, version) without touching recency or counters; None if absent."""
+        with self._lock:
+            item = self._data.get(key)
+            return None if item is None else (item[0], item[2])
+
+    def put(self, key, value, version=None):
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._data[key] = (value, size, version)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, sz, _) = self._data.popitem(last=False)
+                self._bytes -= sz
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is None:
+                return default
+            self._bytes -= item[1]
+            return item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._data), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,30 @@
+# tests/conftest.py
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The engine resolves the relative DATABASE_URL when riskguard.db.base is first
+# imported (while test modules are collected), so move to a scratch directory
+# now; the checkout stays importable through its absolute path.
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+_CWD, _SCRATCH = os.getcwd(), tempfile.mkdtemp(prefix="riskguard-tests-")
+os.chdir(_SCRATCH)
+
+def pytest_unconfigure(config):
+    os.chdir(_CWD)
+    shutil.rmtree(_SCRATCH, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def session():
+    """A session on a fresh SQLite store in the scratch directory."""
+    from riskguard.db.base import SessionLocal, init_db, ensure_schema
+    init_db()
+    ensure_schema()
+    s = SessionLocal()
+    yield s
+    s.close()
@@ -0,0 +1,44 @@
+# tests/test_backtest.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from riskguard.data.panel import PricePanel
+from riskguard.risk.backtest import backtest
+from riskguard.risk.metrics import buy_hold_metrics
+from riskguard.risk.portfolio import portfolio_returns_panel
+
+def make_panel(seed, gaps=True, n=600, k=8):
+    rng = np.random.default_rng(seed)
+    px = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, (n, k)), axis=0))
+    if gaps:
+        px[rng.random((n, k)) < 0.08] = np.nan
+        px[:150, 2] = np.nan
+        px[400:, 5] = np.nan
+        px[200:230, [0, 1, 3]] = np.nan            # a stretch that fails the coverage rule
+    tickers = [f"A{i}" for i in range(k)]
+    return PricePanel(pd.bdate_range("2020-01-01", periods=n), tickers, px), dict(zip(tickers, rng.dirichlet(np.ones(k))))
+
+@pytest.mark.parametrize("seed", range(4))
+def test_daily_nav_is_cumprod_of_portfolio_returns(seed):
+    panel, w = make_panel(seed)
+    ret = portfolio_returns_panel(panel, w)
+    res = backtest(panel, w, schedules="daily", cost_bps=0.0)
+    nav = res["nav"][("daily", "portfolio")]
+    np.testing.assert_allclose(nav.loc[ret.index].to_numpy(), (1 + ret).cumprod().to_numpy(), rtol=1e-10)
+    met = res["metrics"].loc[("daily", "portfolio")]
+    for name, v in buy_hold_metrics(ret).items():
+        assert met[name] == pytest.approx(v, rel=1e-9)
+
+def test_buy_and_hold_nav_matches_holdings():
+    panel, w = make_panel(11, gaps=False)
+    res = backtest(panel, w, schedules="none")
+    px = panel.prices_frame()
+    expected = (px / px.iloc[0]) @ pd.Series(w).reindex(px.columns)
+    np.testing.assert_allclose(res["nav"][("none", "portfolio")].to_numpy(), expected.to_numpy(), rtol=1e-10)
+
+def test_costs_reduce_nav():
+    panel, w = make_panel(5)
+    free = backtest(panel, w, schedules=["daily", "monthly"], cost_bps=0.0)["nav"].iloc[-1]
+    paid = backtest(panel, w, schedules=["daily", "monthly"], cost_bps=10.0)["nav"].iloc[-1]
+    assert (paid < free).all()
@@ -0,0 +1,51 @@
+# tests/test_correlation.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from riskguard.risk.correlation import pairwise_corr, shrink_corr
+from riskguard.risk.rolling import rolling_beta, rolling_corr, rolling_corr_matrix
+
+def sample(seed, n, k, flat=True):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0, 0.02, (n, k)) + rng.normal(0, 0.01, (n, 1))
+    if flat:
+        x[:, rng.integers(k)] = rng.choice([0.013, 0.1, 1 / 3, 0.0, 7.77])   # a constant column
+    x[rng.random((n, k)) < 0.2] = np.nan
+    return x
+
+@pytest.mark.parametrize("seed", range(60))
+def test_pairwise_corr_matches_pandas(seed):
+    rng = np.random.default_rng(seed)
+    x = sample(seed, int(rng.integers(5, 80)), int(rng.integers(2, 8)), flat=seed % 2 == 0)
+    np.testing.assert_allclose(pairwise_corr(x), pd.DataFrame(x).corr().to_numpy(), atol=1e-10, equal_nan=True)
+
+def test_rolling_corr_is_nan_on_flat_windows():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(0, 0.02, (200, 3)))
+    other = pd.Series(rng.normal(0, 0.02, 200))
+    df.iloc[50:120, 0] = 1 / 3
+    other.iloc[100:160] = 0.013
+    df.iloc[[5, 77, 150], 2] = np.nan
+    got = rolling_corr(df, other, 20).to_numpy()
+    ref = df.rolling(20).corr(other).to_numpy()
+    ref[~np.isfinite(ref) | (np.abs(ref) > 1)] = np.nan    # pandas leaves +-inf on flat windows
+    np.testing.assert_allclose(got, ref, atol=1e-8, equal_nan=True)
+    assert np.isnan(got[69:120, 0]).all() and np.isnan(got[119:160]).all()
+    assert np.isnan(rolling_beta(df, other, 20).to_numpy()[119:160]).all()
+
+def test_rolling_corr_matrix_matches_window_corr():
+    x = pd.DataFrame(sample(4, 120, 5))
+    got = rolling_corr_matrix(x, 30, end=90).to_numpy()
+    win = x.loc[61:90]
+    ref = win.corr().to_numpy()
+    n = win.notna().astype(float)
+    ref[(n.T @ n).to_numpy() < 30] = np.nan                # only pairs present on every row
+    np.testing.assert_allclose(got, ref, atol=1e-10, equal_nan=True)
+
+def test_shrink_corr_is_positive_definite():
+    x = sample(9, 40, 60)                                  # more assets than dates
+    c, delta = shrink_corr(x)
+    assert 0.0 <= delta <= 1.0
+    assert np.allclose(c, c.T) and np.allclose(np.diag(c), 1.0)
+    assert np.linalg.eigvalsh(c).min() > 0
@@ -0,0 +1,47 @@
+# tests/test_ingest.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import riskguard.ingest as ingest
+from riskguard.db.repo import get_price_frames
+
+def dump(path, ticker, n=300, split_at=None, seed=0):
+    rng = np.random.default_rng(seed)
+    px = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    if split_at is not None:
+        px[split_at:] /= 2                          # an unadjusted 2:1 split
+    pd.DataFrame({"Date": pd.bdate_range("2020-01-01", periods=n), "Ticker": ticker, "Open": px,
+                  "High": px, "Low": px, "Close": px, "Volume": 1000}).to_csv(path, index=False)
+    return px
+
+def test_seam_jump_skips_only_that_bar(session, tmp_path):
+    path = tmp_path / "split.csv"
+    dump(path, "SEAM", split_at=100)
+    st = ingest.ingest_file(session, str(path), chunk_rows=100)
+    bars = get_price_frames(session, ["SEAM"])["SEAM"]
+    assert st["done"] and st["skipped"] == 1
+    assert len(bars) == 299                         # only the first bar after the seam
+    assert pd.Timestamp(pd.bdate_range("2020-01-01", periods=300)[100]) not in bars.index
+
+def test_resume_after_interruption(session, tmp_path, monkeypatch):
+    path = tmp_path / "resume.csv"
+    px = dump(path, "RESUME", n=350, seed=1)
+    real, calls = ingest.bulk_upsert_price_frames, []
+
+    def flaky(s, frames):
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError("interrupted")
+        return real(s, frames)
+
+    monkeypatch.setattr(ingest, "bulk_upsert_price_frames", flaky)
+    with pytest.raises(RuntimeError):
+        ingest.ingest_file(session, str(path), chunk_rows=100)
+    session.rollback()
+    monkeypatch.setattr(ingest, "bulk_upsert_price_frames", real)
+    st = ingest.ingest_file(session, str(path), chunk_rows=100)
+    assert st["done"] and st["chunks"] == 4 and st["rows"] == 350 and st["bars"] == 350
+    bars = get_price_frames(session, ["RESUME"])["RESUME"]
+    np.testing.assert_allclose(bars["Close"].to_numpy(), px)
+    assert ingest.ingest_file(session, str(path), chunk_rows=100)["bars"] == 350   # done: not loaded again
@@ -0,0 +1,57 @@
+# tests/test_metrics.py
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import norm
+
+from riskguard.risk.metrics import buy_hold_metrics, risk_report
+
+ALPHAS = (0.9, 0.95, 0.975, 0.99)
+
+def baseline_param(ret, alpha):
+    """parametric_var_es before risk_report (normal, floored at 0)."""
+    mu, sd = float(ret.mean()), float(ret.std(ddof=1))
+    if not np.isfinite(sd) or sd == 0.0:
+        return np.nan, np.nan
+    q = 1.0 - alpha
+    z = norm.ppf(q)
+    return max(-(mu + sd * z), 0.0), max(-(mu - sd * norm.pdf(z) / q), 0.0)
+
+def baseline_hist(ret, alpha):
+    """historical_var_es before risk_report."""
+    q = ret.quantile(1.0 - alpha)
+    tail = ret[ret <= q]
+    return abs(q), abs(tail.mean()) if not tail.empty else np.nan
+
+def returns(seed, n, ties=False):
+    rng = np.random.default_rng(seed)
+    r = rng.standard_t(4, n) * 0.01
+    if ties:
+        r = np.round(r, 3)                  # many tied values around the quantiles
+    return pd.Series(r, index=pd.bdate_range("2015-01-01", periods=n))
+
+@pytest.mark.parametrize("seed,n,ties", [(0, 30, False), (1, 250, False), (2, 1000, True), (3, 57, True)])
+def test_risk_report_matches_baseline(seed, n, ties):
+    ret = returns(seed, n, ties)
+    rep = risk_report(ret, alphas=ALPHAS, methods=("hist", "param"), horizons=(1, 10))
+    for a in ALPHAS:
+        np.testing.assert_allclose(rep.loc[("hist", 1, a)].to_numpy(), baseline_hist(ret, a), rtol=1e-12)
+        np.testing.assert_allclose(rep.loc[("param", 1, a)].to_numpy(), baseline_param(ret, a), rtol=1e-12)
+        np.testing.assert_allclose(rep.loc[("hist", 10, a)].to_numpy(),
+                                   np.array(baseline_hist(ret, a)) * np.sqrt(10), rtol=1e-12)
+
+def test_risk_report_matrix_matches_columns():
+    frame = pd.DataFrame({f"P{i}": returns(i, 300) for i in range(4)})
+    frame.iloc[:120, 1] = np.nan            # a shorter history
+    rep = risk_report(frame, alphas=ALPHAS, horizons=(1,))
+    for name in frame:
+        one = risk_report(frame[name].dropna(), alphas=ALPHAS, horizons=(1,))
+        np.testing.assert_allclose(rep.loc[name].to_numpy(), one.to_numpy(), rtol=1e-12)
+
+def test_buy_hold_matrix_matches_series():
+    frame = pd.DataFrame({f"P{i}": returns(10 + i, 400) for i in range(3)})
+    frame.iloc[:50, 2] = np.nan
+    met = buy_hold_metrics(frame)
+    for name in frame:
+        one = buy_hold_metrics(frame[name].dropna())
+        np.testing.assert_allclose(met.loc[name, list(one)].to_numpy(dtype=float), list(one.values()), rtol=1e-10)
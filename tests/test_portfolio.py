@@ -0,0 +1,45 @@
+# tests/test_portfolio.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from riskguard.data.panel import PricePanel
+from riskguard.risk.portfolio import (portfolio_returns_dynamic, portfolio_returns_matrix,
+                                      portfolio_returns_panel)
+
+def gappy_prices(seed, n=500, k=7):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2019-01-01", periods=n)
+    px = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.012, (n, k)), axis=0))
+    px[rng.random((n, k)) < 0.08] = np.nan       # missing bars
+    px[: n // 3, 1] = np.nan                       # listed late
+    px[2 * n // 3:, 2] = np.nan                    # delisted
+    px[:, 5] = np.nan
+    px[n - 10, 5] = 50.0                           # a single bar: never counts toward coverage
+    px[:, 6] = np.nan
+    px[[40, 300], 6] = [10.0, 11.0]                # two bars, one return across the gap
+    tickers = [f"A{i}" for i in range(k)]
+    return PricePanel(dates, tickers, px), {t: pd.Series(px[:, i], index=dates).dropna() for i, t in enumerate(tickers)}
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("min_coverage", [0.0, 0.5, 0.7])
+def test_panel_returns_match_dynamic(seed, min_coverage):
+    panel, price_map = gappy_prices(seed)
+    rng = np.random.default_rng(100 + seed)
+    weights = dict(zip(panel.tickers, rng.dirichlet(np.ones(len(panel.tickers)))))
+    weights["A5"] = 0.4                            # heavy weight on the single-bar ticker
+    expected = portfolio_returns_dynamic(price_map, weights, min_coverage)
+    got = portfolio_returns_panel(panel, weights, min_coverage)
+    assert len(expected) > 0
+    pd.testing.assert_index_equal(got.index, expected.index)
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), rtol=1e-12)
+
+def test_matrix_columns_match_panel():
+    panel, _ = gappy_prices(7)
+    rng = np.random.default_rng(7)
+    W = pd.DataFrame(rng.dirichlet(np.ones(len(panel.tickers)), 5), columns=list(panel.tickers),
+                     index=[f"p{i}" for i in range(5)])
+    out = portfolio_returns_matrix(panel, W)
+    for name, w in W.iterrows():
+        one = portfolio_returns_panel(panel, w.to_dict())
+        pd.testing.assert_series_equal(out[name].dropna(), one, check_names=False, check_freq=False)
@@ -0,0 +1,55 @@
+# tests/test_series.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from riskguard.data.series import patch_outliers_batch, patch_outliers_frame, patch_outliers_series
+
+def baseline_patch(s, max_jump=0.18):
+    """patch_outliers_series as it was before the vectorized rewrite."""
+    if s is None or len(s) < 5:
+        return s if s is not None else pd.Series(dtype=float)
+    r = s.pct_change()
+    med = r.rolling(21, center=True, min_periods=8).median()
+    mad = (r - med).abs().rolling(21, center=True, min_periods=8).median()
+    z = (r - med) / mad.replace(0.0, np.nan)
+    big = (r.abs() > max_jump) & (z.abs() > 8)
+    iso = big & (~big.shift(1, fill_value=False)) & (~big.shift(-1, fill_value=False))
+    if not iso.any():
+        return s
+    s2 = s.copy()
+    for i in np.where(iso)[0]:
+        if 0 < i < len(s2) - 1:
+            s2.iloc[i] = 0.5 * (s2.iloc[i - 1] + s2.iloc[i + 1])
+        else:
+            s2.iloc[i] = s2.iloc[i - 1] if i > 0 else s2.iloc[i + 1]
+    return s2
+
+def spiky(seed, n):
+    rng = np.random.default_rng(seed)
+    s = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))), index=pd.bdate_range("2020-01-01", periods=n))
+    for i in rng.choice(n, size=max(1, n // 40), replace=False):
+        s.iloc[i] *= rng.choice([0.5, 1.6])           # isolated spikes, some at the edges
+    if n > 30:
+        s.iloc[10:12] *= 1.7                           # a two-bar jump is not isolated
+    return s
+
+@pytest.mark.parametrize("seed", range(20))
+def test_patch_matches_baseline(seed):
+    s = spiky(seed, 30 + 37 * seed)
+    pd.testing.assert_series_equal(patch_outliers_series(s), baseline_patch(s))
+
+def test_patch_tail_matches_full_series():
+    s = spiky(3, 400)
+    full = patch_outliers_series(s)
+    for k in (1, 5, 30):
+        pd.testing.assert_series_equal(patch_outliers_series(s, tail=k), full.iloc[-k:])
+
+def test_batch_and_frame_match_per_series():
+    series = {f"T{i}": spiky(i, 50 + 60 * i) for i in range(6)}
+    batch = patch_outliers_batch(series)
+    frame = patch_outliers_frame(pd.DataFrame(series))
+    for t, s in series.items():
+        expected = baseline_patch(s)
+        pd.testing.assert_series_equal(batch[t], expected)
+        pd.testing.assert_series_equal(frame[t].dropna(), expected, check_names=False, check_freq=False)